@@ -1,24 +1,59 @@
-#!bin/bash
-
-import pprint
+#!/usr/bin/env python3
+"""
+Command line of the solvers: `SAT -Sn inputfile [-Ck | -P | -B[k]]`, installed as the `sat` console script.
+
+Only the DIMACS reader and the model converters are imported up front. The modules of the solution cache, the
+propagation pre-pass and a strategy (and NumPy and Numba with the CDCL kernels) are imported by the function using
+them, so usage errors and CNFs that are not sudokus skip SQLite and the propagation modules.
+"""
+import os
 import sys
 import time
 
-from Scripts.cdcl_heuristics_solver import CDCLSatSolver, SATResult
 from Scripts.experiments.sudoku_validator import is_valid_sudoku
 from Scripts.helpers.dimacs_reader import read_dimacs_file
 from Scripts.helpers.sat_outcome_converter import from_dict_to_matrix, pretty_matrix, from_list_to_matrix, \
-    from_dict_to_cnf
-from Scripts.heuristics.CHB import CHBHeuristics
-from Scripts.heuristics.VSIDS import VSIDSHeuristics
-from Scripts.simple_dpll import dpll
+    from_dict_to_cnf, matrix_length_from_variables, from_clauses_to_matrix, from_matrix_to_clauses, \
+    from_matrix_to_cnf, from_variable
 
 DPLL_STRATEGY = 1
 CDCL_CHB_STRATEGY = 2
 CDCL_VISIDS_STRATEGY = 3
+CDCL_ADAPTIVE_STRATEGY = 4
+LOCAL_SEARCH_STRATEGY = 5
+LOOKAHEAD_STRATEGY = 6
+
+CDCL_DESCRIPTIONS = {
+    CDCL_CHB_STRATEGY: 'Solving sudoku with CDCL using CHB heuristics...',
+    CDCL_VISIDS_STRATEGY: 'Solving sudoku with CDCL using VSIDS heuristics...',
+    CDCL_ADAPTIVE_STRATEGY: 'Solving sudoku with CDCL switching between VSIDS and CHB heuristics...',
+}
+
+# SQLite file of the solution cache of sudokus (see solution_cache). Unset: no cache
+SOLUTION_CACHE_PATH = os.environ.get('SAT_SOLUTION_CACHE')
+# Seed of the local search, runs with the same seed flip the same variables
+LOCAL_SEARCH_SEED = int(os.environ.get('SAT_LOCAL_SEARCH_SEED', 0))
+# Directory of the learned-clause libraries of the CDCL strategies (see lemma_library), unset: no library
+LEMMA_LIBRARY_DIRECTORY = os.environ.get('SAT_LEMMA_LIBRARY')
+# Snapshot file of the CDCL strategies (see checkpoint), a solve resumes from it. Unset: no snapshots
+CHECKPOINT_PATH = os.environ.get('SAT_CHECKPOINT')
+# Seconds between two snapshots, they are also saved on SIGUSR1 and SIGTERM. Unset: `checkpoint.DEFAULT_INTERVAL`
+CHECKPOINT_INTERVAL = os.environ.get('SAT_CHECKPOINT_INTERVAL')
+# MiB of resident memory a CDCL solve may use before it reduces its learned clauses, then stops with UNKNOWN (see
+# memory_monitor). Unset: no limit
+MEMORY_LIMIT = os.environ.get('SAT_MEMORY_LIMIT')
+
+# Simplify the CNF (see cnf_preprocessor) before handing it to the solver
+USE_PREPROCESSING = True
+
+
+def solve_with_dpll(clauses, preprocessing=None, matrix_length=9):
+    import pprint
+    from Scripts.helpers.variable_renumbering import VariableRenumbering
+    from Scripts.simple_dpll import dpll
+
+    renumbering = VariableRenumbering(clauses)
 
-
-def solve_with_dpll(clauses):
     statistics = {
         'implications': 0,
         'decisions': 0,
@@ -30,12 +65,17 @@ def solve_with_dpll(clauses):
         'start': None
     }
 
-    is_satisfied, assignment, statistics = dpll(clauses, statistics)
+    is_satisfied, assignment, statistics = dpll(renumbering.encode_clauses(clauses), statistics)
+    assignment = renumbering.decode_assignment(assignment)
+
+    if is_satisfied and preprocessing is not None:
+        model = preprocessing.extend_model(variable if value else -variable for variable, value in assignment.items())
+        assignment = {abs(literal): literal > 0 for literal in model}
 
     if is_satisfied:
         print("SATISFIED")
         start_time = time.perf_counter()
-        sudoku_matrix = from_dict_to_matrix(assignment)
+        sudoku_matrix = from_dict_to_matrix(assignment, matrix_length)
         end_time = time.perf_counter()
 
         print(f'Elapsed time {end_time - start_time}')
@@ -58,9 +98,71 @@ def solve_with_dpll(clauses):
     return is_satisfied, from_dict_to_cnf(assignment)
 
 
-def solve_with_cdcl(clauses, total_variables, heuristics):
+def solve_with_cdcl(clauses, heuristics, preprocessing=None, proof_path=None, lemma_library=None, clues=(),
+                    checkpointer=None, memory_limit=None, matrix_length=9):
+    """
+    :param proof_path: file to write a binary DRAT proof to when the clauses are unsatisfiable. The proof refers to
+    `clauses`, so they must be the input CNF, neither propagated nor preprocessed
+    :param lemma_library: `LemmaLibrary` of the rules the clauses come from: its clauses are preloaded, and the
+    clauses learned here are recorded into it, weakened with the `clues` of the input CNF
+    :param checkpointer: `Checkpointer` of the input CNF, the solve resumes from its snapshot when there is one
+    :param memory_limit: bytes of resident memory the solve may use, None for no limit
+    :param matrix_length: grid length the solution is printed with
+    """
+    from contextlib import nullcontext
+    from dataclasses import replace
+
+    from Scripts.cdcl_heuristics_solver import SATResult
+    from Scripts.cdcl_kernels import make_cdcl_solver
+    from Scripts.helpers.cardinality_detector import detect_cardinality_constraints
+    from Scripts.helpers.drat_proof import DRATWriter
+    from Scripts.helpers.memory_monitor import MemoryMonitor
+    from Scripts.helpers.variable_renumbering import VariableRenumbering
+
     start_time = time.perf_counter()
-    results = CDCLSatSolver(clauses, total_variables, heuristics).solve()
+    renumbering = VariableRenumbering(clauses)
+    clauses, cardinality_constraints = detect_cardinality_constraints(renumbering.encode_clauses(clauses))
+    print(f'Detected {len(cardinality_constraints)} cardinality constraints, {len(clauses)} clauses left')
+
+    lemmas, lemma_log = [], None
+    if lemma_library is not None:
+        lemmas = [(lbd, renumbering.encode_clauses([literals])[0]) for lbd, literals in lemma_library.select()]
+        lemma_log = []
+
+    snapshot = None
+    if checkpointer is not None:
+        checkpointer.renumbering = renumbering
+        snapshot = checkpointer.load()
+    if snapshot is not None:
+        print(f'Resuming from {checkpointer.path}: {len(snapshot.lemmas)} clauses, '
+              f'{snapshot.statistics["conflicts_counter"]} conflicts so far')
+        snapshot = replace(snapshot, lemmas=snapshot.lemmas + lemmas)
+
+    proof = DRATWriter(proof_path, to_original=renumbering.to_original) if proof_path is not None else None
+    memory_monitor = MemoryMonitor(memory_limit)
+    solver = make_cdcl_solver(clauses, renumbering.total_variables, heuristics, cardinality_constraints,
+                              proof=proof, lemma_log=lemma_log, checkpointer=checkpointer,
+                              memory_monitor=memory_monitor)
+    with checkpointer or nullcontext():
+        results = solver.resume(snapshot) if snapshot is not None else solver.solve(lemmas)
+    solution = renumbering.decode_literals(results.solution)
+
+    if results.status == SATResult.UNKNOWN and memory_monitor.is_over_limit:
+        print(f'Stopped by the memory limit of {memory_limit / 2 ** 20:.0f} MiB, '
+              f'{results.statistics.memory_reductions_counter} clause database reductions did not free enough')
+
+    if checkpointer is not None:
+        if results.status == SATResult.UNKNOWN:
+            print(f'Stopped, the search resumes from {checkpointer.path} when run again')
+        else:
+            checkpointer.remove()
+
+    if lemma_library is not None:
+        recorded = lemma_library.record([(lbd, renumbering.decode_literals(literals)) for lbd, literals in lemma_log],
+                                        clues)
+        if recorded:
+            lemma_library.save()
+        print(f'Lemma library: {len(lemmas)} clauses preloaded, {recorded} recorded, {len(lemma_library)} in total')
     end_time = time.perf_counter()
 
     print(f'Elapsed time {end_time - start_time}')
@@ -69,20 +171,262 @@ def solve_with_cdcl(clauses, total_variables, heuristics):
 
     is_satisfiable = results.status == SATResult.SATISFIABLE
 
+    if proof is not None:
+        proof.close()
+        if is_satisfiable:
+            os.remove(proof_path)
+        else:
+            print(f'DRAT proof of {proof.lemmas} lemmas written to {proof_path}, check it with '
+                  f'python -m Scripts.helpers.drat_proof <cnf file> {proof_path}')
+
+    if is_satisfiable and preprocessing is not None:
+        solution = preprocessing.extend_model(solution)
+
     if is_satisfiable:
         print("Statistics :")
         print("=============================================")
         print(results.statistics)
         print("=============================================")
 
-        sudoku_matrix = from_list_to_matrix(results.solution)
+        sudoku_matrix = from_list_to_matrix(solution, matrix_length)
+        print("Solution:")
+        print("=============================================")
+        print(pretty_matrix(sudoku_matrix))
+        print("=============================================")
+        print(f"is sudoku matrix valid? {is_valid_sudoku(sudoku_matrix)}")
+
+    return is_satisfiable, map(str, solution)
+
+
+def solve_with_local_search(clauses, preprocessing=None, matrix_length=9):
+    from Scripts.cdcl_heuristics_solver import SATResult
+    from Scripts.helpers.variable_renumbering import VariableRenumbering
+    from Scripts.local_search import local_search
+
+    start_time = time.perf_counter()
+    renumbering = VariableRenumbering(clauses)
+
+    results = local_search(renumbering.encode_clauses(clauses), renumbering.total_variables, seed=LOCAL_SEARCH_SEED)
+    solution = renumbering.decode_literals(results.solution)
+    end_time = time.perf_counter()
+
+    print(f'Elapsed time {end_time - start_time}')
+
+    print(f'Status: {results.status}')
+
+    is_satisfiable = results.status == SATResult.SATISFIABLE
+
+    if is_satisfiable and preprocessing is not None:
+        solution = preprocessing.extend_model(solution)
+
+    print("Statistics :")
+    print("=============================================")
+    print(results.statistics)
+    print("=============================================")
+
+    if is_satisfiable:
+        sudoku_matrix = from_list_to_matrix(solution, matrix_length)
+        print("Solution:")
+        print("=============================================")
+        print(pretty_matrix(sudoku_matrix))
+        print("=============================================")
+        print(f"is sudoku matrix valid? {is_valid_sudoku(sudoku_matrix)}")
+    elif results.status == SATResult.UNKNOWN:
+        # Local search can not tell an unsatisfiable CNF from one it did not find a model of
+        print("UNKNOWN: no model found within the flip budget")
+    else:
+        print("UNSATISFIED")
+
+    return is_satisfiable, map(str, solution)
+
+
+def solve_with_lookahead(clauses, preprocessing=None, matrix_length=9):
+    from Scripts.cdcl_heuristics_solver import SATResult
+    from Scripts.helpers.variable_renumbering import VariableRenumbering
+    from Scripts.lookahead_dpll import LookaheadSolver
+
+    start_time = time.perf_counter()
+    renumbering = VariableRenumbering(clauses)
+
+    results = LookaheadSolver(renumbering.encode_clauses(clauses), renumbering.total_variables).solve()
+    solution = renumbering.decode_literals(results.solution)
+    end_time = time.perf_counter()
+
+    print(f'Elapsed time {end_time - start_time}')
+
+    print(f'Status: {results.status}')
+
+    is_satisfiable = results.status == SATResult.SATISFIABLE
+
+    if is_satisfiable and preprocessing is not None:
+        solution = preprocessing.extend_model(solution)
+
+    print("Statistics :")
+    print("=============================================")
+    print(results.statistics)
+    print("=============================================")
+
+    if is_satisfiable:
+        sudoku_matrix = from_list_to_matrix(solution, matrix_length)
         print("Solution:")
         print("=============================================")
         print(pretty_matrix(sudoku_matrix))
         print("=============================================")
         print(f"is sudoku matrix valid? {is_valid_sudoku(sudoku_matrix)}")
+    else:
+        print("UNSATISFIED")
+
+    return is_satisfiable, map(str, solution)
+
+
+def count_with_cdcl(clauses, total_variables, heuristics, limit):
+    """
+    Count the solutions of a CNF, stopping at `limit`. Sudokus are counted on their cell variables, so a limit of 2
+    tells whether the solution is unique.
+    """
+    from Scripts.cdcl_heuristics_solver import CDCLSatSolver
+    from Scripts.helpers.cardinality_detector import detect_cardinality_constraints
+    from Scripts.helpers.variable_renumbering import VariableRenumbering
+
+    start_time = time.perf_counter()
+    renumbering = VariableRenumbering(clauses)
+    clauses, cardinality_constraints = detect_cardinality_constraints(renumbering.encode_clauses(clauses))
+
+    projection = None
+    matrix_length = matrix_length_from_variables(total_variables)
+    if matrix_length is not None:
+        projection = [variable for variable in range(1, renumbering.total_variables + 1)
+                      if all(1 <= index <= matrix_length
+                             for index in from_variable(renumbering.decode_literal(variable), matrix_length))]
+
+    solver = CDCLSatSolver(clauses, renumbering.total_variables, heuristics, cardinality_constraints)
+    count = solver.count_solutions(limit, projection)
+    end_time = time.perf_counter()
+
+    print(f'Elapsed time {end_time - start_time}')
+    print(f'Solutions found: {count}' + (f' (stopped at the limit of {limit})' if count == limit else ''))
+    if count == 1:
+        print("The solution is unique")
 
-    return is_satisfiable, map(str, results.solution)
+    print("Statistics :")
+    print("=============================================")
+    print(solver.statistics)
+    print("=============================================")
+
+    return count
+
+
+def propagation_pre_pass(clauses, sudoku):
+    """
+    Run sudoku propagation on the clues before handing the CNF to a SAT solver. Propagation only knows the sudoku
+    rules, so it only runs on CNFs made of clues and exactly the rules of `sudoku_rules/`.
+
+    :param sudoku: clues of the CNF as a matrix (see `sudoku_clues`), None when the CNF is not such a sudoku
+    :return: the propagation result (None when the CNF is not such a sudoku) and the clauses to solve
+    """
+    if sudoku is None:
+        return None, clauses
+
+    from Scripts.helpers.sudoku_propagation import propagate_sudoku, PropagationStage
+
+    start_time = time.perf_counter()
+    result = propagate_sudoku(sudoku)
+    end_time = time.perf_counter()
+
+    print(f'Propagation pre-pass: {result.stage.name} in {end_time - start_time} '
+          f'(naked singles: {result.naked_singles}, hidden singles: {result.hidden_singles}, '
+          f'locked candidates: {result.locked_candidates})')
+
+    if result.stage == PropagationStage.SOLVED:
+        print("SATISFIED")
+        print("Solution:")
+        print("=============================================")
+        print(pretty_matrix(result.matrix))
+        print("=============================================")
+        print(f"is sudoku matrix valid? {is_valid_sudoku(result.matrix)}")
+    elif result.stage == PropagationStage.CONTRADICTION:
+        print("UNSATISFIED")
+
+    return result, from_matrix_to_clauses(result.matrix) + clauses
+
+
+def preprocessing_pass(clauses, elimination=True):
+    """
+    Simplify the CNF before solving it.
+
+    :param elimination: run bounded variable elimination, whose long resolvents slow DPLL (it has no learning) down
+    :return: the preprocessing result, whose `extend_model` completes the models of its clauses
+    """
+    from Scripts.helpers.cnf_preprocessor import preprocess
+
+    result = preprocess(clauses, elimination=elimination)
+
+    print(f'Preprocessing:{result.report}')
+    if result.is_unsatisfiable:
+        print("UNSATISFIED")
+
+    return result
+
+
+def open_solution_cache(clauses, sudoku):
+    """
+    Solution cache of the rules of a sudoku CNF, keyed by every clause but the clues.
+
+    :param sudoku: clues of the CNF as a matrix (see `sudoku_clues`). Symmetric variants of a sudoku only share
+    their solutions under the sudoku rules, so there is no cache when it is None
+    :return: the cache, None when SAT_SOLUTION_CACHE is unset or the CNF is not a sudoku
+    """
+    if SOLUTION_CACHE_PATH is None or sudoku is None:
+        return None
+
+    from Scripts.helpers.solution_cache import SolutionCache
+    from Scripts.helpers.sudoku_rules import rules_namespace
+
+    return SolutionCache(SOLUTION_CACHE_PATH, namespace=rules_namespace(clauses))
+
+
+def cached_solution(cache, sudoku, clauses):
+    """:return: the cached solution of `sudoku`, None when there is none or it does not satisfy `clauses`"""
+    matrix = cache.get(sudoku)
+    if matrix is None:
+        return None
+
+    model = {int(literal) for literal in from_matrix_to_cnf(matrix)}
+    if not all(any(literal in model for literal in clause) for clause in clauses):
+        print("Solution cache: the cached solution does not satisfy the CNF, solving it")
+        return None
+
+    return matrix
+
+
+def cache_solution(cache, sudoku, solution):
+    """Store a solution (DIMACS literals) if it is a valid solution of `sudoku`."""
+    matrix = from_clauses_to_matrix([[int(literal)] for literal in solution], len(sudoku))
+
+    if is_valid_sudoku(matrix):
+        cache.put(sudoku, matrix)
+
+
+def solve_batch_with(path, strategy_number, processes):
+    """Solve every sudoku of a puzzle-set file, or every CNF of a directory, into `<path>.out` (see batch_solver)."""
+    from Scripts.batch_solver import solve_batch, OUTPUT_BUFFER_SIZE
+    from Scripts.warm_solver import DPLL, CHB, VSIDS, ADAPTIVE, PROBSAT, LOOKAHEAD
+
+    strategy = {DPLL_STRATEGY: DPLL, CDCL_CHB_STRATEGY: CHB, CDCL_VISIDS_STRATEGY: VSIDS,
+                CDCL_ADAPTIVE_STRATEGY: ADAPTIVE, LOCAL_SEARCH_STRATEGY: PROBSAT, LOOKAHEAD_STRATEGY: LOOKAHEAD}
+    output_path = os.path.normpath(path) + '.out'
+
+    print(f'Solving {path} with {strategy[strategy_number]} in {processes} process(es)...')
+    with open(output_path, 'w', buffering=OUTPUT_BUFFER_SIZE) as output:
+        statuses = solve_batch(path, output, strategy[strategy_number], processes, LOCAL_SEARCH_SEED,
+                               LEMMA_LIBRARY_DIRECTORY, memory_limit_in_bytes())
+
+    print(f'{sum(statuses.values())} instances: {dict(statuses)}, results written to {output_path}')
+
+
+def memory_limit_in_bytes():
+    """:return: the SAT_MEMORY_LIMIT of the CDCL strategies in bytes, None when it is unset"""
+    return int(float(MEMORY_LIMIT) * 2 ** 20) if MEMORY_LIMIT else None
 
 
 def save_output(output_file, data: list[int]):
@@ -90,36 +434,168 @@ def save_output(output_file, data: list[int]):
         output.write(" 0 \n".join(data))
 
 
-if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print("Usage: SAT -Sn inputfile")
-        sys.exit(1)
+def make_heuristics(strategy_number):
+    """:return: the heuristics of a CDCL strategy, only that strategy's module is imported"""
+    if strategy_number == CDCL_CHB_STRATEGY:
+        from Scripts.heuristics.CHB import CHBHeuristics
+        return CHBHeuristics()
+
+    if strategy_number == CDCL_ADAPTIVE_STRATEGY:
+        from Scripts.heuristics.adaptive import AdaptiveHeuristics
+        return AdaptiveHeuristics()
+
+    from Scripts.heuristics.VSIDS import VSIDSHeuristics
+    return VSIDSHeuristics()
+
+
+def main(argv=None):
+    """
+    :param argv: the arguments after the program name, None for `sys.argv`
+    :return: the exit status
+    """
+    arguments = sys.argv[1:] if argv is None else argv
+
+    if len(arguments) not in (2, 3):
+        print("Usage: SAT -Sn inputfile [-Ck | -P | -B[k]]")
+        return 1
+
+    strategy = arguments[0]
+
+    if not strategy.startswith("-S") or not strategy[2:].isdigit() or int(strategy[2:]) > 6 or int(strategy[2:]) == 0:
+        print("Error: Strategy should be specified as '-Sn', where n is 1 (DPLL), 2 (CDCL - CHB), 3 (CDCL - VSIDS), "
+              "4 (CDCL - adaptive VSIDS/CHB), 5 (local search - probSAT) or 6 (lookahead DPLL)")
+        return 1
+
+    count_limit = None
+    is_proof_requested = False
+    batch_processes = None
+    if len(arguments) == 3 and arguments[2].startswith('-B'):
+        batch_option = arguments[2]
+        if batch_option[2:] and (not batch_option[2:].isdigit() or int(batch_option[2:]) == 0):
+            print("Error: Batch mode should be specified as '-B' (one process) or '-Bk', where k is the number of "
+                  "worker processes")
+            return 1
+        batch_processes = int(batch_option[2:] or 1)
+    elif len(arguments) == 3 and arguments[2] == '-P':
+        if int(strategy[2:]) not in (CDCL_CHB_STRATEGY, CDCL_VISIDS_STRATEGY, CDCL_ADAPTIVE_STRATEGY):
+            print("Error: DRAT proofs need a CDCL strategy (-S2, -S3 or -S4)")
+            return 1
+        is_proof_requested = True
+    elif len(arguments) == 3:
+        count_option = arguments[2]
+        if not count_option.startswith("-C") or not count_option[2:].isdigit() or int(count_option[2:]) == 0:
+            print("Error: Counting should be specified as '-Ck', where k is the number of solutions to stop at "
+                  "(-C2 checks uniqueness)")
+            return 1
+        if int(strategy[2:]) in (DPLL_STRATEGY, LOCAL_SEARCH_STRATEGY, LOOKAHEAD_STRATEGY):
+            print("Error: Counting solutions needs a CDCL strategy (-S2, -S3 or -S4)")
+            return 1
+        count_limit = int(count_option[2:])
+
+    file_path = arguments[1]
+
+    if batch_processes is not None:
+        solve_batch_with(file_path, int(strategy[2:]), batch_processes)
+        return 0
 
-    strategy = sys.argv[1]
+    clauses, num_var = read_dimacs_file(file_path)
 
-    if not strategy.startswith("-S") or not strategy[2:].isdigit() or int(strategy[2:]) > 3 or int(strategy[2:]) == 0:
-        print("Error: Strategy should be specified as '-Sn', where n is 1 (DPLL), 2 (CDCL - CHB), or 3 (CDCL - VSIDS)")
-        sys.exit(1)
+    from Scripts.helpers.sudoku_rules import sudoku_clues
 
-    file_path = sys.argv[2]
+    sudoku = sudoku_clues(clauses, num_var)
+    solution_cache = open_solution_cache(clauses, sudoku)
 
-    clauses, num_var = read_dimacs_file(file_path)
+    if solution_cache is not None and count_limit is None:
+        cached_matrix = cached_solution(solution_cache, sudoku, clauses)
+        if cached_matrix is not None:
+            print("Solution cache hit")
+            print("SATISFIED")
+            print("Solution:")
+            print("=============================================")
+            print(pretty_matrix(cached_matrix))
+            print("=============================================")
+            save_output(output_file=file_path + '.out', data=from_matrix_to_cnf(cached_matrix))
+            return 0
+
+    checkpointer = None
+    if CHECKPOINT_PATH and not is_proof_requested:
+        from Scripts.helpers.checkpoint import Checkpointer, problem_fingerprint, DEFAULT_INTERVAL
+
+        interval = float(CHECKPOINT_INTERVAL) if CHECKPOINT_INTERVAL else DEFAULT_INTERVAL
+        checkpointer = Checkpointer(CHECKPOINT_PATH, problem_fingerprint(clauses, num_var), interval)
+
+    # Clauses are only recorded for sudokus, the library of another CNF would only help solving it again
+    lemma_library, clues = None, [clause[0] for clause in clauses if len(clause) == 1]
+    if LEMMA_LIBRARY_DIRECTORY and sudoku is not None and not is_proof_requested:
+        from Scripts.helpers.lemma_library import LemmaLibrary
+
+        lemma_library = LemmaLibrary(clauses, LEMMA_LIBRARY_DIRECTORY)
+
+    # A proof has to refute the input CNF, which the pre-pass and the preprocessing would change
+    pre_pass = None
+    if not is_proof_requested:
+        pre_pass, clauses = propagation_pre_pass(clauses, sudoku)
+
+    if pre_pass is not None and pre_pass.is_resolved:
+        from Scripts.helpers.sudoku_propagation import PropagationStage
+
+        if pre_pass.stage == PropagationStage.SOLVED:
+            save_output(output_file=file_path + '.out', data=from_matrix_to_cnf(pre_pass.matrix))
+            if solution_cache is not None:
+                solution_cache.put(sudoku, pre_pass.matrix)
+
+        if count_limit is not None:
+            # Propagation only makes forced deductions, a sudoku it solves has exactly that solution
+            print(f'Solutions found: {int(pre_pass.stage == PropagationStage.SOLVED)}')
+        return 0
 
     strategy_number = int(strategy[2:])
 
+    if count_limit is not None:
+        print(f'Counting solutions with CDCL (up to {count_limit})...\n\n')
+        count_with_cdcl(clauses, num_var, make_heuristics(strategy_number), count_limit)
+        return 0
+
+    # Not before counting, models differing only on eliminated variables would be counted as one
+    preprocessing = None
+    if USE_PREPROCESSING and not is_proof_requested:
+        preprocessing = preprocessing_pass(clauses, elimination=strategy_number != DPLL_STRATEGY)
+        if preprocessing.is_unsatisfiable:
+            return 0
+        clauses = preprocessing.clauses
+
     is_satisfiable = False
     solution = None
+    # Grid the solution is printed as, 9x9 for CNFs that are not sudokus
+    matrix_length = matrix_length_from_variables(num_var) or 9
+    proof_path = file_path + '.drat' if is_proof_requested else None
 
     if strategy_number == DPLL_STRATEGY:
-        is_satisfiable, solution = solve_with_dpll(clauses)
+        is_satisfiable, solution = solve_with_dpll(clauses, preprocessing, matrix_length)
+
+    elif strategy_number in (CDCL_CHB_STRATEGY, CDCL_VISIDS_STRATEGY, CDCL_ADAPTIVE_STRATEGY):
+        print(CDCL_DESCRIPTIONS[strategy_number] + '\n\n')
+        is_satisfiable, solution = solve_with_cdcl(clauses, make_heuristics(strategy_number), preprocessing,
+                                                   proof_path, lemma_library, clues, checkpointer,
+                                                   memory_limit_in_bytes(), matrix_length)
 
-    elif strategy_number == CDCL_CHB_STRATEGY:
-        print('Solving sudoku with CDCL using CHB heuristics...\n\n')
-        is_satisfiable, solution = solve_with_cdcl(clauses, num_var, CHBHeuristics())
+    elif strategy_number == LOCAL_SEARCH_STRATEGY:
+        print('Solving sudoku with probSAT local search...\n\n')
+        is_satisfiable, solution = solve_with_local_search(clauses, preprocessing, matrix_length)
 
-    elif strategy_number == CDCL_VISIDS_STRATEGY:
-        print('Solving sudoku with CDCL using VSIDS heuristics...\n\n')
-        is_satisfiable, solution = solve_with_cdcl(clauses, num_var, VSIDSHeuristics())
+    elif strategy_number == LOOKAHEAD_STRATEGY:
+        print('Solving sudoku with lookahead DPLL...\n\n')
+        is_satisfiable, solution = solve_with_lookahead(clauses, preprocessing, matrix_length)
 
     if is_satisfiable:
+        solution = list(solution)
         save_output(output_file=file_path + '.out', data=solution)
+
+        if solution_cache is not None:
+            cache_solution(solution_cache, sudoku, solution)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+asyncio facade over the solvers, which are blocking and CPU bound:
+
+    result = await solve_async(puzzle, strategy='chb')
+
+    async for index, result in solve_many_async(puzzles):
+        ...
+
+Problems are solved in a `WorkerPool` of warm worker processes (see `warm_solver.py`) and results are the dicts
+returned by `solve_puzzle` / `solve_cnf`. Cancelling an awaiting task stops the worker process solving its problem.
+"""
+import asyncio
+import atexit
+
+from Scripts.helpers.worker_pool import WorkerPool
+from Scripts.warm_solver import solve_puzzle, solve_cnf, solve_dimacs, warm_up, VSIDS
+
+# Problems `solve_many_async` keeps in flight per worker process by default
+PENDING_PER_PROCESS = 2
+
+_default_pool = None
+
+
+def default_pool():
+    """Pool shared by the calls that do not pass their own, started on first use and stopped at exit."""
+    global _default_pool
+
+    if _default_pool is None:
+        warm_up()
+        _default_pool = WorkerPool(initializer=warm_up)
+        atexit.register(_default_pool.shutdown)
+
+    return _default_pool
+
+
+def solve_problem(problem, strategy=VSIDS):
+    """
+    Solve a sudoku string, a DIMACS string (starting with its `p cnf` line or comments) or a list of clauses.
+    """
+    if not isinstance(problem, str):
+        return solve_cnf([list(clause) for clause in problem], strategy)
+
+    if problem.lstrip().startswith(('p', 'c')):
+        return solve_dimacs(problem, strategy)
+
+    return solve_puzzle(problem, strategy)
+
+
+async def solve_async(problem, strategy=VSIDS, *, pool=None, timeout=None):
+    """
+    Solve one problem (see `solve_problem`) in a worker process.
+
+    :param timeout: seconds after which the worker is stopped and TimeoutError raised
+    """
+    pool = pool or default_pool()
+    future = pool.submit(solve_problem, problem, strategy, timeout=timeout)
+
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        pool.cancel(future)
+        raise
+
+
+async def solve_many_async(problems, strategy=VSIDS, *, pool=None, max_pending=None, timeout=None,
+                           return_exceptions=False):
+    """
+    Solve many problems, yielding `(index, result)` pairs in the order they finish.
+
+    Only `max_pending` problems are submitted at a time (by default two per worker process) and the next ones are
+    only taken from `problems` once results are consumed, so large or lazy inputs (including async iterables) are
+    never loaded all at once. When the iteration stops early or gets cancelled, the remaining problems are
+    cancelled and their workers stopped.
+
+    :param timeout: per problem, see `solve_async`
+    :param return_exceptions: yield a failed problem's exception as its result instead of raising it
+    """
+    pool = pool or default_pool()
+    max_pending = max_pending or PENDING_PER_PROCESS * pool.processes
+
+    problems = _enumerate(problems)
+    pending = {}
+    is_exhausted = False
+
+    try:
+        while True:
+            while not is_exhausted and len(pending) < max_pending:
+                item = await anext(problems, None)
+                if item is None:
+                    is_exhausted = True
+                    break
+
+                index, problem = item
+                future = pool.submit(solve_problem, problem, strategy, timeout=timeout)
+                pending[asyncio.wrap_future(future)] = (index, future)
+
+            if not pending:
+                return
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                index, _ = pending.pop(task)
+                try:
+                    result = task.result()
+                except Exception as error:
+                    if not return_exceptions:
+                        raise
+                    result = error
+
+                yield index, result
+    finally:
+        for task, (_, future) in pending.items():
+            pool.cancel(future)
+            task.cancel()
+
+
+async def _enumerate(problems):
+    if hasattr(problems, '__aiter__'):
+        index = 0
+        async for problem in problems:
+            yield index, problem
+            index += 1
+    else:
+        for item in enumerate(problems):
+            yield item
@@ -0,0 +1,163 @@
+"""
+Batch mode of the command line (`SAT -Sn path -B[k]`): every sudoku of a puzzle-set file, or every DIMACS file of a
+directory, solved in one process or in a pool of `k` warm workers.
+
+The rules are parsed once per process (see `warm_solver`), and sudoku CNFs whose rules are the ones of
+`sudoku_rules/` are solved from their clues like the puzzles of a set. Results are written in input order to one
+buffered stream, in the DIMACS solution format with a comment line per instance:
+
+    c <instance> <status> by <stage> in <seconds>s
+    s SATISFIABLE
+    v 1 -2 -3 ... 0
+
+The models of sudokus assign every cell variable of the rules. The stream ends with comment lines totalling the
+statuses and the stages that resolved the instances.
+"""
+import os
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+from Scripts.helpers.dimacs_reader import read_dimacs_file
+from Scripts.helpers.puzzle_set import PuzzleSet
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix, from_matrix_to_cnf, \
+    from_matrix_to_sudoku_string
+from Scripts.helpers.sudoku_rules import sudoku_clues
+from Scripts.warm_solver import solve_puzzle, solve_cnf, warm_up, VSIDS
+
+CNF_EXTENSION = '.cnf'
+# Instances handed to a worker at a time
+CHUNK_SIZE = 16
+# Literals per `v` line
+LITERALS_PER_LINE = 20
+# Size of the output buffer, in bytes
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+ERROR_STAGE = 'error'
+
+
+def batch_instances(path):
+    """
+    :param path: puzzle-set file (one sudoku string per line) or directory of DIMACS files, taken in name order
+    :return: (name, sudoku string, DIMACS path) of every instance, one of the last two being None
+    """
+    if os.path.isdir(path):
+        for file_name in sorted(os.listdir(path)):
+            if file_name.endswith(CNF_EXTENSION):
+                yield file_name, None, os.path.join(path, file_name)
+        return
+
+    with PuzzleSet(path) as puzzle_set:
+        for index, puzzle in enumerate(puzzle_set, start=1):
+            yield f'{os.path.basename(path)}:{index}', puzzle, None
+
+
+def solve_instance(task):
+    """
+    Solve one instance of `batch_instances`, in a worker process.
+
+    :param task: (name, sudoku string, DIMACS path, strategy, seed, lemma directory, memory limit)
+    :return: dict with the name, the status, the model as DIMACS literals (None when not satisfiable), the stage
+    that resolved the instance, the elapsed time and the error that stopped the solve (None when there is none)
+    """
+    name, puzzle, cnf_path, strategy, seed, lemma_directory, memory_limit = task
+    start_time = time.perf_counter()
+
+    try:
+        if cnf_path is not None:
+            clauses, total_variables = read_dimacs_file(cnf_path)
+            puzzle = _sudoku_of(clauses, total_variables)
+            if puzzle is None:
+                result = solve_cnf(clauses, strategy, seed=seed, memory_limit=memory_limit)
+                return _instance_result(name, result['status'], result['model'], strategy, start_time)
+
+        result = solve_puzzle(puzzle, strategy, seed, lemma_directory, memory_limit)
+        model = None
+        if result['solution'] is not None:
+            model = [int(literal) for literal in from_matrix_to_cnf(from_sudoku_string_to_matrix(result['solution']))]
+
+        return _instance_result(name, result['status'], model, result['stage'], start_time)
+    except Exception as error:
+        return _instance_result(name, 'UNKNOWN', None, ERROR_STAGE, start_time, repr(error))
+
+
+def solve_batch(path, output, strategy=VSIDS, processes=1, seed=0, lemma_directory=None, memory_limit=None):
+    """
+    Solve every instance of `path` and write the results to `output`.
+
+    :param output: text stream the results are written to
+    :param processes: worker processes, 1 solves in this process
+    :param seed: seed of the probSAT local search
+    :param lemma_directory: directory of the learned-clause library of the CDCL strategies, None for no library
+    :param memory_limit: bytes of resident memory a CDCL solve may use in its worker, None for no limit. Instances
+    over it are UNKNOWN
+    :return: Counter of the statuses
+    """
+    start_time = time.perf_counter()
+    tasks = ((name, puzzle, cnf_path, strategy, seed, lemma_directory, memory_limit)
+             for name, puzzle, cnf_path in batch_instances(path))
+    statuses, stages = Counter(), Counter()
+
+    if processes == 1:
+        _write_results(output, map(solve_instance, tasks), statuses, stages)
+    else:
+        # The rules are loaded before the workers are forked, so they do not parse them again
+        matrix_lengths = _matrix_lengths(path)
+        warm_up(matrix_lengths)
+        with Pool(processes, initializer=warm_up, initargs=(matrix_lengths,)) as pool:
+            _write_results(output, pool.imap(solve_instance, tasks, CHUNK_SIZE), statuses, stages)
+
+    elapsed_time = time.perf_counter() - start_time
+    output.write(f'c {sum(statuses.values())} instances in {elapsed_time:.3f}s: '
+                 f'{", ".join(f"{count} {status}" for status, count in statuses.most_common())}\n')
+    output.write(f'c resolved by: {", ".join(f"{stage} {count}" for stage, count in stages.most_common())}\n')
+
+    return statuses
+
+
+def write_result(output, result):
+    """Write the comment, `s` and `v` lines of one `solve_instance` result."""
+    output.write(f'c {result["name"]} {result["status"]} by {result["stage"]} in {result["elapsed_time"]:.4f}s\n')
+    if result['error'] is not None:
+        output.write(f'c {result["name"]} {result["error"]}\n')
+
+    output.write(f's {result["status"]}\n')
+
+    model = result['model']
+    if model is not None:
+        for start in range(0, len(model), LITERALS_PER_LINE):
+            output.write(f'v {" ".join(map(str, model[start:start + LITERALS_PER_LINE]))}\n')
+        output.write('v 0\n')
+
+
+def _write_results(output, results, statuses, stages):
+    for result in results:
+        write_result(output, result)
+        statuses[result['status']] += 1
+        stages[result['stage']] += 1
+
+
+def _instance_result(name, status, model, stage, start_time, error=None):
+    return {
+        'name': name,
+        'status': status,
+        'model': model,
+        'stage': stage,
+        'elapsed_time': time.perf_counter() - start_time,
+        'error': error,
+    }
+
+
+def _sudoku_of(clauses, total_variables):
+    """:return: the sudoku string of a CNF made of clues and the rules of `sudoku_rules/`, None for another CNF"""
+    matrix = sudoku_clues(clauses, total_variables)
+    return from_matrix_to_sudoku_string(matrix) if matrix is not None else None
+
+
+def _matrix_lengths(path):
+    """Grid lengths to warm the workers up with: the one of the first puzzle of a set, 9 for CNF directories."""
+    if os.path.isdir(path):
+        return 9,
+
+    with PuzzleSet(path) as puzzle_set:
+        return (len(from_sudoku_string_to_matrix(puzzle_set[0])),) if len(puzzle_set) else ()
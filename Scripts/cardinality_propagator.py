@@ -0,0 +1,103 @@
+from collections import namedtuple, defaultdict
+from dataclasses import dataclass
+from enum import Enum, auto
+
+# Why a literal got implied by a cardinality constraint: `literal` is the true literal that excluded the others
+# (at-most-one part), or None when every other literal of the constraint is false (at-least-one part).
+CardinalityReason = namedtuple('CardinalityReason', ['constraint', 'literal'])
+
+
+class ConstraintKind(Enum):
+    AT_MOST_ONE = auto()
+    EXACTLY_ONE = auto()
+
+
+@dataclass(frozen=True)
+class CardinalityConstraint:
+    literals: tuple[int, ...]
+    kind: ConstraintKind
+
+    def to_clauses(self):
+        """Pairwise CNF encoding of the constraint."""
+        clauses = [[-first, -second]
+                   for index, first in enumerate(self.literals)
+                   for second in self.literals[index + 1:]]
+
+        if self.kind == ConstraintKind.EXACTLY_ONE:
+            clauses.append(list(self.literals))
+
+        return clauses
+
+
+class CardinalityPropagator:
+    """
+    Counter based propagation of at-most-one / exactly-one constraints.
+
+    Every constraint keeps how many of its literals are true and false, so a literal assignment only touches the
+    constraints it occurs in. Reasons are kept as `CardinalityReason` and only turned into clauses when conflict
+    analysis asks for them.
+    """
+
+    def __init__(self, constraints, true_literals):
+        self.constraints = list(constraints)
+        self.true_literals = true_literals
+
+        self.true_counts = [0] * len(self.constraints)
+        self.false_counts = [0] * len(self.constraints)
+
+        self.occurrences = defaultdict(list)
+        for index, constraint in enumerate(self.constraints):
+            for literal in constraint.literals:
+                self.occurrences[literal].append(index)
+
+    def propagate(self, literal):
+        """
+        Update the counters for a literal that just became true.
+
+        :return: list of (implied literal, CardinalityReason). An implied literal may already be false, which means
+        its reason clause is the conflict.
+        """
+        implications = []
+
+        for index in self.occurrences.get(literal, ()):
+            self.true_counts[index] += 1
+
+            for other in self.constraints[index].literals:
+                if other != literal and -other not in self.true_literals:
+                    implications.append((-other, CardinalityReason(index, literal)))
+
+        for index in self.occurrences.get(-literal, ()):
+            self.false_counts[index] += 1
+            constraint = self.constraints[index]
+
+            if constraint.kind != ConstraintKind.EXACTLY_ONE or self.true_counts[index] > 0:
+                continue
+
+            if self.false_counts[index] >= len(constraint.literals) - 1:
+                implications.append((self._find_last_candidate(constraint), CardinalityReason(index, None)))
+
+        return implications
+
+    def unassign(self, literal):
+        """Undo `propagate` for a literal removed from the trail."""
+        for index in self.occurrences.get(literal, ()):
+            self.true_counts[index] -= 1
+
+        for index in self.occurrences.get(-literal, ()):
+            self.false_counts[index] -= 1
+
+    def reason_clause(self, implied_literal, reason: CardinalityReason):
+        """Clause explaining `implied_literal`, with the implied literal first."""
+        if reason.literal is not None:
+            return [implied_literal, -reason.literal]
+
+        return [implied_literal] + [literal for literal in self.constraints[reason.constraint].literals
+                                    if literal != implied_literal]
+
+    def _find_last_candidate(self, constraint):
+        for literal in constraint.literals:
+            if -literal not in self.true_literals:
+                return literal
+
+        # Every literal is false: implying any of them exposes the conflict.
+        return constraint.literals[0]
@@ -1,15 +1,27 @@
+from array import array
 from collections import namedtuple, defaultdict
+from contextlib import contextmanager
 from dataclasses import dataclass
 from enum import Enum, auto
+from itertools import chain
 
+from Scripts.cardinality_propagator import CardinalityPropagator, CardinalityReason
+from Scripts.clause_arena import ClauseArena, literal_code, literal_from_code, HEADER_SIZE
 from Scripts.experiments.History import HistoryManager
+from Scripts.helpers.checkpoint import Snapshot
 
-Pair = namedtuple('Pair', ['first', 'second'])
+# Reason of a literal implied by a binary clause: the other literal of the clause, which became true.
+BinaryReason = namedtuple('BinaryReason', ['literal'])
+
+# Learned clauses with at most this LBD ("glue" clauses) survive clause database reductions
+GLUE_LBD = 2
 
 
 class SATResult(Enum):
     UNSATISFIABLE = auto()
     SATISFIABLE = auto()
+    # Given up without an answer, e.g. local search out of flips
+    UNKNOWN = auto()
 
 
 class Status(Enum):
@@ -22,7 +34,7 @@ class ClauseStatus(Enum):
     SATISFIED = auto()
     UNSATISFIED = auto()
     UNRESOLVED = auto()
-    UNIT = auto
+    UNIT = auto()
 
 
 class Statistics:
@@ -33,6 +45,18 @@ class Statistics:
         self.successful_backjumps_counter = 0
         self.failed_backjumps_counter = 0
         self.conflicts_counter = 0
+        self.heuristic_switches_counter = 0
+        # (conflicts so far, heuristic switched to) of every switch of an adaptive heuristic
+        self.heuristic_switches = []
+        # Literals removed from the learned clauses by minimization, and the literals left in them
+        self.minimized_literals_counter = 0
+        self.learned_literals_counter = 0
+        # Peak memory of the solve in bytes, see `MemoryMonitor`. The traced one is 0 when allocations are not traced
+        self.peak_rss = 0
+        self.peak_traced_memory = 0
+        # Clause database reductions made to get back under the memory limit, and the learned clauses they deleted
+        self.memory_reductions_counter = 0
+        self.deleted_clauses_counter = 0
 
     def increment_learned_counter(self):
         self.learned_counter += 1
@@ -55,6 +79,34 @@ class Statistics:
     def increment_conflicts_counter(self):
         self.conflicts_counter += 1
 
+    def record_minimization(self, removed_literals, learned_literals):
+        self.minimized_literals_counter += removed_literals
+        self.learned_literals_counter += learned_literals
+
+    def removed_literals_per_clause(self):
+        return self.minimized_literals_counter / self.learned_counter if self.learned_counter else 0.0
+
+    def record_clause_deletion(self, deleted_clauses):
+        self.memory_reductions_counter += 1
+        self.deleted_clauses_counter += deleted_clauses
+
+    def record_memory(self, monitor):
+        """Keep the peaks of a `MemoryMonitor`, the largest ones when a resumed search is measured again."""
+        self.peak_rss = max(self.peak_rss, monitor.peak_rss)
+        self.peak_traced_memory = max(self.peak_traced_memory, monitor.peak_traced_memory)
+
+    def record_heuristic_switch(self, heuristic):
+        self.heuristic_switches_counter += 1
+        self.heuristic_switches.append((self.conflicts_counter, heuristic))
+
+    def state(self):
+        """Counters of a search, to snapshot it (see `checkpoint`)."""
+        return dict(vars(self))
+
+    def restore_state(self, state):
+        vars(self).update(state)
+        self.heuristic_switches = [tuple(switch) for switch in self.heuristic_switches]
+
     def __str__(self):
         return f"""
         Learned clauses: {self.learned_counter}
@@ -63,6 +115,12 @@ class Statistics:
         Amount of conflicts: {self.conflicts_counter}
         Amount of successful backjumps: {self.successful_backjumps_counter}
         Amount of failed backjumps: {self.failed_backjumps_counter}
+        Amount of heuristic switches: {self.heuristic_switches_counter}
+        Literals removed by minimization: {self.minimized_literals_counter} \
+({self.removed_literals_per_clause():.2f} per learned clause)
+        Peak memory: {self.peak_rss / 2 ** 20:.1f} MiB RSS, {self.peak_traced_memory / 2 ** 20:.1f} MiB traced
+        Clause database reductions: {self.memory_reductions_counter} \
+({self.deleted_clauses_counter} learned clauses deleted)
         """
 
 
@@ -74,118 +132,460 @@ class CDCLResult:
 
 
 class CDCLSatSolver:
-    def __init__(self, clauses, total_variables, heuristics):
-        self.clauses = clauses
+    """
+    :param proof: `DRATWriter` logging the learned clauses of `solve`, ending with the empty clause when the clauses
+    are unsatisfiable. Lemmas are RUP with respect to the clauses given here (cardinality constraints included as
+    the pairwise clauses they were detected from)
+    :param lemma_log: list the learned clauses are appended to, as (LBD, literals), e.g. for a `LemmaLibrary`
+    :param checkpointer: `Checkpointer` saving snapshots of the search, and stopping it when asked to
+    :param memory_monitor: `MemoryMonitor` measuring `solve` and `resume`. Over its limit, the learned clauses are
+    reduced, and the search stops with UNKNOWN when that is not enough
+    """
+
+    def __init__(self, clauses, total_variables, heuristics, cardinality_constraints=(), proof=None, lemma_log=None,
+                 checkpointer=None, memory_monitor=None):
+        self.input_clauses = clauses
+        self.clauses = ClauseArena()
         self.total_variables = total_variables
         self.assignment = []
         self.decision_levels = []
 
+        # Per-variable and per-literal state lives in arrays, which stay small when the variables are dense
+        # (see `VariableRenumbering`)
+        largest_variable = max(chain([total_variables], (abs(literal) for clause in clauses for literal in clause),
+                                     (abs(literal) for constraint in cardinality_constraints
+                                      for literal in constraint.literals)))
+
+        self.true_literals = set()
+        self.levels = [0] * (largest_variable + 1)
+        self.reasons = [None] * (largest_variable + 1)
+        # Conflict analysis marks: variables of the clause being learned, and the ones shown to be implied by it
+        self.seen = bytearray(largest_variable + 1)
+        self.propagation_head = 0
+        self.binary_propagation_head = 0
+
         self.heuristics = heuristics
         self.statistics = Statistics()
+        self.proof = proof
+        self.lemma_log = lemma_log
+        self.checkpointer = checkpointer
+        self.memory_monitor = memory_monitor
+        # (LBD, literals) of the learned binary clauses, which are not kept in the arena
+        self.learned_binary_clauses = []
+        # Decisions of a resumed search, taken before the heuristic is asked, newest last
+        self.replayed_decisions = []
 
-        self.literal_watch = defaultdict(list)
-        self.clauses_literal_watched = defaultdict(list)
+        # Indexed by `literal_code`
+        self.literal_watch = [[] for _ in range(2 * largest_variable + 2)]
+        self.binary_implications = [array('i') for _ in range(2 * largest_variable + 2)]
+
+        self.cardinality = CardinalityPropagator(cardinality_constraints, self.true_literals)
 
         self.historyManager = HistoryManager()
 
-    def solve(self):
+    def solve(self, lemmas=()):
+        """:param lemmas: (LBD, literals) of clauses implied by the input clauses to start with, see `add_lemmas`"""
+        with self.monitoring_memory():
+            if not self.prepare() or not self.add_lemmas(lemmas):
+                return self.refuted()
+
+            return self.search()
+
+    def resume(self, snapshot):
+        """Solve, starting from the clauses and scores of a `snapshot` of an earlier solve of the same clauses."""
+        with self.monitoring_memory():
+            if not self.restore(snapshot):
+                return self.refuted()
+
+            return self.search()
+
+    @contextmanager
+    def monitoring_memory(self):
+        """Run the `with` block under the memory monitor, and record its peaks in the statistics."""
+        if self.memory_monitor is None:
+            yield
+            return
+
+        with self.memory_monitor:
+            yield
+        self.statistics.record_memory(self.memory_monitor)
+
+    def restore(self, snapshot):
+        """:return: False when the clauses are unsatisfiable, see `prepare`"""
+        if not self.prepare() or not self.add_lemmas(snapshot.lemmas):
+            return False
+
+        self.heuristics.restore_state(snapshot.heuristics)
+        self.statistics.restore_state(snapshot.statistics)
+        self.replayed_decisions = snapshot.decisions[::-1]
+        return True
+
+    def snapshot(self) -> Snapshot:
+        """What the search learned so far: the literals of level 0, the learned clauses, scores and statistics."""
+        level_zero = self.assignment[:self.decision_levels[0]] if self.decision_levels else self.assignment
+        lemmas = [(1, [literal]) for literal in level_zero]
+        lemmas += [(self.clauses.lbd(reference), self.clauses.literals(reference).tolist())
+                   for reference in self.clauses.references if self.clauses.is_learned(reference)]
+        lemmas += self.learned_binary_clauses
+        decisions = [self.assignment[trail_index] for trail_index in self.decision_levels]
+
+        return Snapshot(lemmas, decisions, self.heuristics.state(), self.statistics.state())
+
+    def decide(self, assigned_literals):
+        """Next decision: the next unassigned decision of a resumed search, then the heuristic's."""
+        while self.replayed_decisions:
+            literal = self.replayed_decisions.pop()
+            if literal not in assigned_literals and -literal not in assigned_literals:
+                return literal
+
+        return self.heuristics.decide(assigned_literals)
+
+    def checkpoint(self):
+        """
+        Save a snapshot when the checkpointer asks for one.
+
+        :return: True when the search has to stop
+        """
+        if not self.checkpointer.is_due():
+            return False
+
+        self.checkpointer.save(self)
+        return self.checkpointer.is_stop_requested
+
+    def free_memory(self):
+        """
+        Reduce the clause database, the memory monitor being over its limit.
+
+        :return: False when the memory is still over the limit, and the search has to stop
+        """
+        self.reduce_clause_database()
+        return not self.memory_monitor.sample()
+
+    def reduce_clause_database(self):
+        """
+        Delete the worse half of the learned clauses of the arena, the ones with the largest LBD and then the least
+        activity. Glue clauses (LBD <= GLUE_LBD) and the reasons of assigned literals are kept. Learned binary
+        clauses are not in the arena, and are kept too.
 
-        self.unit_propagation()
-        if self.clauses == Status.CONFLICT:
-            return CDCLResult(self.assignment, SATResult.UNSATISFIABLE, self.statistics)
+        :return: the number of deleted clauses
+        """
+        clauses, locked = self.clauses, self.locked_clauses()
+        candidates = [reference for reference in clauses.references if clauses.is_learned(reference)
+                      and clauses.lbd(reference) > GLUE_LBD and reference not in locked]
+        candidates.sort(key=lambda reference: (-clauses.lbd(reference), clauses.activity(reference)))
+        deleted = set(candidates[:len(candidates) // 2])
+
+        if self.proof is not None:
+            for reference in deleted:
+                self.proof.delete(clauses.literals(reference).tolist())
+
+        self.compact_clauses(deleted)
+        self.statistics.record_clause_deletion(len(deleted))
+        return len(deleted)
+
+    def locked_clauses(self):
+        """References of the arena clauses that are the reason of an assigned literal."""
+        return {self.reasons[abs(literal)] for literal in self.assignment
+                if isinstance(self.reasons[abs(literal)], int)}
+
+    def compact_clauses(self, deleted):
+        """Drop the `deleted` clause references from the arena, then move the reasons and watches along."""
+        moved = self.clauses.compact(deleted)
+
+        for literal in self.assignment:
+            reason = self.reasons[abs(literal)]
+            if isinstance(reason, int):
+                self.reasons[abs(literal)] = moved[reason]
+
+        self.literal_watch = [[] for _ in self.literal_watch]
+        for reference in self.clauses.references:
+            self.watch(reference)
+
+    def interrupted(self):
+        """Result of a search stopped before it found an answer."""
+        return CDCLResult([], SATResult.UNKNOWN, self.statistics)
+
+    def refuted(self):
+        """Result of unsatisfiable clauses, whose proof ends with the empty clause."""
+        if self.proof is not None:
+            self.proof.add([])
+
+        return CDCLResult(self.assignment, SATResult.UNSATISFIABLE, self.statistics)
+
+    def prepare(self):
+        """
+        Simplify the input clauses, move them into the arena and initialize the heuristic scores. A solver is
+        prepared once, the searches that follow reuse its clauses and scores.
+
+        :return: False when the input clauses are already unsatisfiable
+        """
+        if self.unit_propagation() == Status.CONFLICT:
+            return False
 
         self.initialize_watch_list()
-        self.heuristics.initialize_scores(self.clauses)
+        self.heuristics.initialize_scores(chain(self.clauses, self.binary_clauses(),
+                                                (constraint.literals for constraint in self.cardinality.constraints)))
+        return True
 
-        while not self.are_all_variables_assigned():  # While variables remain to assign
-            variable = self.heuristics.decide(self.assignment)  # Decide : Pick a variable
+    def add_lemmas(self, lemmas):
+        """
+        Add clauses implied by the input clauses (e.g. from a `LemmaLibrary`) to a prepared solver, at level 0, as
+        learned clauses. Unlike the input clauses they do not weigh in the initial heuristic scores.
 
-            ###added by rith!!!!
-            if variable is None:
-                # No variable to decide, meaning the solution is SAT
-                return CDCLResult(self.assignment, SATResult.SATISFIABLE, self.statistics)
+        :param lemmas: (LBD, literals) of every clause
+        :return: False when a clause is false at level 0, meaning the input clauses are unsatisfiable
+        """
+        true_literals = set(self.assignment)
 
-            self.assign(variable)
-            conflict = self.two_watch_propagate(variable)
+        for lbd, literals in lemmas:
+            if any(literal in true_literals for literal in literals):
+                continue
 
-            while conflict != -1:
+            literals = [literal for literal in literals if -literal not in true_literals]
+            if not literals:
+                return False
+
+            self.add_lemma(literals, lbd)
+            if len(literals) == 1:
+                true_literals.add(literals[0])
+
+        return True
+
+    def add_lemma(self, literals, lbd):
+        """Add a clause with no literal assigned at level 0, see `add_lemmas`."""
+        if len(literals) == 1:
+            self.enqueue(literals[0])
+        elif len(literals) == 2:
+            self.add_binary_implications(literals)
+            self.learned_binary_clauses.append((lbd, literals))
+        else:
+            self.watch(self.clauses.add(literals, learned=True, lbd=lbd))
+
+    def search(self):
+        """CDCL search from the current trail, until every variable is assigned or a level 0 conflict is found."""
+        conflict = self.two_watch_propagate()
+
+        while True:
+            while conflict is not None:
                 self.heuristics.conflict(conflict)
 
-                learned_clause = self.analyze_conflict()  # Diagnose Conflict
+                if not self.decision_levels:
+                    self.statistics.increment_failed_backjumps_counter()
+                    return self.refuted()
+
+                learned_clause, backjump_level = self.analyze_conflict(conflict)  # Diagnose Conflict
 
+                self.statistics.update_implications_counter(self.calculate_implications())
+
+                self.backjump(backjump_level)
                 self.learn_clauses(learned_clause)
                 self.statistics.increment_learned_counter()
 
-                self.statistics.update_implications_counter(self.calculate_implications())
+                if self.memory_monitor is not None and self.memory_monitor.is_over_limit and not self.free_memory():
+                    return self.interrupted()
 
-                jump_status, variable = self.backjump()
+                if self.checkpointer is not None and self.checkpoint():
+                    return self.interrupted()
 
-                if jump_status == Status.FAILED:
-                    return SATResult.UNSATISFIABLE
-                self.assignment.append(variable)
-                conflict = self.two_watch_propagate(variable)
+                conflict = self.two_watch_propagate()
+
+            if self.are_all_variables_assigned():
+                break
+
+            variable = self.decide(self.assignment)  # Decide : Pick a variable
+
+            if not variable:
+                # No variable to decide, meaning the solution is SAT
+                break
+
+            self.assign(variable)
+            conflict = self.two_watch_propagate()
 
         return CDCLResult(self.assignment, SATResult.SATISFIABLE, self.statistics)
 
+    def enumerate_solutions(self, limit=None, projection=None):
+        """
+        Find models one after the other. Every model found is blocked with a clause and the search resumes from
+        the trail left by the backjump, keeping learned clauses and heuristic scores, so each further model costs
+        an incremental search rather than a cold start.
+
+        :param limit: stop after this many models (None: all of them)
+        :param projection: variables the models are told apart by, e.g. the cell variables of a sudoku. Models that
+        agree on them are reported once, as their projected literals. None enumerates complete models by blocking
+        their decisions.
+        :return: generator of models (lists of literals)
+        """
+        if not self.prepare():
+            return
+
+        projection = None if projection is None else set(projection)
+        found = 0
+
+        while limit is None or found < limit:
+            if self.search().status != SATResult.SATISFIABLE or \
+                    self.complete_model().status != SATResult.SATISFIABLE:
+                return
+
+            found += 1
+
+            if projection is None:
+                model = list(self.assignment)
+                blocking_clause = [-self.assignment[trail_index] for trail_index in self.decision_levels]
+            else:
+                model = [literal for literal in self.assignment if abs(literal) in projection]
+                blocking_clause = [-literal for literal in model]
+
+            yield model
+
+            if not self.add_blocking_clause(blocking_clause):
+                return
+
+    def complete_model(self):
+        """
+        Decide every variable a satisfying search left unassigned, searching on after each decision. The heuristic
+        stops at the variables it has no score for (e.g. ones in no clause), and a model missing them would stand
+        for every assignment of them at once, so enumeration would block all of those models with one clause.
+
+        :return: the result of the last search, with every variable assigned when it is satisfiable
+        """
+        result = CDCLResult(self.assignment, SATResult.SATISFIABLE, self.statistics)
+        variable = 1
+
+        while variable < len(self.levels):
+            if variable in self.true_literals or -variable in self.true_literals:
+                variable += 1
+                continue
+
+            self.assign(-variable)
+            result = self.search()
+            if result.status != SATResult.SATISFIABLE:
+                return result
+
+            # The search may have backjumped over variables assigned before
+            variable = 1
+
+        return result
+
+    def count_solutions(self, limit=None, projection=None):
+        """Number of models, counting at most `limit` of them. See `enumerate_solutions`."""
+        return sum(1 for _ in self.enumerate_solutions(limit, projection))
+
+    def has_unique_solution(self, projection=None):
+        """True when there is exactly one model (on the `projection` variables): one search plus one to refute."""
+        return self.count_solutions(2, projection) == 1
+
+    def add_blocking_clause(self, clause):
+        """
+        Add a clause falsified by the current model and backjump to where it stops being false: asserting its
+        literal of the deepest level when that level holds only one of them.
+
+        :return: False when every literal of the clause is false at level 0, meaning no model is left
+        """
+        clause = sorted(clause, key=lambda literal: self.levels[abs(literal)], reverse=True)
+
+        if not clause or self.levels[abs(clause[0])] == 0:
+            return False
+
+        if len(clause) == 1:
+            self.backjump(0)
+            self.enqueue(clause[0])
+            return True
+
+        deepest_level, second_level = self.levels[abs(clause[0])], self.levels[abs(clause[1])]
+        is_asserting = second_level < deepest_level
+        self.backjump(second_level if is_asserting else deepest_level - 1)
+
+        if len(clause) == 2:
+            self.add_binary_implications(clause)
+            reason = BinaryReason(-clause[1])
+        else:
+            reason = self.clauses.add(clause)
+            self.watch(reason)
+
+        if is_asserting:
+            self.enqueue(clause[0], reason)
+
+        return True
+
     def calculate_implications(self):
         return self.statistics.implications_counter + len(self.assignment) - len(self.decision_levels)
 
     def unit_propagation(self):
-        flag = True
-        while flag:
-            flag = False
+        """
+        Simplify the input clauses with their units, and the units those imply, leaving the remaining clauses in
+        `input_clauses`. Clauses are found through occurrence lists, so every clause is visited once per literal.
+        """
+        occurrences = defaultdict(list)
+        for index, clause in enumerate(self.input_clauses):
+            for literal in clause:
+                occurrences[literal].append(index)
 
-            new_clauses = self.clauses
+        units = [clause[0] for clause in self.input_clauses if len(clause) == 1]
+        is_satisfied = bytearray(len(self.input_clauses))
 
-            for clause in self.clauses:
-                if len(clause) == 1:
-                    unit = clause[0]
-                    status, new_clauses = self.boolean_constraint_propagation(new_clauses, unit)
-                    self.assignment.append(unit)
-                    flag = True
-                    if status == Status.CONFLICT:
-                        self.on_conflict_found()
-                        return status
+        while units:
+            unit = units.pop()
+            if unit in self.true_literals:
+                continue
+            if -unit in self.true_literals:
+                self.on_conflict_found()
+                return Status.CONFLICT
+
+            self.enqueue(unit)
+
+            for index in occurrences[unit]:
+                is_satisfied[index] = True
+
+            for index in occurrences[-unit]:
+                if is_satisfied[index]:
+                    continue
 
-                self.clauses = new_clauses
+                clause = self.input_clauses[index]
+                clause[:] = [literal for literal in clause if literal != -unit]
 
-                if not new_clauses:
+                if not clause:
                     self.on_conflict_found()
                     return Status.CONFLICT
+                if len(clause) == 1:
+                    units.append(clause[0])
 
+        self.input_clauses = [clause for index, clause in enumerate(self.input_clauses) if not is_satisfied[index]]
         return Status.SUCCESS
 
-    @staticmethod
-    def boolean_constraint_propagation(clauses, literal):
-        new_clauses = [clause for clause in clauses]
-        for clause in reversed(new_clauses):
-            if literal in clause:
-                new_clauses.remove(clause)
-            if -literal in clause:
-                clause.remove(-literal)
-                if not clause:
-                    return Status.CONFLICT, []
-        return Status.SUCCESS, new_clauses
-
     def on_conflict_found(self):
         self.statistics.increment_conflicts_counter()
         self.historyManager.add_conflict(self.statistics.conflicts_counter)
 
     def initialize_watch_list(self):
-        for clause_index, clause in enumerate(self.clauses):
-            unassigned_literals = [lit for lit in clause if lit not in self.assignment]
-
-            if len(unassigned_literals) < 2:
-                continue
-
-            watched_literals = unassigned_literals[:2]
-
-            self.clauses_literal_watched[clause_index] = watched_literals
-
-            for lit in watched_literals:
-                self.literal_watch[lit].append(clause_index)
-
-        return self.literal_watch, self.clauses_literal_watched
+        """
+        Move the simplified input clauses into the clause arena and watch them. Binary clauses only live in the
+        implication lists.
+        """
+        for clause in self.input_clauses:
+            if len(clause) == 2:
+                self.add_binary_implications(clause)
+            elif len(clause) > 2:
+                self.watch(self.clauses.add(clause))
+
+        self.input_clauses = []
+
+    def watch(self, reference):
+        literals = self.clauses.literals(reference)
+        self.literal_watch[literal_code(literals[0])].append(reference)
+        self.literal_watch[literal_code(literals[1])].append(reference)
+
+    def add_binary_implications(self, clause):
+        first, second = clause
+        self.binary_implications[literal_code(-first)].append(second)
+        self.binary_implications[literal_code(-second)].append(first)
+
+    def binary_clauses(self):
+        """Every binary clause, rebuilt from the implication lists."""
+        for code, implied_literals in enumerate(self.binary_implications):
+            literal = literal_from_code(code)
+            for implied_literal in implied_literals:
+                if code < literal_code(implied_literal):
+                    yield -literal, implied_literal
 
     def are_all_variables_assigned(self):
         return True if len(self.assignment) >= self.total_variables else False
@@ -195,95 +595,279 @@ class CDCLSatSolver:
 
         self.statistics.increment_decision_counter()
 
-        self.assignment.append(variable)
-
-    def two_watch_propagate(self, variable):
-        propagation_queue = [variable]
-        while len(propagation_queue) != 0:
-            variable = propagation_queue.pop()
-
-            for affected_clause_num in reversed(self.literal_watch[-variable]):
-                affected_clause = self.clauses[affected_clause_num]
-                watched_clauses = Pair(self.clauses_literal_watched[affected_clause_num][0],
-                                       self.clauses_literal_watched[affected_clause_num][1])
-
-                previously_watched_clauses = watched_clauses
-                status, watched_clauses, unit = self.evaluate_clause_status(affected_clause, watched_clauses)
-                if status == ClauseStatus.UNIT:
-                    propagation_queue.append(unit)
-                    self.assignment.append(unit)
-                    self.statistics.increment_implications_counter()
-                elif status == ClauseStatus.UNSATISFIED:
+        self.enqueue(variable)
+
+    def enqueue(self, literal, reason=None):
+        """Put a literal on the trail at the current decision level, remembering why it was implied."""
+        self.assignment.append(literal)
+        self.true_literals.add(literal)
+        self.levels[abs(literal)] = len(self.decision_levels)
+        self.reasons[abs(literal)] = reason
+
+    def imply(self, literal, reason):
+        """Enqueue an implied literal. Returns the conflicting clause when the literal is already false."""
+        if literal in self.true_literals:
+            return None
+
+        if -literal in self.true_literals:
+            self.on_conflict_found()
+            return self.reason_clause(literal, reason)
+
+        self.enqueue(literal, reason)
+        self.statistics.increment_implications_counter()
+        return None
+
+    def reason_clause(self, literal, reason):
+        """Clause that became unit (or false) and implied `literal`."""
+        if isinstance(reason, BinaryReason):
+            return [literal, -reason.literal]
+
+        if isinstance(reason, CardinalityReason):
+            return self.cardinality.reason_clause(literal, reason)
+
+        return self.clauses.literals(reason)
+
+    def two_watch_propagate(self):
+        while self.propagation_head < len(self.assignment):
+            conflict = self.propagate_binary_clauses()
+            if conflict is not None:
+                return conflict
+
+            literal = self.assignment[self.propagation_head]
+            self.propagation_head += 1
+
+            if self.cardinality.constraints:
+                for implied_literal, reason in self.cardinality.propagate(literal):
+                    conflict = self.imply(implied_literal, reason)
+                    if conflict is not None:
+                        return conflict
+
+            if self.literal_watch[literal_code(-literal)]:
+                conflict = self.propagate_watched_clauses(-literal)
+                if conflict is not None:
+                    return conflict
+
+        return None
+
+    def propagate_binary_clauses(self):
+        """Propagate the implication lists of every literal on the trail, before any long clause is visited."""
+        true_literals = self.true_literals
+
+        while self.binary_propagation_head < len(self.assignment):
+            literal = self.assignment[self.binary_propagation_head]
+            self.binary_propagation_head += 1
+
+            for implied_literal in self.binary_implications[literal_code(literal)]:
+                if implied_literal in true_literals:
+                    continue
+
+                if -implied_literal in true_literals:
                     self.on_conflict_found()
-                    return affected_clause
+                    return [implied_literal, -literal]
+
+                self.enqueue(implied_literal, BinaryReason(literal))
+                self.statistics.increment_implications_counter()
+
+        return None
+
+    def propagate_watched_clauses(self, false_literal):
+        code = literal_code(false_literal)
+        watching_clauses = self.literal_watch[code]
+        self.literal_watch[code] = still_watching = []
+
+        for position, reference in enumerate(watching_clauses):
+            status, unit = self.evaluate_clause_status(reference, false_literal)
+
+            if status == ClauseStatus.UNRESOLVED:
+                # The clause found another literal to watch instead of the false one
+                continue
 
-                for _, value in previously_watched_clauses._asdict().items():
-                    self.literal_watch[value].remove(affected_clause_num)
+            still_watching.append(reference)
 
-                for index, (_, clause_value) in enumerate(watched_clauses._asdict().items()):
-                    self.clauses_literal_watched[affected_clause_num][index] = clause_value
-                    self.literal_watch[clause_value].append(affected_clause_num)
+            if status == ClauseStatus.UNIT:
+                self.imply(unit, reference)
+            elif status == ClauseStatus.UNSATISFIED:
+                still_watching.extend(watching_clauses[position + 1:])
+                self.on_conflict_found()
+                return self.clauses.literals(reference)
 
-        return -1
+        return None
 
-    def evaluate_clause_status(self, clause, watched_clauses):
+    def evaluate_clause_status(self, reference, false_literal):
+        """
+        Check a clause whose watched `false_literal` just became false. The watched literals are the first two of
+        the clause in the arena; the false one is moved to the second position, or swapped with a new literal to
+        watch.
+        """
         unit = 0
-        if self.are_watched_clauses_already_assigned(watched_clauses):
-            return ClauseStatus.SATISFIED, watched_clauses, unit
-
-        unassigned_literals = []
-        for literal in clause:
-            if -literal not in self.assignment:
-                unassigned_literals.append(literal)
-            if literal in self.assignment:
-                clauses_to_watch = self.determine_clauses_to_watch(literal, watched_clauses)
-
-                return ClauseStatus.SATISFIED, clauses_to_watch, unit
-
-        if len(unassigned_literals) == 1:
-            return ClauseStatus.UNIT, watched_clauses, unassigned_literals[0]
-        if len(unassigned_literals) == 0:
-            return ClauseStatus.UNSATISFIED, watched_clauses, unit
-        else:
-            return ClauseStatus.UNRESOLVED, Pair(unassigned_literals[0], unassigned_literals[1]), unit
+        data = self.clauses.data
+        start = reference + HEADER_SIZE
+
+        if data[start] == false_literal:
+            data[start], data[start + 1] = data[start + 1], false_literal
+
+        other_watch = data[start]
+        if other_watch in self.true_literals:
+            return ClauseStatus.SATISFIED, unit
 
-    def are_watched_clauses_already_assigned(self, watched_clauses):
-        return watched_clauses.first in self.assignment or watched_clauses.second in self.assignment
+        for index in range(start + 2, start + self.clauses.size(reference)):
+            literal = data[index]
+            if -literal not in self.true_literals:
+                data[start + 1], data[index] = literal, false_literal
+                self.literal_watch[literal_code(literal)].append(reference)
+                return ClauseStatus.UNRESOLVED, unit
 
-    def determine_clauses_to_watch(self, literal, watched_clauses):
-        if -watched_clauses.first not in self.assignment:
-            return Pair(watched_clauses.first, literal)
+        if -other_watch in self.true_literals:
+            return ClauseStatus.UNSATISFIED, unit
 
-        return Pair(literal, watched_clauses.second)
+        return ClauseStatus.UNIT, other_watch
 
-    def analyze_conflict(self):
+    def analyze_conflict(self, conflict_clause):
+        """
+        First UIP conflict analysis: resolve the conflict clause with the reasons of the current decision level
+        literals, newest first, until a single literal of the current level is left.
+
+        :return: the learned clause (asserting literal first, then the literal of the backjump level) and the
+        backjump level.
+        """
+        current_level = len(self.decision_levels)
+        seen = self.seen
         learn = []
-        for level in self.decision_levels:
-            learn.append(-self.assignment[level])
-        return learn
+        pending = 0
+        trail_index = len(self.assignment) - 1
+        clause, literal = conflict_clause, None
+
+        while True:
+            for clause_literal in clause:
+                variable = abs(clause_literal)
+                if clause_literal == literal or seen[variable] or self.levels[variable] == 0:
+                    continue
+
+                seen[variable] = True
+                if self.levels[variable] == current_level:
+                    pending += 1
+                else:
+                    learn.append(clause_literal)
+
+            while not seen[abs(self.assignment[trail_index])]:
+                trail_index -= 1
+
+            literal = self.assignment[trail_index]
+            trail_index -= 1
+            pending -= 1
+            # Resolved away: only the literals of the learned clause stay marked
+            seen[abs(literal)] = False
+
+            if pending <= 0:
+                break
+
+            reason = self.reasons[abs(literal)]
+            if isinstance(reason, int) and self.clauses.is_learned(reason):
+                self.clauses.bump_activity(reason)
+
+            clause = self.reason_clause(literal, reason)
+
+        learn = self.minimize(learn)
+
+        backjump_level = 0
+        if learn:
+            deepest = max(range(len(learn)), key=lambda index: self.levels[abs(learn[index])])
+            learn[0], learn[deepest] = learn[deepest], learn[0]
+            backjump_level = self.levels[abs(learn[0])]
+
+        return [-literal] + learn, backjump_level
+
+    def minimize(self, learn):
+        """
+        Recursive learned-clause minimization: drop the literals implied by the other literals of the clause, i.e.
+        whose reasons only lead (through the implication graph) to literals of the clause or of level 0.
+
+        :param learn: literals of the learned clause below the conflict level, marked in `seen`
+        :return: the literals that are not redundant. `seen` is cleared.
+        """
+        # One bit per decision level of the clause: a reason with a literal of another level can not be redundant
+        abstract_levels = 0
+        for literal in learn:
+            abstract_levels |= 1 << (self.levels[abs(literal)] & 31)
+
+        marked = [abs(literal) for literal in learn]
+        minimized = [literal for literal in learn
+                     if self.reasons[abs(literal)] is None or not self.is_redundant(literal, abstract_levels, marked)]
+
+        for variable in marked:
+            self.seen[variable] = False
+
+        self.statistics.record_minimization(len(learn) - len(minimized), len(minimized) + 1)
+        return minimized
+
+    def is_redundant(self, literal, abstract_levels, marked):
+        """
+        True when the false `literal` is implied by the marked literals. Literals proven redundant on the way stay
+        marked (added to `marked`) so they are not explored again, the ones of a failed attempt are unmarked.
+        """
+        seen, levels, reasons = self.seen, self.levels, self.reasons
+        first_marked = len(marked)
+        stack = [literal]
+
+        while stack:
+            true_literal = -stack.pop()
+
+            for reason_literal in self.reason_clause(true_literal, reasons[abs(true_literal)]):
+                variable = abs(reason_literal)
+                if reason_literal == true_literal or seen[variable] or levels[variable] == 0:
+                    continue
+
+                if reasons[variable] is None or not abstract_levels & (1 << (levels[variable] & 31)):
+                    for marked_variable in marked[first_marked:]:
+                        seen[marked_variable] = False
+                    del marked[first_marked:]
+                    return False
+
+                seen[variable] = True
+                marked.append(variable)
+                stack.append(reason_literal)
+
+        return True
 
     def learn_clauses(self, learned_clause):
+        # The asserting literal was unassigned by the backjump, it is the only literal of its (conflict) level
+        lbd = len({self.levels[abs(literal)] for literal in learned_clause[1:]}) + 1
+        self.heuristics.learned(lbd, self.statistics)
+
+        if self.proof is not None:
+            self.proof.add(learned_clause)
+        if self.lemma_log is not None:
+            self.lemma_log.append((lbd, learned_clause))
+
         if len(learned_clause) == 1:
-            self.assignment.append(learned_clause[0])
+            self.enqueue(learned_clause[0])
+            return
 
-        if len(learned_clause) > 1:
-            self.clauses.append(learned_clause)
-            learned_clauses = learned_clause[:2]
-            index = len(self.clauses) - 1
-            self.clauses_literal_watched[index] = learned_clauses
+        if len(learned_clause) == 2:
+            self.add_binary_implications(learned_clause)
+            self.learned_binary_clauses.append((lbd, list(learned_clause)))
+            self.enqueue(learned_clause[0], BinaryReason(-learned_clause[1]))
+            return
 
-            for item in learned_clauses:
-                self.literal_watch[item].append(index)
+        reference = self.clauses.add(learned_clause, learned=True, lbd=lbd)
 
-    def backjump(self):
-        if not self.decision_levels:
-            self.statistics.increment_failed_backjumps_counter()
-            return Status.FAILED, -1
+        self.watch(reference)
+        self.enqueue(learned_clause[0], reference)
 
-        decision_level = self.decision_levels.pop()
-        literal = self.assignment[decision_level]
-        del self.assignment[decision_level:]
+    def backjump(self, level):
+        """Undo every assignment made above `level`."""
+        trail_index = self.decision_levels[level]
 
-        self.statistics.increment_successful_backjumps_counter()
+        for literal in self.assignment[trail_index:self.propagation_head]:
+            self.cardinality.unassign(literal)
+
+        for literal in self.assignment[trail_index:]:
+            self.true_literals.discard(literal)
+            self.reasons[abs(literal)] = None
 
-        return Status.SUCCESS, -literal
+        del self.assignment[trail_index:]
+        del self.decision_levels[level:]
+        self.propagation_head = trail_index
+        self.binary_propagation_head = trail_index
+
+        self.statistics.increment_successful_backjumps_counter()
@@ -0,0 +1,575 @@
+"""
+Propagation, conflict-analysis and backjump kernels of the CDCL solver over flat int32 arrays, compiled with Numba
+when it is installed.
+
+`KernelCDCLSatSolver` runs the watch scan, the unit enqueue, first UIP analysis with clause minimization and the
+backjumps as kernels over the `ClauseArena` data and per-variable arrays, leaving only the decisions, the heuristics
+and adding learned clauses to Python. Watch lists are linked lists threaded through an array parallel to the arena,
+so a kernel moves a watch from one literal to another without allocating anything.
+
+Without Numba the kernels still run, as plain Python over NumPy arrays, which is much slower than `CDCLSatSolver`.
+`select_backend` only picks them when Numba is available.
+"""
+import os
+
+import numpy as np
+
+from Scripts.cdcl_heuristics_solver import CDCLSatSolver, CDCLResult, SATResult
+from Scripts.clause_arena import HEADER_SIZE, SIZE_OFFSET, FLAGS_OFFSET, ACTIVITY_OFFSET, LEARNED_FLAG, literal_code
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+AUTO_BACKEND = 'auto'
+PYTHON_BACKEND = 'python'
+NUMBA_BACKEND = 'numba'
+BACKENDS = (AUTO_BACKEND, PYTHON_BACKEND, NUMBA_BACKEND)
+
+# Backend of `make_cdcl_solver` when none is given. `auto` uses the Numba kernels when Numba is installed
+DEFAULT_BACKEND = os.environ.get('SAT_KERNEL_BACKEND', AUTO_BACKEND)
+IS_NUMBA_AVAILABLE = numba is not None
+
+# Reason of a decision or a level 0 literal. Literals implied by an initial binary clause have the reason
+# BINARY_REASON - literal_code(true literal of the clause), arena clauses are referred to by their reference
+NO_REASON = -1
+BINARY_REASON = -2
+# End of a watch list. Watches are (reference << 1) | position of the watched literal in the clause
+NO_WATCH = -1
+NO_CLAUSE = -1
+
+# Kernel registers, kept in one int64 array so the kernels update them in place
+TRAIL_SIZE = 0
+PROPAGATION_HEAD = 1
+BINARY_PROPAGATION_HEAD = 2
+LEVEL = 3
+PROPAGATIONS = 4
+REGISTERS = 5
+
+_jit = numba.njit(cache=True) if IS_NUMBA_AVAILABLE else (lambda function: function)
+
+
+def select_backend(backend=None) -> str:
+    """
+    :param backend: `auto`, `python` or `numba`, None for `DEFAULT_BACKEND` (environment variable SAT_KERNEL_BACKEND)
+    :return: the backend to solve with, `python` or `numba`
+    """
+    backend = DEFAULT_BACKEND if backend is None else backend
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend {backend!r}, expected one of {", ".join(BACKENDS)}')
+
+    if backend == AUTO_BACKEND:
+        return NUMBA_BACKEND if IS_NUMBA_AVAILABLE else PYTHON_BACKEND
+
+    if backend == NUMBA_BACKEND and not IS_NUMBA_AVAILABLE:
+        raise ValueError('The numba backend needs Numba to be installed (pip install numba)')
+
+    return backend
+
+
+def make_cdcl_solver(clauses, total_variables, heuristics, cardinality_constraints=(), backend=None, proof=None,
+                     lemma_log=None, checkpointer=None, memory_monitor=None):
+    """`CDCLSatSolver`, or `KernelCDCLSatSolver` when the selected backend is `numba`."""
+    solver_class = KernelCDCLSatSolver if select_backend(backend) == NUMBA_BACKEND else CDCLSatSolver
+
+    return solver_class(clauses, total_variables, heuristics, cardinality_constraints, proof, lemma_log, checkpointer,
+                        memory_monitor)
+
+
+class KernelCDCLSatSolver(CDCLSatSolver):
+    """
+    `CDCLSatSolver` searching with the kernels. Once prepared, the trail, values, levels and reasons live in arrays:
+    `values` by literal code (1 true, -1 false, 0 unassigned), `reasons` encoded as described for NO_REASON.
+
+    Cardinality constraints are handed over as their clauses. Solution enumeration is only available in
+    `CDCLSatSolver`.
+    """
+
+    def __init__(self, clauses, total_variables, heuristics, cardinality_constraints=(), proof=None, lemma_log=None,
+                 checkpointer=None, memory_monitor=None):
+        clauses = list(clauses) + [clause for constraint in cardinality_constraints
+                                   for clause in constraint.to_clauses()]
+        super().__init__(clauses, total_variables, heuristics, proof=proof, lemma_log=lemma_log,
+                         checkpointer=checkpointer, memory_monitor=memory_monitor)
+
+        self.arena_data = None
+        self.conflict = (NO_CLAUSE, 0, 0)
+
+    def initialize_watch_list(self):
+        """Move the clauses into the arena and the binary implication lists, then set up the kernel arrays."""
+        for clause in self.input_clauses:
+            if len(clause) == 2:
+                self.add_binary_implications(clause)
+            elif len(clause) > 2:
+                self.clauses.add(clause)
+
+        self.input_clauses = []
+        # The Python watch lists are not used
+        self.literal_watch = []
+
+        variables = len(self.levels)
+        codes = 2 * variables
+
+        self.view_arena()
+        self.watch_heads = np.full(codes, NO_WATCH, dtype=np.int32)
+        self.link_all_watches()
+
+        # Binary implication lists in compressed form: the implied literals of code c are
+        # binary_targets[binary_offsets[c]:binary_offsets[c + 1]]
+        self.binary_offsets = np.zeros(codes + 1, dtype=np.int32)
+        np.cumsum([len(implied_literals) for implied_literals in self.binary_implications],
+                  out=self.binary_offsets[1:])
+        self.binary_targets = np.array([literal for implied_literals in self.binary_implications
+                                        for literal in implied_literals], dtype=np.int32)
+
+        level_zero = self.assignment
+        self.values = np.zeros(codes, dtype=np.int8)
+        self.levels = np.zeros(variables, dtype=np.int32)
+        self.reasons = np.full(variables, NO_REASON, dtype=np.int32)
+        self.seen = np.zeros(variables, dtype=np.uint8)
+        self.trail = np.zeros(variables, dtype=np.int32)
+        self.registers = np.zeros(REGISTERS, dtype=np.int64)
+
+        # Scratch buffers of the conflict analysis
+        self.learned_buffer = np.zeros(variables, dtype=np.int32)
+        self.stack = np.zeros(variables, dtype=np.int32)
+        self.marked = np.zeros(variables, dtype=np.int32)
+
+        for literal in level_zero:
+            self.enqueue_on_trail(literal)
+
+    def view_arena(self):
+        """NumPy view of the arena data. It has to be dropped before the arena grows, see `add_clause`."""
+        self.arena_data = np.frombuffer(self.clauses.data, dtype=np.int32) if self.clauses.data else \
+            np.zeros(0, dtype=np.int32)
+
+    def link_all_watches(self):
+        """Watch lists of every clause of the arena, from scratch."""
+        self.watch_heads.fill(NO_WATCH)
+        self.watch_next = np.full(max(len(self.arena_data), 1), NO_WATCH, dtype=np.int32)
+        for reference in self.clauses.references:
+            self.link_watches(reference)
+
+    def link_watches(self, reference):
+        data = self.arena_data
+        for position in (0, 1):
+            code = literal_code(int(data[reference + HEADER_SIZE + position]))
+            self.watch_next[reference + position] = self.watch_heads[code]
+            self.watch_heads[code] = (reference << 1) | position
+
+    def add_clause(self, literals, learned=False, lbd=0):
+        """Add a clause to the arena and watch its first two literals."""
+        # An array can not be resized while a NumPy view exports its buffer
+        self.arena_data = None
+        reference = self.clauses.add(literals, learned, lbd)
+        self.view_arena()
+
+        if len(self.watch_next) < len(self.arena_data):
+            watch_next = np.full(2 * len(self.arena_data), NO_WATCH, dtype=np.int32)
+            watch_next[:len(self.watch_next)] = self.watch_next
+            self.watch_next = watch_next
+
+        self.link_watches(reference)
+        return reference
+
+    def add_lemmas(self, lemmas):
+        self.synchronize()
+        return super().add_lemmas(lemmas)
+
+    def restore(self, snapshot):
+        is_restored = super().restore(snapshot)
+        if is_restored:
+            # The kernels count propagations on their own, `synchronize` copies the count back
+            self.registers[PROPAGATIONS] = self.statistics.implications_counter
+        return is_restored
+
+    def snapshot(self):
+        self.synchronize()
+        return super().snapshot()
+
+    def add_lemma(self, literals, lbd):
+        if len(literals) == 1:
+            self.enqueue_on_trail(literals[0])
+        else:
+            self.add_clause(literals, learned=True, lbd=lbd)
+
+    def locked_clauses(self):
+        reasons = self.reasons[np.abs(self.trail[:self.trail_size])]
+        return set(reasons[reasons >= 0].tolist())
+
+    def compact_clauses(self, deleted):
+        self.arena_data = None
+        moved = self.clauses.compact(deleted)
+        self.view_arena()
+
+        variables = np.abs(self.trail[:self.trail_size])
+        reasons = self.reasons[variables]
+        is_clause_reason = reasons >= 0
+        self.reasons[variables[is_clause_reason]] = [moved[reason] for reason in reasons[is_clause_reason].tolist()]
+
+        self.link_all_watches()
+
+    @property
+    def trail_size(self):
+        return int(self.registers[TRAIL_SIZE])
+
+    def assigned_literals(self):
+        return self.trail[:self.trail_size].tolist()
+
+    def are_all_variables_assigned(self):
+        return self.trail_size >= self.total_variables
+
+    def search(self):
+        """`CDCLSatSolver.search` over the kernels."""
+        conflict = self.two_watch_propagate()
+
+        while True:
+            while conflict is not None:
+                self.heuristics.conflict(conflict)
+
+                if not self.decision_levels:
+                    self.statistics.increment_failed_backjumps_counter()
+                    self.synchronize()
+                    return self.refuted()
+
+                learned_clause, backjump_level = self.analyze_conflict(conflict)
+
+                self.backjump(backjump_level)
+                self.learn_clauses(learned_clause)
+                self.statistics.increment_learned_counter()
+
+                if self.memory_monitor is not None and self.memory_monitor.is_over_limit and not self.free_memory():
+                    self.synchronize()
+                    return self.interrupted()
+
+                if self.checkpointer is not None and self.checkpoint():
+                    self.synchronize()
+                    return self.interrupted()
+
+                conflict = self.two_watch_propagate()
+
+            if self.are_all_variables_assigned():
+                break
+
+            variable = self.decide(self.assigned_literals())
+
+            if not variable:
+                break
+
+            self.assign(variable)
+            conflict = self.two_watch_propagate()
+
+        self.synchronize()
+        return CDCLResult(self.assignment, SATResult.SATISFIABLE, self.statistics)
+
+    def synchronize(self):
+        """Copy the trail and the propagation count back to the Python side at the end of a search."""
+        self.assignment = self.assigned_literals()
+        self.statistics.update_implications_counter(int(self.registers[PROPAGATIONS]))
+
+    def enumerate_solutions(self, limit=None, projection=None):
+        raise NotImplementedError('Solution enumeration needs the python backend (CDCLSatSolver)')
+
+    def assign(self, variable):
+        self.decision_levels.append(self.trail_size)
+        self.registers[LEVEL] = len(self.decision_levels)
+
+        self.statistics.increment_decision_counter()
+
+        self.enqueue_on_trail(variable)
+
+    def enqueue_on_trail(self, literal, reason=NO_REASON):
+        """`enqueue` on the kernel arrays, which replace the Python ones once the solver is prepared."""
+        enqueue_kernel(literal, reason, self.values, self.levels, self.reasons, self.trail, self.registers)
+
+    def two_watch_propagate(self):
+        self.conflict = propagate_kernel(self.arena_data, self.watch_heads, self.watch_next, self.binary_offsets,
+                                         self.binary_targets, self.values, self.levels, self.reasons, self.trail,
+                                         self.registers)
+        reference, first, second = self.conflict
+
+        if reference == NO_CLAUSE and first == 0:
+            return None
+
+        self.on_conflict_found()
+        return self.clauses.literals(reference) if reference != NO_CLAUSE else [first, second]
+
+    def analyze_conflict(self, conflict_clause):
+        """Analyze the conflict found by the last `two_watch_propagate`, see `CDCLSatSolver.analyze_conflict`."""
+        reference, first, second = self.conflict
+        size, backjump_level, removed = analyze_kernel(self.arena_data, self.levels, self.reasons, self.seen,
+                                                       self.trail, self.registers, reference, first, second,
+                                                       self.learned_buffer, self.stack, self.marked)
+
+        self.statistics.record_minimization(int(removed), int(size))
+        return self.learned_buffer[:size].tolist(), int(backjump_level)
+
+    def learn_clauses(self, learned_clause):
+        lbd = len({int(self.levels[abs(literal)]) for literal in learned_clause[1:]}) + 1
+        self.heuristics.learned(lbd, self.statistics)
+
+        if self.proof is not None:
+            self.proof.add(learned_clause)
+        if self.lemma_log is not None:
+            self.lemma_log.append((lbd, learned_clause))
+
+        if len(learned_clause) == 1:
+            self.enqueue_on_trail(learned_clause[0])
+            return
+
+        self.enqueue_on_trail(learned_clause[0], self.add_clause(learned_clause, learned=True, lbd=lbd))
+
+    def backjump(self, level):
+        backjump_kernel(self.decision_levels[level], self.values, self.reasons, self.trail, self.registers)
+
+        del self.decision_levels[level:]
+        self.registers[LEVEL] = level
+
+        self.statistics.increment_successful_backjumps_counter()
+
+
+# Kernels
+
+@_jit
+def _code(literal):
+    return 2 * abs(literal) + (1 if literal < 0 else 0)
+
+
+@_jit
+def _literal(code):
+    return -(code >> 1) if code & 1 else code >> 1
+
+
+@_jit
+def enqueue_kernel(literal, reason, values, levels, reasons, trail, registers):
+    """Put a literal on the trail at the current level."""
+    code = _code(literal)
+    values[code] = 1
+    values[code ^ 1] = -1
+
+    variable = abs(literal)
+    levels[variable] = registers[LEVEL]
+    reasons[variable] = reason
+
+    trail[registers[TRAIL_SIZE]] = literal
+    registers[TRAIL_SIZE] += 1
+
+
+@_jit
+def propagate_kernel(data, watch_heads, watch_next, binary_offsets, binary_targets, values, levels, reasons, trail,
+                     registers):
+    """
+    Propagate the trail from the propagation heads: the binary implications of every literal, then the watched
+    clauses of the literal made false.
+
+    :return: the conflict as (arena reference, 0, 0) or (NO_CLAUSE, first literal, second literal) for a binary
+    clause, (NO_CLAUSE, 0, 0) when there is none
+    """
+    while registers[PROPAGATION_HEAD] < registers[TRAIL_SIZE]:
+        while registers[BINARY_PROPAGATION_HEAD] < registers[TRAIL_SIZE]:
+            literal = trail[registers[BINARY_PROPAGATION_HEAD]]
+            registers[BINARY_PROPAGATION_HEAD] += 1
+            code = _code(literal)
+
+            for index in range(binary_offsets[code], binary_offsets[code + 1]):
+                implied_literal = binary_targets[index]
+                value = values[_code(implied_literal)]
+                if value == 1:
+                    continue
+                if value == -1:
+                    return NO_CLAUSE, int(implied_literal), int(-literal)
+
+                enqueue_kernel(implied_literal, BINARY_REASON - code, values, levels, reasons, trail, registers)
+                registers[PROPAGATIONS] += 1
+
+        false_code = _code(trail[registers[PROPAGATION_HEAD]]) ^ 1
+        registers[PROPAGATION_HEAD] += 1
+
+        previous = NO_WATCH
+        watch = watch_heads[false_code]
+        while watch != NO_WATCH:
+            reference = watch >> 1
+            position = watch & 1
+            following = watch_next[reference + position]
+            start = reference + HEADER_SIZE
+
+            other_watch = data[start + 1 - position]
+            if values[_code(other_watch)] == 1:
+                previous = watch
+                watch = following
+                continue
+
+            replacement = -1
+            for index in range(start + 2, start + data[reference + SIZE_OFFSET]):
+                if values[_code(data[index])] != -1:
+                    replacement = index
+                    break
+
+            if replacement != -1:
+                # Watch the replacement instead: unlink the watch here and push it on the replacement's list
+                new_literal = data[replacement]
+                data[replacement] = data[start + position]
+                data[start + position] = new_literal
+
+                if previous == NO_WATCH:
+                    watch_heads[false_code] = following
+                else:
+                    watch_next[(previous >> 1) + (previous & 1)] = following
+
+                new_code = _code(new_literal)
+                watch_next[reference + position] = watch_heads[new_code]
+                watch_heads[new_code] = watch
+                watch = following
+                continue
+
+            if values[_code(other_watch)] == -1:
+                return int(reference), 0, 0
+
+            enqueue_kernel(other_watch, reference, values, levels, reasons, trail, registers)
+            registers[PROPAGATIONS] += 1
+            previous = watch
+            watch = following
+
+    return NO_CLAUSE, 0, 0
+
+
+@_jit
+def analyze_kernel(data, levels, reasons, seen, trail, registers, reference, first, second, learned, stack, marked):
+    """
+    First UIP analysis of a conflict (as returned by `propagate_kernel`) followed by recursive minimization, see
+    `CDCLSatSolver.analyze_conflict`.
+
+    :return: the size of the clause written to `learned` (asserting literal first, then the literal of the backjump
+    level), the backjump level and the literals removed by minimization
+    """
+    level = registers[LEVEL]
+    size = 1
+    pending = 0
+    trail_index = registers[TRAIL_SIZE] - 1
+    literal = 0
+
+    while True:
+        clause_size = data[reference + SIZE_OFFSET] if reference != NO_CLAUSE else 2
+        for index in range(clause_size):
+            if reference != NO_CLAUSE:
+                clause_literal = data[reference + HEADER_SIZE + index]
+            else:
+                clause_literal = first if index == 0 else second
+
+            variable = abs(clause_literal)
+            if clause_literal == literal or seen[variable] or levels[variable] == 0:
+                continue
+
+            seen[variable] = 1
+            if levels[variable] == level:
+                pending += 1
+            else:
+                learned[size] = clause_literal
+                size += 1
+
+        while not seen[abs(trail[trail_index])]:
+            trail_index -= 1
+
+        literal = trail[trail_index]
+        trail_index -= 1
+        pending -= 1
+        seen[abs(literal)] = 0
+
+        if pending <= 0:
+            break
+
+        reason = reasons[abs(literal)]
+        if reason >= 0:
+            if data[reason + FLAGS_OFFSET] & LEARNED_FLAG:
+                data[reason + ACTIVITY_OFFSET] += 1
+            reference = reason
+        else:
+            reference = NO_CLAUSE
+            first, second = literal, -_literal(BINARY_REASON - reason)
+
+    # Minimization: one bit per decision level of the clause, as in `CDCLSatSolver.minimize`
+    abstract_levels = 0
+    marked_size = 0
+    for index in range(1, size):
+        variable = abs(learned[index])
+        abstract_levels |= 1 << (levels[variable] & 31)
+        marked[marked_size] = variable
+        marked_size += 1
+
+    kept = 1
+    for index in range(1, size):
+        clause_literal = learned[index]
+        is_redundant = False
+        if reasons[abs(clause_literal)] != NO_REASON:
+            is_redundant, marked_size = _is_redundant(clause_literal, abstract_levels, data, levels, reasons, seen,
+                                                      stack, marked, marked_size)
+        if not is_redundant:
+            learned[kept] = clause_literal
+            kept += 1
+
+    for index in range(marked_size):
+        seen[marked[index]] = 0
+
+    backjump_level = 0
+    if kept > 1:
+        deepest = 1
+        for index in range(2, kept):
+            if levels[abs(learned[index])] > levels[abs(learned[deepest])]:
+                deepest = index
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        backjump_level = levels[abs(learned[1])]
+
+    learned[0] = -literal
+    return kept, backjump_level, size - kept
+
+
+@_jit
+def _is_redundant(literal, abstract_levels, data, levels, reasons, seen, stack, marked, marked_size):
+    """`CDCLSatSolver.is_redundant` with explicit stacks. :return: whether it is, and the new size of `marked`"""
+    first_marked = marked_size
+    stack[0] = literal
+    stack_size = 1
+
+    while stack_size > 0:
+        stack_size -= 1
+        true_literal = -stack[stack_size]
+        reason = reasons[abs(true_literal)]
+        clause_size = data[reason + SIZE_OFFSET] if reason >= 0 else 1
+
+        for index in range(clause_size):
+            if reason >= 0:
+                reason_literal = data[reason + HEADER_SIZE + index]
+            else:
+                reason_literal = -_literal(BINARY_REASON - reason)
+
+            variable = abs(reason_literal)
+            if reason_literal == true_literal or seen[variable] or levels[variable] == 0:
+                continue
+
+            if reasons[variable] == NO_REASON or not abstract_levels & (1 << (levels[variable] & 31)):
+                for index_marked in range(first_marked, marked_size):
+                    seen[marked[index_marked]] = 0
+                return False, first_marked
+
+            seen[variable] = 1
+            marked[marked_size] = variable
+            marked_size += 1
+            stack[stack_size] = reason_literal
+            stack_size += 1
+
+    return True, marked_size
+
+
+@_jit
+def backjump_kernel(trail_index, values, reasons, trail, registers):
+    """Undo every assignment from `trail_index` on."""
+    for index in range(trail_index, registers[TRAIL_SIZE]):
+        code = _code(trail[index])
+        values[code] = 0
+        values[code ^ 1] = 0
+        reasons[abs(trail[index])] = NO_REASON
+
+    registers[TRAIL_SIZE] = trail_index
+    registers[PROPAGATION_HEAD] = trail_index
+    registers[BINARY_PROPAGATION_HEAD] = trail_index
@@ -0,0 +1,94 @@
+from array import array
+
+# Every clause is stored as a header followed by its literals: [size, flags, lbd, activity, literal, literal, ...]
+HEADER_SIZE = 4
+SIZE_OFFSET = 0
+FLAGS_OFFSET = 1
+LBD_OFFSET = 2
+ACTIVITY_OFFSET = 3
+
+LEARNED_FLAG = 1
+
+
+def literal_code(literal):
+    """Dense, non-negative index of a literal: 2v for v and 2v + 1 for -v."""
+    return 2 * abs(literal) + (literal < 0)
+
+
+def literal_from_code(code):
+    return -(code >> 1) if code & 1 else code >> 1
+
+
+class ClauseArena:
+    """
+    All clauses of a solver in one contiguous `array('i')`.
+
+    A clause is referred to by the offset of its header in the arena (its "reference"), so reasons and watch lists
+    only hold plain integers. The first two literals of a clause are the ones being watched.
+    """
+
+    def __init__(self, clauses=()):
+        self.data = array('i')
+        self.references = array('i')
+
+        for clause in clauses:
+            self.add(clause)
+
+    def add(self, literals, learned=False, lbd=0):
+        reference = len(self.data)
+
+        self.data.extend((len(literals), LEARNED_FLAG if learned else 0, lbd, 0))
+        self.data.extend(literals)
+        self.references.append(reference)
+
+        return reference
+
+    def literals(self, reference):
+        start = reference + HEADER_SIZE
+        return self.data[start:start + self.data[reference + SIZE_OFFSET]]
+
+    def size(self, reference):
+        return self.data[reference + SIZE_OFFSET]
+
+    def is_learned(self, reference):
+        return bool(self.data[reference + FLAGS_OFFSET] & LEARNED_FLAG)
+
+    def lbd(self, reference):
+        return self.data[reference + LBD_OFFSET]
+
+    def activity(self, reference):
+        return self.data[reference + ACTIVITY_OFFSET]
+
+    def bump_activity(self, reference):
+        self.data[reference + ACTIVITY_OFFSET] += 1
+
+    def compact(self, deleted):
+        """
+        Remove the clauses of the `deleted` references, moving the others to the front of a new buffer.
+
+        :return: dict of the new reference of every kept clause, by its old reference
+        """
+        data, references, moved = array('i'), array('i'), {}
+
+        for reference in self.references:
+            if reference in deleted:
+                continue
+
+            moved[reference] = len(data)
+            references.append(len(data))
+            data.extend(self.data[reference:reference + HEADER_SIZE + self.data[reference + SIZE_OFFSET]])
+
+        self.data, self.references = data, references
+        return moved
+
+    def memory_usage(self):
+        """Bytes used by the arena buffers."""
+        return self.data.buffer_info()[1] * self.data.itemsize + \
+            self.references.buffer_info()[1] * self.references.itemsize
+
+    def __len__(self):
+        return len(self.references)
+
+    def __iter__(self):
+        for reference in self.references:
+            yield self.literals(reference)
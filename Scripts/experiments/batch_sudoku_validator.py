@@ -0,0 +1,81 @@
+import math as m
+from itertools import chain
+
+import numpy as np
+
+from Scripts.helpers.sat_outcome_converter import variable_base
+
+INVALID_CELL = -1
+
+_CHAR_VALUES = np.zeros(256, dtype=np.int16)
+_CHAR_VALUES[ord('1'):ord('9') + 1] = np.arange(1, 10)
+_CHAR_VALUES[ord('A'):ord('Z') + 1] = np.arange(10, 36)
+_CHAR_VALUES[ord('a'):ord('z') + 1] = np.arange(10, 36)
+
+
+def decode_puzzles(sudoku_strings) -> np.ndarray:
+    """Stack sudoku strings of the same size into an (N, n, n) array, 0 for unknown cells."""
+    sudoku_strings = [sudoku.strip() for sudoku in sudoku_strings]
+    length = m.isqrt(len(sudoku_strings[0])) if sudoku_strings else 0
+
+    characters = np.frombuffer(''.join(sudoku_strings).encode('ascii'), dtype=np.uint8)
+
+    return _CHAR_VALUES[characters].reshape(len(sudoku_strings), length, length)
+
+
+def decode_solutions(solutions, matrix_length=9) -> np.ndarray:
+    """
+    Decode SAT solutions (lists of DIMACS literals, original numbering) into an (N, n, n) array of sudoku matrices.
+
+    Cells without a true literal stay 0, cells with more than one are set to INVALID_CELL, so neither passes
+    `validate_solutions`.
+    """
+    lengths = [len(solution) for solution in solutions]
+    literals = np.fromiter(chain.from_iterable(solutions), dtype=np.int64, count=sum(lengths))
+    owners = np.repeat(np.arange(len(solutions)), lengths)
+
+    positive = literals > 0
+    literals, owners = literals[positive], owners[positive]
+
+    base = variable_base(matrix_length)
+    rows, remainder = np.divmod(literals, base * base)
+    columns, values = np.divmod(remainder, base)
+
+    in_grid = ((rows >= 1) & (rows <= matrix_length) & (columns >= 1) & (columns <= matrix_length) &
+               (values >= 1) & (values <= matrix_length))
+    owners, rows, columns, values = owners[in_grid], rows[in_grid] - 1, columns[in_grid] - 1, values[in_grid]
+
+    matrices = np.zeros((len(solutions), matrix_length, matrix_length), dtype=np.int16)
+    counts = np.zeros_like(matrices)
+
+    matrices[owners, rows, columns] = values
+    np.add.at(counts, (owners, rows, columns), 1)
+    matrices[counts > 1] = INVALID_CELL
+
+    return matrices
+
+
+def validate_solutions(matrices: np.ndarray, clues: np.ndarray = None) -> np.ndarray:
+    """
+    Check a stack of solved sudokus at once.
+
+    :param matrices: (N, n, n) array of solutions, n being a square number
+    :param clues: optional (N, n, n) array of the original puzzles (0 for unknown cells)
+    :return: (N,) boolean array, True when every row, column and box holds 1..n and the clues are kept
+    """
+    count, length = matrices.shape[0], matrices.shape[1]
+    box_length = m.isqrt(length)
+    expected = np.arange(1, length + 1)
+
+    boxes = (matrices.reshape(count, box_length, box_length, box_length, box_length)
+             .transpose(0, 1, 3, 2, 4)
+             .reshape(count, length, length))
+
+    valid = ((np.sort(matrices, axis=2) == expected).all(axis=(1, 2)) &
+             (np.sort(matrices, axis=1) == expected[:, None]).all(axis=(1, 2)) &
+             (np.sort(boxes, axis=2) == expected).all(axis=(1, 2)))
+
+    if clues is not None:
+        valid &= ((clues == 0) | (clues == matrices)).all(axis=(1, 2))
+
+    return valid
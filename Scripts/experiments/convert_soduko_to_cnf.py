@@ -1,6 +1,5 @@
-import math as m
-
 from Scripts.helpers.dimacs_reader import read_dimacs_file
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix, from_matrix_to_clauses
 
 SUDOKU_RULES = '../../sudoku_rules/sudoku-rules-9x9.cnf'
 
@@ -20,27 +19,12 @@ def sudoku_input_to_dimacs(sudoku_str):
     """
     Converts a Sudoku string with given clues into DIMACS CNF format,
     where only the clues are represented as unit clauses without additional constraints.
-    
-    :param sudoku_str: String representation of the Sudoku puzzle (e.g., "...3..4114..3...")
-    :param n: Dimension of the Sudoku grid (4 for 4x4 or 9 for 9x9)
-    :return: A string in DIMACS CNF format representing the puzzle
+
+    :param sudoku_str: String representation of the Sudoku puzzle (e.g., "...3..4114..3..."), where `A`, `B`, ...
+    stand for 10, 11, ... in grids bigger than 9x9
+    :return: A list of unit clauses, one per clue, using the variables of the sudoku rules of that size
     """
-    clauses = []
-    n = int(m.sqrt(len(sudoku_str)))  # Grid dimension (either 4, 9 or 16)
-
-    # Helper to convert (row, col, value) to a unique variable
-    def varnum(row, column, value):
-        return 100 * row + 10 * column + value
-
-    # Add each given cell as a unit clause based on the clues in the puzzle
-    for i, char in enumerate(sudoku_str):
-        if char != '.':
-            r = (i // n) + 1  # Row index (1-based)
-            c = (i % n) + 1  # Column index (1-based)
-            v = int(char)  # Value in the cell
-            clauses.append([varnum(r, c, v)])  # Create unit clause
-
-    return clauses
+    return from_matrix_to_clauses(from_sudoku_string_to_matrix(sudoku_str))
 
 
 def merge_rules(clues, constraints_file_path):
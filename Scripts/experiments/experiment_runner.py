@@ -1,40 +1,63 @@
-import csv
 import time
-from collections import defaultdict, ChainMap, namedtuple
+from collections import namedtuple, Counter
 from copy import deepcopy
 from enum import Enum
+from functools import lru_cache
 from multiprocessing import Pool
 
-from Scripts.cdcl_heuristics_solver import CDCLSatSolver, SATResult
+from Scripts.cdcl_heuristics_solver import SATResult
+from Scripts.cdcl_kernels import make_cdcl_solver, select_backend
 from Scripts.experiments.convert_soduko_to_cnf import sudoku_input_to_dimacs
-from Scripts.experiments.sudoku_validator import is_valid_sudoku
+from Scripts.experiments.batch_sudoku_validator import decode_puzzles, decode_solutions, validate_solutions
+from Scripts.experiments.results_store import ResultsWriter, RESULTS_SCHEMA, HISTORY_SCHEMA, cdcl_metrics, \
+    dpll_metrics, history_rows, new_run_id, preprocessing_metrics, local_search_metrics, \
+    lookahead_metrics, memory_metrics
+from Scripts.helpers.cardinality_detector import detect_cardinality_constraints
+from Scripts.helpers.cnf_preprocessor import preprocess
 from Scripts.helpers.dimacs_reader import read_dimacs_file
-from Scripts.helpers.sat_outcome_converter import from_list_to_matrix, from_dict_to_matrix
+from Scripts.helpers.memory_monitor import MemoryMonitor
+from Scripts.helpers.puzzle_set import PuzzleSet
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix, from_matrix_to_clauses
+from Scripts.helpers.solution_cache import SolutionCache, DEFAULT_CACHE_PATH
+from Scripts.helpers.sudoku_propagation import propagate_sudoku, PropagationStage
+from Scripts.helpers.sudoku_rules import rules_namespace
+from Scripts.helpers.variable_renumbering import VariableRenumbering
 from Scripts.heuristics.CHB import CHBHeuristics
 from Scripts.heuristics.VSIDS import VSIDSHeuristics
+from Scripts.heuristics.adaptive import AdaptiveHeuristics
+from Scripts.local_search import local_search
+from Scripts.lookahead_dpll import LookaheadSolver
 from Scripts.simple_dpll import dpll
 
-solutions = defaultdict()
-
 CDCLResultWrapper = namedtuple('CDCLResultWrapper', ['result', 'history', 'elapsed_time'])
 DPLLResultWrapper = namedtuple('DPLLResultWrapper',
-                               ['is_satisfiable', 'assignment', 'statistics', 'elapsed_time'])
+                               ['is_satisfiable', 'assignment', 'statistics', 'elapsed_time', 'memory'])
+LocalSearchResultWrapper = namedtuple('LocalSearchResultWrapper', ['result', 'elapsed_time', 'memory'])
+LookaheadResultWrapper = namedtuple('LookaheadResultWrapper', ['result', 'elapsed_time', 'memory'])
 
-CDCLHistory = namedtuple('CDCLHistory', ['unsolved_sudoku', 'chb', 'vsids'])
+CDCLHistory = namedtuple('CDCLHistory', ['unsolved_sudoku', 'chb', 'vsids', 'adaptive'])
+ExperimentRules = namedtuple('ExperimentRules', ['matrix_length', 'renumbering', 'clauses', 'total_variables',
+                                                 'cdcl_clauses', 'cardinality_constraints', 'namespace'])
 
 
-def solve_sudoku_with_vsids(clauses, total_variables, unsolved_sudoku):
+def solve_sudoku_with_vsids(clauses, total_variables, unsolved_sudoku, cardinality_constraints=()):
     print(f'CDCL {VSIDS_PREFIX} - {unsolved_sudoku}')
-    return solve_with_cdcl(clauses, total_variables, VSIDSHeuristics())
+    return solve_with_cdcl(clauses, total_variables, VSIDSHeuristics(), cardinality_constraints)
 
 
-def solve_sudoku_with_chb(clauses, total_variables, unsolved_sudoku):
+def solve_sudoku_with_chb(clauses, total_variables, unsolved_sudoku, cardinality_constraints=()):
     print(f'CDCL {CHB_PREFIX} - {unsolved_sudoku}')
-    return solve_with_cdcl(clauses, total_variables, CHBHeuristics())
+    return solve_with_cdcl(clauses, total_variables, CHBHeuristics(), cardinality_constraints)
+
+
+def solve_sudoku_with_adaptive(clauses, total_variables, unsolved_sudoku, cardinality_constraints=()):
+    print(f'CDCL {ADAPTIVE_PREFIX} - {unsolved_sudoku}')
+    return solve_with_cdcl(clauses, total_variables, AdaptiveHeuristics(), cardinality_constraints)
 
 
-def solve_with_cdcl(clauses, total_variables, heuristics):
-    sat_solver = CDCLSatSolver(clauses, total_variables, heuristics)
+def solve_with_cdcl(clauses, total_variables, heuristics, cardinality_constraints=()):
+    sat_solver = make_cdcl_solver(clauses, total_variables, heuristics, cardinality_constraints,
+                                  memory_monitor=MemoryMonitor(MEMORY_LIMIT, TRACE_MEMORY))
 
     start_time = time.process_time()
     result = sat_solver.solve()
@@ -55,110 +78,346 @@ def solve_sudoku_with_basic_dpll(clauses, unsolved_sudoku):
         'pure_literals': 0,
     }
 
-    start_time = time.process_time()
-    is_satisfiable, assignment, statistics = dpll(clauses, statistics, {})
-    end_time = time.process_time()
+    with MemoryMonitor(trace=TRACE_MEMORY) as memory:
+        start_time = time.process_time()
+        is_satisfiable, assignment, statistics = dpll(clauses, statistics, {})
+        end_time = time.process_time()
+
+    return DPLLResultWrapper(is_satisfiable, assignment, statistics, end_time - start_time, memory)
+
+
+def solve_sudoku_with_probsat(clauses, total_variables, unsolved_sudoku):
+    print(f'{PROBSAT_PREFIX} - {unsolved_sudoku}')
+
+    with MemoryMonitor(trace=TRACE_MEMORY) as memory:
+        start_time = time.process_time()
+        result = local_search(clauses, total_variables, seed=LOCAL_SEARCH_SEED)
+        end_time = time.process_time()
+
+    return LocalSearchResultWrapper(result, end_time - start_time, memory)
+
 
-    return DPLLResultWrapper(is_satisfiable, assignment, statistics, end_time - start_time)
+def solve_sudoku_with_lookahead(clauses, total_variables, unsolved_sudoku):
+    print(f'{LOOKAHEAD_PREFIX} - {unsolved_sudoku}')
 
+    with MemoryMonitor(trace=TRACE_MEMORY) as memory:
+        start_time = time.process_time()
+        result = LookaheadSolver(clauses, total_variables).solve()
+        end_time = time.process_time()
 
-def cdcl_results_to_dict(result: CDCLResultWrapper, matrix_length, prefix):
+    return LookaheadResultWrapper(result, end_time - start_time, memory)
+
+
+def cdcl_results_to_dict(result: CDCLResultWrapper, solver):
     sat_solver_result = result.result
+    status = sat_solver_result.status
+
+    return {
+        'solver': solver,
+        # A search stopped by the memory limit says nothing about satisfiability
+        'is_satisfied': None if status == SATResult.UNKNOWN else status == SATResult.SATISFIABLE,
+        'elapsed_time': result.elapsed_time,
+        **cdcl_metrics(sat_solver_result.statistics),
+    }
+
+
+def dpll_results_to_dict(result: DPLLResultWrapper):
+    return {
+        'solver': DPLL_PREFIX,
+        'is_satisfied': result.is_satisfiable,
+        'elapsed_time': result.elapsed_time,
+        **dpll_metrics(result.statistics),
+        **memory_metrics(result.memory),
+    }
+
 
-    statistics = add_prefix(vars(sat_solver_result.statistics), prefix)
+def local_search_results_to_dict(result: LocalSearchResultWrapper):
+    status = result.result.status
+
+    return {
+        'solver': PROBSAT_PREFIX,
+        # Running out of flips says nothing about satisfiability
+        'is_satisfied': None if status == SATResult.UNKNOWN else status == SATResult.SATISFIABLE,
+        'elapsed_time': result.elapsed_time,
+        **local_search_metrics(result.result.statistics),
+        **memory_metrics(result.memory),
+    }
+
+
+def lookahead_results_to_dict(result: LookaheadResultWrapper):
+    return {
+        'solver': LOOKAHEAD_PREFIX,
+        'is_satisfied': result.result.status == SATResult.SATISFIABLE,
+        'elapsed_time': result.elapsed_time,
+        **lookahead_metrics(result.result.statistics),
+        **memory_metrics(result.memory),
+    }
+
+
+def propagation_results_to_dict(result, elapsed_time):
+    return {
+        'solver': PROPAGATION_PREFIX,
+        'stage': result.stage.name,
+        'is_satisfied': result.stage == PropagationStage.SOLVED if result.is_resolved else None,
+        'naked_singles': result.naked_singles,
+        'hidden_singles': result.hidden_singles,
+        'locked_candidates': result.locked_candidates,
+        'elapsed_time': elapsed_time,
+    }
+
+
+def preprocessing_results_to_dict(result, elapsed_time):
+    stage = PropagationStage.CONTRADICTION if result.is_unsatisfiable else \
+        PropagationStage.SOLVED if not result.clauses else PropagationStage.REDUCED
+
+    return {
+        'solver': PREPROCESSING_PREFIX,
+        'stage': stage.name,
+        'is_satisfied': False if result.is_unsatisfiable else None,
+        'elapsed_time': elapsed_time,
+        **preprocessing_metrics(result.report),
+    }
+
+
+def unsolved_sudoku_to_dict(unsolved_sudoku):
+    return {
+        UNSOLVED_SUDOKU_PREFIX: unsolved_sudoku,
+        'number_of_clues': len(unsolved_sudoku) - unsolved_sudoku.count('.'),
+        'number_of_unknown_positions': unsolved_sudoku.count('.'),
+        'total_of_characters': len(unsolved_sudoku),
+    }
 
-    sudoku_matrix = from_list_to_matrix(sat_solver_result.solution, matrix_length)
-    statistics[f'{prefix}_is_solution_valid'] = is_valid_sudoku(sudoku_matrix)
-    statistics[f'{prefix}_is_satisfied'] = sat_solver_result.status == SATResult.SATISFIABLE
-    statistics[f'{prefix}_elapsed_time'] = result.elapsed_time
 
-    return statistics
+def open_solution_cache():
+    return SolutionCache(DEFAULT_CACHE_PATH, namespace=load_experiment_rules().namespace)
 
 
-def add_prefix(dictionary: dict, prefix: str):
-    return {prefix + '_' + key: value for key, value in dictionary.items()}
+@lru_cache(maxsize=None)
+def worker_solution_cache():
+    """Solution cache of a pool worker, opened on first use (SQLite connections can not be shared across processes)."""
+    return open_solution_cache()
+
+
+def store_solutions(data: list[list[dict]], solutions: list[dict], cache):
+    """Cache the first valid solution of every sudoku that was not answered by the cache already."""
+    for rows, solution in zip(data, solutions):
+        valid_solvers = {row['solver'] for row in rows if row.get('is_solution_valid')}
+        solver = next((solver for solver in (VSIDS_PREFIX, CHB_PREFIX, ADAPTIVE_PREFIX, DPLL_PREFIX,
+                                             PROBSAT_PREFIX, LOOKAHEAD_PREFIX, PROPAGATION_PREFIX)
+                       if solver in valid_solvers), None)
+
+        if solver is not None:
+            sudoku = rows[0][UNSOLVED_SUDOKU_PREFIX]
+            matrix = decode_solutions([solution[solver]], load_experiment_rules().matrix_length)[0].tolist()
+            cache.put(from_sudoku_string_to_matrix(sudoku), matrix)
 
 
 def solve_sudoku(unsolved_sudoku):
+    """
+    :return: one result row per solver (see `RESULTS_SCHEMA`), the CDCL histories and the solution of each solver
+    """
     unsolved_sudoku = unsolved_sudoku.strip()
     print(f'solving sudoku {unsolved_sudoku}')
+    sudoku_dict = unsolved_sudoku_to_dict(unsolved_sudoku)
 
-    clauses = sudoku_input_to_dimacs(unsolved_sudoku) + sudoku_rules
+    if USE_SOLUTION_CACHE:
+        cached_matrix = worker_solution_cache().get(from_sudoku_string_to_matrix(unsolved_sudoku))
 
-    dpll_result: DPLLResultWrapper = solve_sudoku_with_basic_dpll(deepcopy(clauses), unsolved_sudoku)
+        if cached_matrix is not None:
+            print(f'Finished sudoku {unsolved_sudoku} from the solution cache')
+            rows = [{**sudoku_dict, 'solver': CACHE_PREFIX, 'is_satisfied': True}]
+            solutions = {CACHE_PREFIX: [clause[0] for clause in from_matrix_to_clauses(cached_matrix)]}
+            return rows, CDCLHistory(unsolved_sudoku, set(), set(), set()), solutions
 
-    chb_result = solve_sudoku_with_chb(deepcopy(clauses), total_variables, unsolved_sudoku)
-    vsids_result = solve_sudoku_with_vsids(deepcopy(clauses), total_variables, unsolved_sudoku)
-    vsids_dict = cdcl_results_to_dict(vsids_result, matrix_length, prefix=VSIDS_PREFIX)
+    clues = sudoku_input_to_dimacs(unsolved_sudoku)
+    rows = []
 
-    chb_dict = cdcl_results_to_dict(chb_result, matrix_length, prefix=CHB_PREFIX)
+    if USE_PROPAGATION_PRE_PASS:
+        start_time = time.process_time()
+        propagation_result = propagate_sudoku(from_sudoku_string_to_matrix(unsolved_sudoku))
+        end_time = time.process_time()
 
-    dpll_dict = add_prefix(dpll_result.statistics, DPLL_PREFIX)
-    dpll_dict[f'{DPLL_PREFIX}_is_satisfied'] = dpll_result.is_satisfiable
+        rows.append({**sudoku_dict, **propagation_results_to_dict(propagation_result, end_time - start_time)})
 
-    dpll_sudoku_matrix = from_dict_to_matrix(dpll_result.assignment, matrix_length)
-    dpll_dict[f'{DPLL_PREFIX}_is_solution_valid'] = is_valid_sudoku(dpll_sudoku_matrix)
-    dpll_dict[f'{DPLL_PREFIX}_elapsed_time'] = dpll_result.elapsed_time
+        if propagation_result.is_resolved:
+            print(f'Finished sudoku {unsolved_sudoku} with propagation ({propagation_result.stage.name})')
+            solutions = {}
+            if propagation_result.stage == PropagationStage.SOLVED:
+                solutions[PROPAGATION_PREFIX] = [clause[0]
+                                                 for clause in from_matrix_to_clauses(propagation_result.matrix)]
+            return rows, CDCLHistory(unsolved_sudoku, set(), set(), set()), solutions
 
-    final_dict = ChainMap(vsids_dict, chb_dict, dpll_dict)
-    final_dict[UNSOLVED_SUDOKU_PREFIX] = unsolved_sudoku
-    final_dict[f'{UNSOLVED_SUDOKU_PREFIX}_number_of_clues'] = 81 - unsolved_sudoku.count('.')
-    final_dict[f'{UNSOLVED_SUDOKU_PREFIX}_number_of_unknown_positions'] = unsolved_sudoku.count('.')
-    final_dict[f'{UNSOLVED_SUDOKU_PREFIX}_total_of_characters'] = len(unsolved_sudoku)
+        clues = from_matrix_to_clauses(propagation_result.matrix)
 
-    print(f'Finished sudoku {unsolved_sudoku}')
-    return dict(final_dict), CDCLHistory(unsolved_sudoku, chb_result.history, vsids_result.history)
+    rules = load_experiment_rules()
+    renumbering, total_variables = rules.renumbering, rules.total_variables
+    clues = renumbering.encode_clauses(clues)
+    clauses = clues + rules.clauses
+    cdcl_clauses, cardinality_constraints = clues + rules.cdcl_clauses, rules.cardinality_constraints
+    preprocessing = None
 
+    if USE_PREPROCESSING:
+        start_time = time.process_time()
+        preprocessing = preprocess(clauses, elimination=USE_VARIABLE_ELIMINATION)
+        end_time = time.process_time()
 
-def merge(data: list[dict]):
-    keys = set().union(*data)
-    return {
-        key: [dictionary[key] for dictionary in data if key in dictionary]
-        for key in keys
+        rows.append({**sudoku_dict, **preprocessing_results_to_dict(preprocessing, end_time - start_time)})
+
+        if preprocessing.is_unsatisfiable:
+            print(f'Finished sudoku {unsolved_sudoku} with preprocessing (CONTRADICTION)')
+            return rows, CDCLHistory(unsolved_sudoku, set(), set(), set()), {}
+
+        clauses = cdcl_clauses = preprocessing.clauses
+        if USE_CARDINALITY_CONSTRAINTS:
+            cdcl_clauses, cardinality_constraints = detect_cardinality_constraints(deepcopy(clauses))
+
+    dpll_result: DPLLResultWrapper = solve_sudoku_with_basic_dpll(deepcopy(clauses), unsolved_sudoku)
+
+    chb_result = solve_sudoku_with_chb(deepcopy(cdcl_clauses), total_variables, unsolved_sudoku,
+                                       cardinality_constraints)
+    vsids_result = solve_sudoku_with_vsids(deepcopy(cdcl_clauses), total_variables, unsolved_sudoku,
+                                           cardinality_constraints)
+    adaptive_result = solve_sudoku_with_adaptive(deepcopy(cdcl_clauses), total_variables, unsolved_sudoku,
+                                                 cardinality_constraints)
+    rows += [
+        {**sudoku_dict, **cdcl_results_to_dict(vsids_result, VSIDS_PREFIX)},
+        {**sudoku_dict, **cdcl_results_to_dict(chb_result, CHB_PREFIX)},
+        {**sudoku_dict, **cdcl_results_to_dict(adaptive_result, ADAPTIVE_PREFIX)},
+        {**sudoku_dict, **dpll_results_to_dict(dpll_result)},
+    ]
+
+    dpll_model = [variable if value else -variable for variable, value in dpll_result.assignment.items()]
+    models = {
+        VSIDS_PREFIX: vsids_result.result.solution,
+        CHB_PREFIX: chb_result.result.solution,
+        ADAPTIVE_PREFIX: adaptive_result.result.solution,
+        DPLL_PREFIX: dpll_model,
     }
 
+    if USE_LOCAL_SEARCH:
+        probsat_result = solve_sudoku_with_probsat(deepcopy(clauses), total_variables, unsolved_sudoku)
+        rows.append({**sudoku_dict, **local_search_results_to_dict(probsat_result)})
+        if probsat_result.result.status == SATResult.SATISFIABLE:
+            models[PROBSAT_PREFIX] = probsat_result.result.solution
+
+    if USE_LOOKAHEAD:
+        lookahead_result = solve_sudoku_with_lookahead(deepcopy(clauses), total_variables, unsolved_sudoku)
+        rows.append({**sudoku_dict, **lookahead_results_to_dict(lookahead_result)})
+        models[LOOKAHEAD_PREFIX] = lookahead_result.result.solution
+
+    # Solutions are validated for the whole run at once, see `validate_results`
+    solutions = {solver: renumbering.decode_literals(model if preprocessing is None else
+                                                     preprocessing.extend_model(model))
+                 for solver, model in models.items()}
+
+    print(f'Finished sudoku {unsolved_sudoku}')
+    return rows, CDCLHistory(unsolved_sudoku, chb_result.history, vsids_result.history,
+                             adaptive_result.history), solutions
+
+
+def validate_results(data: list[list[dict]], solutions: list[dict]):
+    """Fill `is_solution_valid` in the row of every solver with one vectorized check per solver."""
+    clues = decode_puzzles([rows[0][UNSOLVED_SUDOKU_PREFIX] for rows in data])
+
+    for solver in (VSIDS_PREFIX, CHB_PREFIX, ADAPTIVE_PREFIX, DPLL_PREFIX, PROBSAT_PREFIX, LOOKAHEAD_PREFIX,
+                   PROPAGATION_PREFIX, CACHE_PREFIX):
+        indexes = [index for index, solution in enumerate(solutions) if solver in solution]
+        if not indexes:
+            continue
+
+        matrices = decode_solutions([solutions[index][solver] for index in indexes],
+                                    load_experiment_rules().matrix_length)
+        for index, is_valid in zip(indexes, validate_solutions(matrices, clues[indexes])):
+            row = next(row for row in data[index] if row['solver'] == solver)
+            row['is_solution_valid'] = bool(is_valid)
+
+
+def store_results(run_id, first_puzzle_id, results, results_writer, history_writer, solution_cache=None):
+    """
+    Validate a batch of `solve_sudoku` results and append them to the results and history files.
+
+    :param solution_cache: `SolutionCache` to store the valid solutions in, None to store none
+    """
+    data, solutions = [result[0] for result in results], [result[2] for result in results]
+
+    validate_results(data, solutions)
+
+    if solution_cache is not None:
+        store_solutions(data, solutions, solution_cache)
+
+    result_rows, event_rows = [], []
+    for puzzle_id, (rows, history, _) in enumerate(results, start=first_puzzle_id):
+        for row in rows:
+            row['run_id'], row['puzzle_id'] = run_id, puzzle_id
+            row['dataset'], row['configuration'], row['seed'] = SUDOKU_DATASET_FILE_PATH, CONFIGURATION, 0
+        result_rows.extend(rows)
+
+        event_rows.extend(history_rows(run_id, puzzle_id, CHB_PREFIX, history.chb))
+        event_rows.extend(history_rows(run_id, puzzle_id, VSIDS_PREFIX, history.vsids))
+        event_rows.extend(history_rows(run_id, puzzle_id, ADAPTIVE_PREFIX, history.adaptive))
+
+    results_writer.write(result_rows)
+    history_writer.write(event_rows)
+
+    return resolved_stages(data)
+
 
 def main(args):
-    with Pool() as pool:
-        results = pool.map(solve_sudoku, args)
+    run_id = new_run_id()
+    stages = Counter()
+    print(f'Storing results of run {run_id} in {OUTPUT_PATH} and {HISTORY_PATH}')
+    # Loaded before the pool starts, so forked workers do not read the rules again
+    load_experiment_rules()
+
+    with Pool() as pool, ResultsWriter(OUTPUT_PATH, RESULTS_SCHEMA) as results_writer, \
+            ResultsWriter(HISTORY_PATH, HISTORY_SCHEMA) as history_writer:
+        batch, first_puzzle_id = [], 0
+        # Opened once the workers are forked, which open their own
+        solution_cache = open_solution_cache() if USE_SOLUTION_CACHE else None
 
-        data = merge([result[0] for result in results])
+        # Results are stored a batch at a time as they come in, in dataset order
+        for result in pool.imap(solve_sudoku, args):
+            batch.append(result)
 
-        sorted_data = dict(sorted(data.items(), key=lambda x: x[0].lower()))
+            if len(batch) == WRITE_BATCH_SIZE:
+                stages += store_results(run_id, first_puzzle_id, batch, results_writer, history_writer,
+                                        solution_cache)
+                batch, first_puzzle_id = [], first_puzzle_id + len(batch)
 
-        cdcl_history = [result[1] for result in results]
+        stages += store_results(run_id, first_puzzle_id, batch, results_writer, history_writer, solution_cache)
 
-        print('Storing metric results')
-        with open(OUTPUT_PATH, 'w', newline='') as file:
-            writer = csv.DictWriter(file, sorted_data.keys())
-            writer.writeheader()
-            rows = zip(*sorted_data.values())
-            writer.writerows(dict(zip(sorted_data.keys(), row)) for row in rows)
+        if solution_cache is not None:
+            solution_cache.close()
 
-        print('Storing history results')
-        with open("cbh_history.csv", 'w', newline='') as chb_history_file, open("vsids_history.csv", 'w',
-                                                                                newline='') as visids_history_file:
-            chb_history_writer = csv.DictWriter(chb_history_file, ['sudoku', 'event_type', 'count', 'datetime'])
-            chb_history_writer.writeheader()
+    report_resolved_stages(stages)
 
-            vsids_history_writer = csv.DictWriter(visids_history_file, ['sudoku', 'event_type', 'count', 'datetime'])
-            vsids_history_writer.writeheader()
 
-            for item in cdcl_history:
-                for event in item.chb:
-                    dictionary = event.to_dict()
-                    dictionary['sudoku'] = event.event_type = item.unsolved_sudoku
-                    chb_history_writer.writerow(dictionary)
+def resolved_stages(data: list[list[dict]]) -> Counter:
+    """Number of sudokus resolved by the solution cache, by propagation or by the SAT solvers."""
+    stages = Counter()
 
-                for event in item.vsids:
-                    dictionary = event.to_dict()
-                    dictionary['sudoku'] = event.event_type = item.unsolved_sudoku
-                    vsids_history_writer.writerow(dictionary)
+    for rows in data:
+        stage = next((row.get('stage') for row in rows if row['solver'] == PROPAGATION_PREFIX), None)
+        if any(row['solver'] == CACHE_PREFIX for row in rows):
+            stages[CACHE_PREFIX] += 1
+        else:
+            stages[stage or PropagationStage.REDUCED.name] += 1
+
+    return stages
+
+
+def report_resolved_stages(stages: Counter):
+    print('Puzzles resolved per stage:')
+    print(f'  solution cache: {stages[CACHE_PREFIX]}')
+    print(f'  propagation (solved): {stages[PropagationStage.SOLVED.name]}')
+    print(f'  propagation (contradiction): {stages[PropagationStage.CONTRADICTION.name]}')
+    print(f'  SAT solvers: {stages[PropagationStage.REDUCED.name]}')
 
 
 def get_unsolved_sudokus(file_path):
-    with open(file_path, 'r') as file:
-        return set(file.readlines())
+    """Sudokus of a dataset in file order, without duplicates, so rows are reproducible between runs."""
+    with PuzzleSet(file_path) as puzzles:
+        return list(dict.fromkeys(puzzles))
 
 
 class SudokuType(Enum):
@@ -187,15 +446,67 @@ def load_sudoku_setup_based_on(sudoku_type: SudokuType):
 
 VSIDS_PREFIX = 'VSIDS'
 CHB_PREFIX = 'CHB'
+ADAPTIVE_PREFIX = 'adaptive'
 DPLL_PREFIX = 'basic_DPLL'
+PROBSAT_PREFIX = 'probSAT'
+LOOKAHEAD_PREFIX = 'lookahead'
 UNSOLVED_SUDOKU_PREFIX = 'unsolved_sudoku'
-
-OUTPUT_PATH = 'experiment_result_9x9_final_with_history.csv'
+PROPAGATION_PREFIX = 'propagation'
+CACHE_PREFIX = 'solution_cache'
+PREPROCESSING_PREFIX = 'preprocessing'
+
+USE_PROPAGATION_PRE_PASS = True
+USE_CARDINALITY_CONSTRAINTS = True
+# Also run the probSAT local search on every sudoku. Off by default: it gives up on hard sudokus only after its whole
+# flip budget, which takes seconds
+USE_LOCAL_SEARCH = False
+LOCAL_SEARCH_SEED = 0
+# Also run the lookahead DPLL on every sudoku, whose nodes per second are reported with its metrics
+USE_LOOKAHEAD = False
+# Simplify every CNF with `cnf_preprocessor` before the solvers. Off by default: probing alone solves most sudokus,
+# leaving the solvers nothing to compare on.
+USE_PREPROCESSING = False
+# Variable elimination in the preprocessing speeds CDCL up but its long resolvents slow the basic DPLL down a lot
+USE_VARIABLE_ELIMINATION = False
+# Answers sudokus (and their symmetric variants) solved in earlier runs without solving them, which also skips
+# their solver metrics. Off by default so the metrics cover every sudoku.
+USE_SOLUTION_CACHE = False
+# Bytes a CDCL solve may use before it reduces its clause database, then gives up with UNKNOWN. None for no limit.
+# Applies to the RSS of the worker process, or to its traced Python allocations with TRACE_MEMORY.
+MEMORY_LIMIT = None
+# Trace the Python allocations of every solve for exact peaks, at the cost of a several times slower search
+TRACE_MEMORY = False
+
+OUTPUT_PATH = 'experiment_results.parquet'
+HISTORY_PATH = 'experiment_history.parquet'
+# Sudokus validated and written to the results at a time
+WRITE_BATCH_SIZE = 256
 
 SUDOKU_DATASET_FILE_PATH = '../../test_sets/all_9x9.txt'
+SUDOKU_TYPE = SudokuType.SUDOKU_9_BY_9
+
+CONFIGURATION = f'propagation={USE_PROPAGATION_PRE_PASS},cardinality={USE_CARDINALITY_CONSTRAINTS},' \
+                f'preprocessing={USE_PREPROCESSING},elimination={USE_VARIABLE_ELIMINATION},' \
+                f'backend={select_backend()},memory_limit={MEMORY_LIMIT}'
+
+
+@lru_cache(maxsize=None)
+def load_experiment_rules() -> ExperimentRules:
+    """Rules of `SUDOKU_TYPE`, read on first use so that importing this module reads no file."""
+    matrix_length, rule_file_path = load_sudoku_setup_based_on(SUDOKU_TYPE)
+    sudoku_rules, _ = read_dimacs_file(rule_file_path)
+
+    # Solvers work on dense variables, solutions are mapped back before validation
+    renumbering = VariableRenumbering(sudoku_rules)
+    clauses = renumbering.encode_clauses(sudoku_rules)
+
+    cdcl_clauses, cardinality_constraints = clauses, ()
+    if USE_CARDINALITY_CONSTRAINTS:
+        cdcl_clauses, cardinality_constraints = detect_cardinality_constraints(clauses)
+
+    return ExperimentRules(matrix_length, renumbering, clauses, renumbering.total_variables, cdcl_clauses,
+                           cardinality_constraints, rules_namespace(sudoku_rules))
 
-matrix_length, rule_file_path = load_sudoku_setup_based_on(SudokuType.SUDOKU_9_BY_9)
-sudoku_rules, total_variables = read_dimacs_file(rule_file_path)
 
 if __name__ == "__main__":
     unsolved_sudokus = list(get_unsolved_sudokus(SUDOKU_DATASET_FILE_PATH))
@@ -0,0 +1,90 @@
+"""
+Conflicts per puzzle of the CDCL strategies with and without a learned-clause library (see `lemma_library`).
+
+The first `--train` puzzles of a dataset are solved and their learned clauses recorded into a fresh library. Then
+every puzzle is solved again with the library preloaded: the training puzzles measure repeated solves, the other
+puzzles measure how the library carries over to sudokus it was not built from. Sudokus are solved without the
+propagation pre-pass, like in the experiment sweeps.
+
+Run from the repository root:
+
+    python -m Scripts.experiments.lemma_library_benchmark test_sets/top95.sdk.txt --train 50
+"""
+import argparse
+import statistics
+import tempfile
+
+from Scripts.cdcl_kernels import make_cdcl_solver
+from Scripts.helpers.lemma_library import DEFAULT_MAX_SIZE, DEFAULT_MAX_LBD
+from Scripts.helpers.puzzle_set import PuzzleSet
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix, from_matrix_to_clauses
+from Scripts.warm_solver import load_rules, load_lemma_library, make_heuristics, VSIDS, CDCL_STRATEGIES
+
+DEFAULT_TRAINING_PUZZLES = 50
+
+
+def count_conflicts(puzzle, strategy, lemmas=(), library=None):
+    """
+    :param lemmas: (LBD, literals) of the library clauses to preload, see `LemmaLibrary.select`
+    :param library: `LemmaLibrary` the learned clauses are recorded into, None to not record them
+    :return: the conflicts of one solve
+    """
+    matrix = from_sudoku_string_to_matrix(puzzle)
+    rules = load_rules(len(matrix))
+    clues = rules.renumbering.encode_clauses(from_matrix_to_clauses(matrix))
+
+    lemmas = [(lbd, rules.renumbering.encode_clauses([literals])[0]) for lbd, literals in lemmas]
+    lemma_log = [] if library is not None else None
+
+    solver = make_cdcl_solver(clues + [list(clause) for clause in rules.cdcl_clauses],
+                              rules.renumbering.total_variables, make_heuristics(strategy),
+                              rules.cardinality_constraints, lemma_log=lemma_log)
+    solver.solve(lemmas)
+
+    if library is not None:
+        library.record([(lbd, rules.renumbering.decode_literals(literals)) for lbd, literals in lemma_log],
+                       rules.renumbering.decode_literals([clue for clue, in clues]))
+
+    return solver.statistics.conflicts_counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('dataset')
+    parser.add_argument('--train', type=int, default=DEFAULT_TRAINING_PUZZLES,
+                        help='puzzles the library is built from')
+    parser.add_argument('--limit', type=int, default=None, help='puzzles of the dataset to use')
+    parser.add_argument('--strategy', choices=CDCL_STRATEGIES, default=VSIDS)
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE, help='longest preloaded clause')
+    parser.add_argument('--max-lbd', type=int, default=DEFAULT_MAX_LBD, help='biggest LBD of a preloaded clause')
+    arguments = parser.parse_args()
+
+    with PuzzleSet(arguments.dataset) as puzzle_set:
+        puzzles = list(puzzle_set)[:arguments.limit]
+    training, held_out = puzzles[:arguments.train], puzzles[arguments.train:]
+
+    with tempfile.TemporaryDirectory() as directory:
+        library = load_lemma_library(len(from_sudoku_string_to_matrix(puzzles[0])), directory)
+
+        cold = [count_conflicts(puzzle, arguments.strategy, library=library) for puzzle in training]
+        cold += [count_conflicts(puzzle, arguments.strategy) for puzzle in held_out]
+
+        lemmas = library.select(arguments.max_size, arguments.max_lbd)
+        warm = [count_conflicts(puzzle, arguments.strategy, lemmas) for puzzle in puzzles]
+
+        print(f'Library: {len(library)} clauses recorded from {len(training)} puzzles, {len(lemmas)} preloaded '
+              f'(size <= {arguments.max_size}, LBD <= {arguments.max_lbd})')
+
+    print(f'{"puzzles":<12}{"count":>8}{"conflicts":>12}{"with library":>14}{"change":>9}{"median":>8}'
+          f'{"with library":>14}')
+    for name, indexes in (('training', range(len(training))), ('held out', range(len(training), len(puzzles)))):
+        if not indexes:
+            continue
+        before, after = [cold[index] for index in indexes], [warm[index] for index in indexes]
+        change = (sum(after) - sum(before)) / sum(before) if sum(before) else 0.0
+        print(f'{name:<12}{len(indexes):>8}{statistics.mean(before):>12.1f}{statistics.mean(after):>14.1f}'
+              f'{change:>+9.1%}{statistics.median(before):>8.0f}{statistics.median(after):>14.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Propagations per second of the CDCL backends (see `cdcl_kernels`).
+
+Every backend propagates the same random decisions on an instance: unassigned literals are decided one at a time,
+each followed by propagation, until a conflict or a full assignment, then the solver backjumps to level 0. Literals
+implied by propagation count as propagations, and only the propagation calls are timed. Both backends reach the same
+propagation fixpoints, so they do the same work up to the order of the implied literals.
+
+Run from the repository root:
+
+    python -m Scripts.experiments.propagation_benchmark examples/*.cnf --rounds 200
+"""
+import argparse
+import random
+import time
+from copy import deepcopy
+
+from Scripts.cdcl_heuristics_solver import CDCLSatSolver
+from Scripts.cdcl_kernels import KernelCDCLSatSolver, IS_NUMBA_AVAILABLE, PYTHON_BACKEND, NUMBA_BACKEND
+from Scripts.helpers.dimacs_reader import read_dimacs_file
+from Scripts.helpers.variable_renumbering import VariableRenumbering
+from Scripts.heuristics.VSIDS import VSIDSHeuristics
+
+DEFAULT_ROUNDS = 200
+
+
+def measure(solver_class, clauses, total_variables, rounds, seed):
+    """:return: propagations and the seconds spent propagating them"""
+    solver = solver_class(deepcopy(clauses), total_variables, VSIDSHeuristics())
+    if not solver.prepare():
+        return 0, 0.0
+
+    is_kernel = isinstance(solver, KernelCDCLSatSolver)
+    trail_size = (lambda: solver.trail_size) if is_kernel else (lambda: len(solver.assignment))
+    is_assigned = (lambda variable: solver.values[2 * variable] != 0) if is_kernel else \
+        (lambda variable: variable in solver.true_literals or -variable in solver.true_literals)
+
+    randomizer = random.Random(seed)
+    variables = list(range(1, total_variables + 1))
+    propagations, elapsed_time = 0, 0.0
+
+    for _ in range(rounds):
+        randomizer.shuffle(variables)
+
+        for variable in variables:
+            if is_assigned(variable):
+                continue
+
+            solver.assign(variable if randomizer.getrandbits(1) else -variable)
+            size = trail_size()
+
+            start_time = time.perf_counter()
+            conflict = solver.two_watch_propagate()
+            elapsed_time += time.perf_counter() - start_time
+
+            propagations += trail_size() - size
+            if conflict is not None:
+                break
+
+        if solver.decision_levels:
+            solver.backjump(0)
+
+    return propagations, elapsed_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('cnf_files', nargs='+')
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help='decision sequences per instance')
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    backends = [(PYTHON_BACKEND, CDCLSatSolver)]
+    if IS_NUMBA_AVAILABLE:
+        backends.append((NUMBA_BACKEND, KernelCDCLSatSolver))
+        # Compile the kernels before anything is timed
+        measure(KernelCDCLSatSolver, [[1, 2, 3], [-1, 2], [-2, -3]], 3, 1, arguments.seed)
+    else:
+        print('Numba is not installed, only the python backend is measured')
+
+    print(f'{"instance":<32}{"backend":<10}{"propagations":>14}{"seconds":>10}{"per second":>14}')
+    for cnf_file in arguments.cnf_files:
+        clauses, _ = read_dimacs_file(cnf_file)
+        renumbering = VariableRenumbering(clauses)
+        clauses = renumbering.encode_clauses(clauses)
+
+        rates = {}
+        for backend, solver_class in backends:
+            propagations, elapsed_time = measure(solver_class, clauses, renumbering.total_variables,
+                                                 arguments.rounds, arguments.seed)
+            rates[backend] = propagations / elapsed_time if elapsed_time else 0.0
+            print(f'{cnf_file[-31:]:<32}{backend:<10}{propagations:>14}{elapsed_time:>10.3f}{rates[backend]:>14.0f}')
+
+        if rates.get(PYTHON_BACKEND) and NUMBA_BACKEND in rates:
+            print(f'{"":<32}speedup {rates[NUMBA_BACKEND] / rates[PYTHON_BACKEND]:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
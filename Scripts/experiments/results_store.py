@@ -0,0 +1,232 @@
+"""
+Experiment results in long format, one row per (run, puzzle, solver), stored as compressed Parquet files.
+
+Every solver metric has its own typed column instead of a `<solver>_<metric>` column per solver, so results of
+different runs, datasets and configurations can be appended to the same files and analysed with a `groupby`.
+Metrics a solver does not collect are null.
+"""
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+COMPRESSION = 'zstd'
+
+RESULTS_SCHEMA = pa.schema([
+    ('run_id', pa.string()),
+    ('dataset', pa.string()),
+    ('configuration', pa.string()),
+    ('seed', pa.int64()),
+    ('puzzle_id', pa.int64()),
+    ('unsolved_sudoku', pa.string()),
+    ('number_of_clues', pa.int32()),
+    ('number_of_unknown_positions', pa.int32()),
+    ('total_of_characters', pa.int32()),
+    ('solver', pa.string()),
+    ('stage', pa.string()),
+    ('is_satisfied', pa.bool_()),
+    ('is_solution_valid', pa.bool_()),
+    ('elapsed_time', pa.float64()),
+    ('peak_rss', pa.int64()),
+    ('peak_traced_memory', pa.int64()),
+    ('conflicts', pa.int64()),
+    ('decisions', pa.int64()),
+    ('implications', pa.int64()),
+    ('learned_clauses', pa.int64()),
+    ('successful_backjumps', pa.int64()),
+    ('failed_backjumps', pa.int64()),
+    ('heuristic_switches', pa.int64()),
+    ('minimized_literals', pa.int64()),
+    ('memory_reductions', pa.int64()),
+    ('deleted_clauses', pa.int64()),
+    ('backtracks', pa.int64()),
+    ('recursions', pa.int64()),
+    ('clause_simplifications', pa.int64()),
+    ('pure_literals', pa.int64()),
+    ('naked_singles', pa.int64()),
+    ('hidden_singles', pa.int64()),
+    ('locked_candidates', pa.int64()),
+    ('flips', pa.int64()),
+    ('tries', pa.int64()),
+    ('nodes', pa.int64()),
+    ('lookaheads', pa.int64()),
+    ('nodes_per_second', pa.float64()),
+    ('variables_before', pa.int64()),
+    ('variables_after', pa.int64()),
+    ('clauses_before', pa.int64()),
+    ('clauses_after', pa.int64()),
+    ('fixed_variables', pa.int64()),
+    ('failed_literals', pa.int64()),
+    ('eliminated_variables', pa.int64()),
+    ('subsumed_clauses', pa.int64()),
+    ('strengthened_clauses', pa.int64()),
+])
+
+HISTORY_SCHEMA = pa.schema([
+    ('run_id', pa.string()),
+    ('puzzle_id', pa.int64()),
+    ('solver', pa.string()),
+    ('event_type', pa.string()),
+    ('count', pa.int64()),
+    ('datetime', pa.timestamp('us')),
+])
+
+# `Statistics` attributes of CDCLSatSolver and their columns
+CDCL_METRICS = {
+    'conflicts_counter': 'conflicts',
+    'decision_counter': 'decisions',
+    'implications_counter': 'implications',
+    'learned_counter': 'learned_clauses',
+    'successful_backjumps_counter': 'successful_backjumps',
+    'failed_backjumps_counter': 'failed_backjumps',
+    'heuristic_switches_counter': 'heuristic_switches',
+    'minimized_literals_counter': 'minimized_literals',
+    'memory_reductions_counter': 'memory_reductions',
+    'deleted_clauses_counter': 'deleted_clauses',
+    'peak_rss': 'peak_rss',
+    'peak_traced_memory': 'peak_traced_memory',
+}
+
+# `MemoryMonitor` attributes of the solvers without `Statistics`, stored under the same names
+MEMORY_METRICS = (
+    'peak_rss',
+    'peak_traced_memory',
+)
+
+# Statistics of `dpll` and their columns
+DPLL_METRICS = {
+    'conflicts': 'conflicts',
+    'decisions': 'decisions',
+    'implications': 'implications',
+    'backtracks': 'backtracks',
+    'recursions': 'recursions',
+    'clause_simplifications': 'clause_simplifications',
+    'pure_literals': 'pure_literals',
+}
+
+# `LocalSearchStatistics` attributes of a local search run and their columns
+LOCAL_SEARCH_METRICS = {
+    'flips': 'flips',
+    'tries': 'tries',
+}
+
+# `LookaheadStatistics` attributes of a lookahead DPLL run and their columns
+LOOKAHEAD_METRICS = {
+    'nodes': 'nodes',
+    'backtracks': 'backtracks',
+    'lookaheads': 'lookaheads',
+    'failed_literals': 'failed_literals',
+    'nodes_per_second': 'nodes_per_second',
+}
+
+# `PreprocessingReport` attributes of the CNF preprocessing, stored under the same names
+PREPROCESSING_METRICS = (
+    'variables_before',
+    'variables_after',
+    'clauses_before',
+    'clauses_after',
+    'fixed_variables',
+    'failed_literals',
+    'eliminated_variables',
+    'subsumed_clauses',
+    'strengthened_clauses',
+)
+
+
+def new_run_id():
+    return f'{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}'
+
+
+def cdcl_metrics(statistics) -> dict:
+    """Columns of the `Statistics` of a CDCL run."""
+    return {column: getattr(statistics, attribute) for attribute, column in CDCL_METRICS.items()}
+
+
+def dpll_metrics(statistics: dict) -> dict:
+    """Columns of the statistics dict of a DPLL run."""
+    return {column: statistics[key] for key, column in DPLL_METRICS.items()}
+
+
+def local_search_metrics(statistics) -> dict:
+    """Columns of the `LocalSearchStatistics` of a local search run."""
+    return {column: getattr(statistics, attribute) for attribute, column in LOCAL_SEARCH_METRICS.items()}
+
+
+def lookahead_metrics(statistics) -> dict:
+    """Columns of the `LookaheadStatistics` of a lookahead DPLL run."""
+    return {column: getattr(statistics, attribute) for attribute, column in LOOKAHEAD_METRICS.items()}
+
+
+def memory_metrics(monitor) -> dict:
+    """Columns of the `MemoryMonitor` a solve was run in."""
+    return {column: getattr(monitor, column) for column in MEMORY_METRICS}
+
+
+def preprocessing_metrics(report) -> dict:
+    """Columns of the `PreprocessingReport` of a CNF preprocessing."""
+    return {column: getattr(report, column) for column in PREPROCESSING_METRICS}
+
+
+def history_rows(run_id, puzzle_id, solver, events) -> list[dict]:
+    """Rows of the `HistoryManager` events of a CDCL run, in the order they happened."""
+    return [{
+        'run_id': run_id,
+        'puzzle_id': puzzle_id,
+        'solver': solver,
+        'event_type': event.event_type[0].value,
+        'count': event.count,
+        'datetime': event.datetime,
+    } for event in sorted(events, key=lambda event: event.datetime)]
+
+
+class ResultsWriter:
+    """
+    Appends rows to a Parquet file as they are produced, one row group per `write`, so a run never holds all of its
+    results in memory and the rows written so far are kept when it stops early.
+    """
+
+    def __init__(self, path, schema=RESULTS_SCHEMA, compression=COMPRESSION):
+        self.schema = schema
+        self.writer = pq.ParquetWriter(path, schema, compression=compression)
+
+    def write(self, rows: list[dict]):
+        if not rows:
+            return
+
+        unknown_columns = {key for row in rows for key in row} - set(self.schema.names)
+        if unknown_columns:
+            raise ValueError(f'Columns not in the results schema: {", ".join(sorted(unknown_columns))}')
+
+        self.writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_results(path) -> pd.DataFrame:
+    """Results of a file, or of every file of a directory, with `solver` as a categorical column."""
+    results = pq.read_table(path, schema=RESULTS_SCHEMA).to_pandas()
+    results['solver'] = results['solver'].astype('category')
+
+    return results
+
+
+def load_history(path) -> pd.DataFrame:
+    return pq.read_table(path, schema=HISTORY_SCHEMA).to_pandas()
+
+
+def merge_result_files(paths, output_path, schema=RESULTS_SCHEMA):
+    """Concatenate result files into one, a row group at a time."""
+    with ResultsWriter(output_path, schema) as writer:
+        for path in paths:
+            parquet_file = pq.ParquetFile(path)
+            for index in range(parquet_file.num_row_groups):
+                writer.writer.write_table(parquet_file.read_row_group(index).cast(schema))
@@ -0,0 +1,507 @@
+"""
+Experiment sweeps (solvers x datasets x seeds) spread over several machines sharing a filesystem.
+
+A sweep is planned once into a queue directory. Every dataset is split in `k-of-n` shards (see `PuzzleSet.shard`)
+and each (solver, dataset, seed, shard) combination is one unit of work:
+
+    <queue>/queue.json              the run id and the shards of the sweep
+    <queue>/claims/<shard>.lock     held by the worker solving the shard, its mtime is the worker's heartbeat
+    <queue>/results/<shard>.parquet one row per puzzle (see `results_store.py`), written atomically once done
+
+Workers on any node claim shards by creating their lock file exclusively, refresh it while they solve and publish
+the shard's result file before releasing it. A lock that was not refreshed for longer than the lease belongs to a
+dead worker and is taken over by the next worker looking for work. `merge` concatenates the result files, which
+`load_results` can also read directly from the results directory.
+
+Seed 0 solves the clauses in their original order, other seeds shuffle the clauses, constraints and their literals,
+which changes the search of the otherwise deterministic solvers.
+
+Usage (from the repository root):
+    python -m Scripts.experiments.sharded_experiment plan QUEUE --datasets test_sets/top95.sdk.txt --shards 8
+    python -m Scripts.experiments.sharded_experiment work QUEUE          # on every node, as often as wanted
+    python -m Scripts.experiments.sharded_experiment merge QUEUE results.parquet
+    python -m Scripts.experiments.sharded_experiment local QUEUE --workers 4 --output results.parquet
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass, asdict, replace
+
+from Scripts.cdcl_heuristics_solver import SATResult
+from Scripts.cdcl_kernels import make_cdcl_solver, select_backend
+from Scripts.experiments.batch_sudoku_validator import decode_puzzles, decode_solutions, validate_solutions
+from Scripts.experiments.results_store import ResultsWriter, cdcl_metrics, dpll_metrics, merge_result_files, \
+    new_run_id, local_search_metrics, lookahead_metrics, memory_metrics
+from Scripts.helpers.memory_monitor import MemoryMonitor
+from Scripts.helpers.puzzle_set import PuzzleSet
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix, from_matrix_to_clauses
+from Scripts.local_search import local_search
+from Scripts.lookahead_dpll import LookaheadSolver
+from Scripts.simple_dpll import dpll
+from Scripts.warm_solver import load_rules, make_heuristics, STRATEGIES, DPLL, PROBSAT, LOOKAHEAD
+
+# A claim whose lock file was not refreshed for this long (in seconds) is considered abandoned
+LEASE_SECONDS = 120
+# How often a worker waits for the shards claimed by others before looking again, in seconds
+IDLE_INTERVAL = 2.0
+# Bytes a CDCL solve may use before it reduces its clause database, then gives up with UNKNOWN, None for no limit (see
+# experiment_runner.MEMORY_LIMIT)
+MEMORY_LIMIT = None
+# Trace the Python allocations of every solve for exact peaks, at the cost of a several times slower search
+TRACE_MEMORY = False
+
+QUEUE_FILE = 'queue.json'
+CLAIMS_DIRECTORY = 'claims'
+RESULTS_DIRECTORY = 'results'
+# Sweeps solve sudokus without the propagation pre-pass, so the solvers see every sudoku. The numba backend (see
+# cdcl_kernels) solves with the clauses of the cardinality constraints
+CONFIGURATION = f'propagation=False,cardinality=True,backend={select_backend()},memory_limit={MEMORY_LIMIT}'
+
+
+@dataclass(frozen=True)
+class Shard:
+    solver: str
+    dataset: str
+    seed: int
+    shard_index: int
+    shard_count: int
+
+    @property
+    def name(self):
+        dataset = os.path.splitext(os.path.basename(self.dataset))[0].replace(' ', '_')
+        return f'{self.solver}-{dataset}-seed{self.seed}-{self.shard_index:04d}of{self.shard_count:04d}'
+
+
+def plan_sweep(queue_directory, datasets, solvers=STRATEGIES, seeds=(0,), shard_count=1):
+    """
+    Create the queue of a sweep. Planning an existing queue again keeps its shards, so every node can run it.
+
+    :param datasets: puzzle files, with paths valid on every node
+    :return: the shards of the queue
+    """
+    queue = ShardQueue(queue_directory)
+
+    if os.path.exists(queue.queue_path):
+        return queue.shards
+
+    for solver in solvers:
+        if solver not in STRATEGIES:
+            raise ValueError(f'Unknown solver {solver!r}, expected one of {", ".join(STRATEGIES)}')
+
+    shards = [Shard(solver, dataset, seed, shard_index, shard_count)
+              for dataset in datasets for solver in solvers for seed in seeds for shard_index in range(shard_count)]
+
+    os.makedirs(queue.claims_directory, exist_ok=True)
+    os.makedirs(queue.results_directory, exist_ok=True)
+
+    temporary_path = f'{queue.queue_path}.{uuid.uuid4().hex}'
+    with open(temporary_path, 'w') as file:
+        json.dump({'run_id': new_run_id(), 'shards': [asdict(shard) for shard in shards]}, file, indent=1)
+    os.replace(temporary_path, queue.queue_path)
+
+    return shards
+
+
+class ShardQueue:
+    """
+    Shards of a planned sweep and their claims. Claims only rely on exclusive file creation, atomic renames and links,
+    which shared filesystems provide, so workers of different nodes never need to talk to each other.
+    """
+
+    def __init__(self, queue_directory, lease=LEASE_SECONDS):
+        self.directory = queue_directory
+        self.lease = lease
+        self.queue_path = os.path.join(queue_directory, QUEUE_FILE)
+        self.claims_directory = os.path.join(queue_directory, CLAIMS_DIRECTORY)
+        self.results_directory = os.path.join(queue_directory, RESULTS_DIRECTORY)
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    @property
+    def run_id(self):
+        return self._read_queue()['run_id']
+
+    @property
+    def shards(self):
+        return [Shard(**shard) for shard in self._read_queue()['shards']]
+
+    def lock_path(self, shard):
+        return os.path.join(self.claims_directory, f'{shard.name}.lock')
+
+    def result_path(self, shard):
+        return os.path.join(self.results_directory, f'{shard.name}.parquet')
+
+    def is_done(self, shard):
+        return os.path.exists(self.result_path(shard))
+
+    def is_stale(self, shard):
+        return self._is_expired(self.lock_path(shard))
+
+    def claim(self, shard):
+        """Claim a shard that is neither done nor held by a live worker, returning whether it succeeded."""
+        if self.is_done(shard):
+            return False
+
+        if self._lock_unless_done(shard):
+            return True
+
+        lock_path = self.lock_path(shard)
+        abandoned_owner = self._lock_owner(lock_path)
+        if abandoned_owner is None or not self.is_stale(shard):
+            return False
+
+        abandoned_path = f'{lock_path}.abandoned-{uuid.uuid4().hex}'
+        try:
+            os.rename(lock_path, abandoned_path)
+        except FileNotFoundError:
+            return False
+
+        # Another worker may have reclaimed the shard between the checks and the rename, which then moved away its
+        # fresh lock instead of the abandoned one: put that lock back and leave the shard to its new owner
+        if self._lock_owner(abandoned_path) != abandoned_owner or not self._is_expired(abandoned_path):
+            self._restore_lock(abandoned_path, lock_path)
+            return False
+
+        os.remove(abandoned_path)
+        print(f'Reclaiming abandoned shard {shard.name}')
+
+        return self._lock_unless_done(shard)
+
+    def heartbeat(self, shard):
+        try:
+            os.utime(self.lock_path(shard))
+        except FileNotFoundError:
+            pass
+
+    def complete(self, shard, rows):
+        """Publish the rows of a claimed shard and release it."""
+        temporary_path = f'{self.result_path(shard)}.{self.owner.replace(":", "_")}'
+        with ResultsWriter(temporary_path) as writer:
+            writer.write(rows)
+        os.replace(temporary_path, self.result_path(shard))
+
+        self.release(shard)
+
+    def release(self, shard):
+        try:
+            os.remove(self.lock_path(shard))
+        except FileNotFoundError:
+            pass
+
+    def status(self):
+        """Number of shards done, claimed by live workers, abandoned and waiting."""
+        counts = {'done': 0, 'running': 0, 'abandoned': 0, 'waiting': 0}
+
+        for shard in self.shards:
+            if self.is_done(shard):
+                counts['done'] += 1
+            elif self.is_stale(shard):
+                counts['abandoned'] += 1
+            elif os.path.exists(self.lock_path(shard)):
+                counts['running'] += 1
+            else:
+                counts['waiting'] += 1
+
+        return counts
+
+    def _read_queue(self):
+        with open(self.queue_path) as file:
+            return json.load(file)
+
+    def _is_expired(self, lock_path):
+        try:
+            return time.time() - os.stat(lock_path).st_mtime > self.lease
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _lock_owner(lock_path):
+        """Owner written in a lock file, None when it is gone."""
+        try:
+            with open(lock_path) as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _restore_lock(moved_path, lock_path):
+        # A link, unlike a rename, never replaces a lock created in the meantime
+        try:
+            os.link(moved_path, lock_path)
+        except FileExistsError:
+            pass
+        os.remove(moved_path)
+
+    def _lock_unless_done(self, shard):
+        try:
+            descriptor = os.open(self.lock_path(shard), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(f'{self.owner}\n')
+
+        # The shard may have been completed (and its lock released) since `claim` checked it
+        if self.is_done(shard):
+            self.release(shard)
+            return False
+
+        return True
+
+
+class _Heartbeat:
+    """Refreshes the lock of a shard while it is being solved."""
+
+    def __init__(self, queue: ShardQueue, shard: Shard):
+        self.queue = queue
+        self.shard = shard
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._beat, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def _beat(self):
+        while not self.stopped.wait(self.queue.lease / 4):
+            self.queue.heartbeat(self.shard)
+
+
+def run_worker(queue_directory, lease=LEASE_SECONDS):
+    """
+    Solve shards of the queue until every shard is done, waiting for the shards claimed by other workers in case
+    their workers die.
+
+    :return: number of shards solved by this worker
+    """
+    queue = ShardQueue(queue_directory, lease)
+    shards = queue.shards
+    # Workers start at different places of the queue, so they rarely race for the same lock
+    random.Random(queue.owner).shuffle(shards)
+
+    solved = 0
+    while True:
+        remaining = [shard for shard in shards if not queue.is_done(shard)]
+        if not remaining:
+            return solved
+
+        claimed = next((shard for shard in remaining if queue.claim(shard)), None)
+        if claimed is None:
+            time.sleep(IDLE_INTERVAL)
+            continue
+
+        print(f'{queue.owner} solving shard {claimed.name}')
+        try:
+            with _Heartbeat(queue, claimed):
+                rows = solve_shard(claimed, queue.run_id)
+        except BaseException:
+            queue.release(claimed)
+            raise
+
+        queue.complete(claimed, rows)
+        solved += 1
+
+
+def solve_shard(shard: Shard, run_id) -> list[dict]:
+    """Solve every puzzle of a shard, one result row per puzzle."""
+    with PuzzleSet(shard.dataset) as puzzles:
+        items = list(puzzles.shard(shard.shard_index, shard.shard_count))
+
+    rows, solutions = [], []
+    for puzzle_id, puzzle in items:
+        row, solution = solve_puzzle(puzzle, shard.solver, shard.seed)
+        rows.append({'run_id': run_id, 'dataset': shard.dataset, 'configuration': CONFIGURATION, 'seed': shard.seed,
+                     'puzzle_id': puzzle_id, 'unsolved_sudoku': puzzle, 'solver': shard.solver, **row})
+        solutions.append(solution)
+
+    if items:
+        matrix_length = math.isqrt(len(items[0][1]))
+        matrices = decode_solutions(solutions, matrix_length)
+        clues = decode_puzzles([puzzle for _, puzzle in items])
+        for row, is_valid in zip(rows, validate_solutions(matrices, clues)):
+            row['is_solution_valid'] = bool(is_valid)
+
+    return rows
+
+
+def solve_puzzle(puzzle, solver, seed=0):
+    """
+    :return: the metric columns of the solver and its solution (DIMACS literals, original numbering, empty when UNSAT)
+    """
+    matrix = from_sudoku_string_to_matrix(puzzle)
+    rules = load_rules(len(matrix))
+    clues = rules.renumbering.encode_clauses(from_matrix_to_clauses(matrix))
+    memory = MemoryMonitor(MEMORY_LIMIT, TRACE_MEMORY)
+
+    if solver == DPLL:
+        clauses, _ = _shuffled(clues + rules.clauses, (), seed)
+        statistics = {
+            'implications': 0,
+            'decisions': 0,
+            'backtracks': 0,
+            'recursions': 0,
+            'conflicts': 0,
+            'clause_simplifications': 0,
+            'pure_literals': 0,
+        }
+
+        with memory:
+            start_time = time.process_time()
+            is_satisfiable, assignment, statistics = dpll(clauses, statistics, {})
+            elapsed_time = time.process_time() - start_time
+        statistics = {**dpll_metrics(statistics), **memory_metrics(memory)}
+
+        solution = [variable if value else -variable
+                    for variable, value in rules.renumbering.decode_assignment(assignment).items()]
+    elif solver == PROBSAT:
+        clauses, _ = _shuffled(clues + rules.clauses, (), seed)
+
+        with memory:
+            start_time = time.process_time()
+            result = local_search(clauses, rules.renumbering.total_variables, seed=seed)
+            elapsed_time = time.process_time() - start_time
+
+        # Giving up says nothing about satisfiability
+        is_satisfiable = None if result.status == SATResult.UNKNOWN else result.status == SATResult.SATISFIABLE
+        statistics = {**local_search_metrics(result.statistics), **memory_metrics(memory)}
+        solution = rules.renumbering.decode_literals(result.solution)
+    elif solver == LOOKAHEAD:
+        clauses, _ = _shuffled(clues + rules.clauses, (), seed)
+
+        with memory:
+            start_time = time.process_time()
+            result = LookaheadSolver(clauses, rules.renumbering.total_variables).solve()
+            elapsed_time = time.process_time() - start_time
+
+        is_satisfiable = result.status == SATResult.SATISFIABLE
+        statistics = {**lookahead_metrics(result.statistics), **memory_metrics(memory)}
+        solution = rules.renumbering.decode_literals(result.solution)
+    else:
+        clauses, cardinality_constraints = _shuffled(clues + rules.cdcl_clauses, rules.cardinality_constraints, seed)
+        sat_solver = make_cdcl_solver(clauses, rules.renumbering.total_variables, make_heuristics(solver),
+                                      cardinality_constraints, memory_monitor=memory)
+
+        start_time = time.process_time()
+        result = sat_solver.solve()
+        elapsed_time = time.process_time() - start_time
+
+        # Stopped by the memory limit
+        is_satisfiable = None if result.status == SATResult.UNKNOWN else result.status == SATResult.SATISFIABLE
+        statistics = cdcl_metrics(result.statistics)
+        solution = rules.renumbering.decode_literals(result.solution)
+
+    clue_count = len(puzzle) - puzzle.count('.')
+    row = {'number_of_clues': clue_count, 'number_of_unknown_positions': len(puzzle) - clue_count,
+           'total_of_characters': len(puzzle), 'is_satisfied': is_satisfiable, 'elapsed_time': elapsed_time,
+           **statistics}
+    return row, solution if is_satisfiable else []
+
+
+def _shuffled(clauses, cardinality_constraints, seed):
+    """
+    Copies of the clauses and constraints, shuffled (including their literals) for non-zero seeds. Score ties of the
+    heuristics are broken by the order literals are first seen, so this changes which variables get decided.
+    """
+    clauses = [list(clause) for clause in clauses]
+    if not seed:
+        return clauses, cardinality_constraints
+
+    generator = random.Random(seed)
+    for clause in clauses:
+        generator.shuffle(clause)
+    generator.shuffle(clauses)
+
+    cardinality_constraints = [replace(constraint, literals=tuple(generator.sample(constraint.literals,
+                                                                                   len(constraint.literals))))
+                               for constraint in cardinality_constraints]
+    generator.shuffle(cardinality_constraints)
+
+    return clauses, cardinality_constraints
+
+
+def merge_results(queue_directory, output_path):
+    """
+    Concatenate the result files of the queue into one, in queue order.
+
+    :return: number of shards still missing a result
+    """
+    queue = ShardQueue(queue_directory)
+    done = [shard for shard in queue.shards if queue.is_done(shard)]
+
+    merge_result_files([queue.result_path(shard) for shard in done], output_path)
+
+    return len(queue.shards) - len(done)
+
+
+def run_local(queue_directory, workers, lease=LEASE_SECONDS):
+    """Run `workers` worker processes on this machine, standing in for nodes, until the queue is done."""
+    processes = [multiprocessing.Process(target=run_worker, args=(queue_directory, lease)) for _ in range(workers)]
+
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Sharded experiment sweeps over a file-based work queue.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    plan = commands.add_parser('plan', help='create the queue of a sweep')
+    plan.add_argument('queue')
+    plan.add_argument('--datasets', nargs='+', required=True)
+    plan.add_argument('--solvers', nargs='+', default=list(STRATEGIES), choices=STRATEGIES)
+    plan.add_argument('--seeds', nargs='+', type=int, default=[0])
+    plan.add_argument('--shards', type=int, default=1, help='shards per dataset')
+
+    work = commands.add_parser('work', help='solve shards until the queue is done')
+    work.add_argument('queue')
+    work.add_argument('--lease', type=float, default=LEASE_SECONDS)
+
+    local = commands.add_parser('local', help='run several workers on this machine, then merge')
+    local.add_argument('queue')
+    local.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    local.add_argument('--lease', type=float, default=LEASE_SECONDS)
+    local.add_argument('--output', help='merge the results into this Parquet file once done')
+
+    status = commands.add_parser('status', help='count the shards per state')
+    status.add_argument('queue')
+
+    merge = commands.add_parser('merge', help='merge the shard results into one Parquet file')
+    merge.add_argument('queue')
+    merge.add_argument('output')
+
+    options = parser.parse_args(arguments)
+
+    if options.command == 'plan':
+        shards = plan_sweep(options.queue, options.datasets, options.solvers, options.seeds, options.shards)
+        print(f'{len(shards)} shards in {options.queue}')
+    elif options.command == 'work':
+        print(f'Solved {run_worker(options.queue, options.lease)} shards')
+    elif options.command == 'local':
+        run_local(options.queue, options.workers, options.lease)
+        if options.output:
+            _merge(options.queue, options.output)
+    elif options.command == 'status':
+        print(ShardQueue(options.queue).status())
+    elif options.command == 'merge':
+        _merge(options.queue, options.output)
+
+
+def _merge(queue_directory, output_path):
+    missing = merge_results(queue_directory, output_path)
+    print(f'Results merged into {output_path}' + (f', {missing} shards still missing' if missing else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Wall time of the `SAT.py` command line on a trivial 4x4 sudoku, which is mostly interpreter start-up and imports.
+
+Every command runs in a fresh interpreter without the solution cache (`SAT_SOLUTION_CACHE` is removed from its
+environment), so no run is answered by an earlier one.
+The times are compared to an interpreter that does nothing and to one that only imports `SAT`.
+
+Run from the repository root:
+
+    python -m Scripts.experiments.startup_benchmark --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from Scripts.helpers.dimacs_reader import read_dimacs_file
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix, from_matrix_to_clauses
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PUZZLES_PATH = os.path.join(REPOSITORY_DIRECTORY, 'test_sets', '4x4.txt')
+RULES_PATH = os.path.join(REPOSITORY_DIRECTORY, 'sudoku_rules', 'sudoku-rules-4x4.cnf')
+DEFAULT_RUNS = 10
+
+
+def write_sudoku_cnf(path, puzzle):
+    """Write the clues of a sudoku string and the 4x4 rules as a DIMACS file."""
+    rules, total_variables = read_dimacs_file(RULES_PATH)
+    clauses = from_matrix_to_clauses(from_sudoku_string_to_matrix(puzzle)) + rules
+
+    with open(path, 'w') as cnf_file:
+        cnf_file.write(f'p cnf {total_variables} {len(clauses)}\n')
+        cnf_file.writelines(f'{" ".join(map(str, clause))} 0\n' for clause in clauses)
+
+
+def time_command(command, runs):
+    """:return: the wall time of every run of `command`, none of them using the solution cache"""
+    environment = {name: value for name, value in os.environ.items() if name != 'SAT_SOLUTION_CACHE'}
+    times = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        subprocess.run(command, cwd=REPOSITORY_DIRECTORY, env=environment, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start_time)
+
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS)
+    parser.add_argument('--strategy', type=int, default=3, help='n of the -Sn option of SAT.py')
+    parser.add_argument('--puzzle', type=int, default=0, help='line of test_sets/4x4.txt to solve')
+    arguments = parser.parse_args()
+
+    with open(PUZZLES_PATH) as puzzles_file:
+        puzzle = puzzles_file.read().split()[arguments.puzzle]
+
+    with tempfile.TemporaryDirectory() as directory:
+        cnf_path = os.path.join(directory, 'sudoku-4x4.cnf')
+        write_sudoku_cnf(cnf_path, puzzle)
+
+        commands = {
+            'interpreter': [sys.executable, '-c', 'pass'],
+            'import SAT': [sys.executable, '-c', 'import SAT'],
+            f'SAT.py -S{arguments.strategy}': [sys.executable, 'SAT.py', f'-S{arguments.strategy}', cnf_path],
+        }
+        timings = {name: time_command(command, arguments.runs) for name, command in commands.items()}
+
+    print(f'4x4 sudoku {puzzle}, {arguments.runs} runs')
+    print(f'{"command":<16}{"median (s)":>12}{"min (s)":>10}')
+    for name, times in timings.items():
+        print(f'{name:<16}{statistics.median(times):>12.3f}{min(times):>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
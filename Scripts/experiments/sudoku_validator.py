@@ -1,5 +1,8 @@
+import math as m
+
+
 def is_valid_sudoku(matrix):
-    return _are_all_rows_valid(matrix) and _are_all_columns_valid(matrix) and _are_all_3_by_3_grid_valid(matrix)
+    return _are_all_rows_valid(matrix) and _are_all_columns_valid(matrix) and _are_all_boxes_valid(matrix)
 
 
 def _are_all_rows_valid(matrix):
@@ -10,18 +13,21 @@ def _are_all_rows_valid(matrix):
 
 
 def _are_all_columns_valid(matrix):
-    for col in range(9):
-        if not _are_all_values_unique([matrix[row][col] for row in range(9)]):
+    length = len(matrix)
+    for col in range(length):
+        if not _are_all_values_unique([matrix[row][col] for row in range(length)]):
             return False
     return True
 
 
-def _are_all_3_by_3_grid_valid(matrix):
-    for box_row in range(0, 9, 3):
-        for box_col in range(0, 9, 3):
+def _are_all_boxes_valid(matrix):
+    length = len(matrix)
+    box_length = m.isqrt(length)
+    for box_row in range(0, length, box_length):
+        for box_col in range(0, length, box_length):
             subgrid = [matrix[row][column]
-                       for row in range(box_row, box_row + 3)
-                       for column in range(box_col, box_col + 3)]
+                       for row in range(box_row, box_row + box_length)
+                       for column in range(box_col, box_col + box_length)]
             if not _are_all_values_unique(subgrid):
                 return False
     return True
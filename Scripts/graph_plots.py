@@ -1,40 +1,40 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 
-file_path = "experiments/experiment_result_9x9_final.csv"
+from Scripts.experiments.results_store import load_results, load_history
 
-data = pd.read_csv(file_path)
+results_path = "experiments/experiment_results.parquet"
+history_path = "experiments/experiment_history.parquet"
+
+# One row per puzzle and solver
+df = load_results(results_path)
 colorblind_palette = sns.color_palette("colorblind")
 dpll_color =  colorblind_palette[0]
 chb_color =  colorblind_palette[2]
 vsids_color = colorblind_palette[3]
 
-# Create a DataFrame
-df = pd.DataFrame(data)
-
 print(df.columns)
 
-
-
+solver_averages = df.groupby("solver", observed=True)[
+    ["conflicts", "decisions", "implications", "elapsed_time", "learned_clauses"]].mean()
 
 # Relevant averages
 averages = {
-    "DPLL_Conflicts": df["basic_DPLL_conflicts"].mean(),
-    "CHB_Conflicts": df["CHB_conflicts_counter"].mean(),
-    "VSIDS_Conflicts": df["VSIDS_conflicts_counter"].mean(),
-    "DPLL_Decisions": df["basic_DPLL_decisions"].mean(),
-    "CHB_Decisions": df["CHB_decision_counter"].mean(),
-    "VSIDS_Decisions": df["VSIDS_decision_counter"].mean(),
-    "DPLL_Implications": df["basic_DPLL_implications"].mean(),
-    "CHB_Implications": df["CHB_implications_counter"].mean(),
-    "VSIDS_Implications": df["VSIDS_implications_counter"].mean(),
-    "DPLL_Elapsed_Time": df["basic_DPLL_elapsed_time"].mean(),
-    "CHB_Elapsed_Time": df["CHB_elapsed_time"].mean(),
-    "VSIDS_Elapsed_Time": df["VSIDS_elapsed_time"].mean(),
-    "CHB_Learned_Clauses": df["CHB_learned_counter"].mean(),
-    "VSIDS_Learned_Clauses": df["VSIDS_learned_counter"].mean(),
+    "DPLL_Conflicts": solver_averages.loc["basic_DPLL", "conflicts"],
+    "CHB_Conflicts": solver_averages.loc["CHB", "conflicts"],
+    "VSIDS_Conflicts": solver_averages.loc["VSIDS", "conflicts"],
+    "DPLL_Decisions": solver_averages.loc["basic_DPLL", "decisions"],
+    "CHB_Decisions": solver_averages.loc["CHB", "decisions"],
+    "VSIDS_Decisions": solver_averages.loc["VSIDS", "decisions"],
+    "DPLL_Implications": solver_averages.loc["basic_DPLL", "implications"],
+    "CHB_Implications": solver_averages.loc["CHB", "implications"],
+    "VSIDS_Implications": solver_averages.loc["VSIDS", "implications"],
+    "DPLL_Elapsed_Time": solver_averages.loc["basic_DPLL", "elapsed_time"],
+    "CHB_Elapsed_Time": solver_averages.loc["CHB", "elapsed_time"],
+    "VSIDS_Elapsed_Time": solver_averages.loc["VSIDS", "elapsed_time"],
+    "CHB_Learned_Clauses": solver_averages.loc["CHB", "learned_clauses"],
+    "VSIDS_Learned_Clauses": solver_averages.loc["VSIDS", "learned_clauses"],
 }
 
 metrics = ['Conflicts', 'Decisions']
@@ -135,10 +135,14 @@ plt.tight_layout()
 plt.show()
 
 # Scatter plot for conflicts for DPLL, CHB, and VSIDS
+dpll_conflicts = df.loc[df["solver"] == "basic_DPLL", "conflicts"]
+chb_conflicts = df.loc[df["solver"] == "CHB", "conflicts"]
+vsids_conflicts = df.loc[df["solver"] == "VSIDS", "conflicts"]
+
 plt.figure(figsize=(10, 6))
-plt.scatter(["DPLL"] * len(df), df["basic_DPLL_conflicts"], color=dpll_color, label="DPLL Conflicts")
-plt.scatter(["CHB"] * len(df), df["CHB_conflicts_counter"], color=chb_color, label="CHB Conflicts")
-plt.scatter(["VSIDS"] * len(df), df["VSIDS_conflicts_counter"], color=vsids_color, label="VSIDS Conflicts")
+plt.scatter(["DPLL"] * len(dpll_conflicts), dpll_conflicts, color=dpll_color, label="DPLL Conflicts")
+plt.scatter(["CHB"] * len(chb_conflicts), chb_conflicts, color=chb_color, label="CHB Conflicts")
+plt.scatter(["VSIDS"] * len(vsids_conflicts), vsids_conflicts, color=vsids_color, label="VSIDS Conflicts")
 plt.title("Conflicts Comparison Across Solvers")
 plt.xlabel("Solver")
 plt.ylabel("Number of Conflicts")
@@ -146,23 +150,16 @@ plt.legend()
 plt.show()
 
 
-data_chb = pd.read_csv('experiments/chb_history.csv')
-
-# Create a DataFrame
-df_chb = pd.DataFrame(data_chb)
-
-data_vsids = pd.read_csv('experiments/vsids_history.csv')
-
-# Create a DataFrame
-df_vsids = pd.DataFrame(data_vsids)
+# Conflict events of the CDCL solvers, with typed timestamps
+df_history = load_history(history_path)
+df_conflicts = df_history[df_history['event_type'] == 'CONFLICT']
 
-# Convert datetime column to datetime objects
-df_chb['datetime'] = pd.to_datetime(df_chb['datetime'], errors='coerce')
-df_vsids['datetime'] = pd.to_datetime(df_vsids['datetime'], errors='coerce')
+df_chb = df_conflicts[df_conflicts['solver'] == 'CHB']
+df_vsids = df_conflicts[df_conflicts['solver'] == 'VSIDS']
 
 # Aggregate by 1-minute intervals, summing counts
-df_aggregated_vsids = df_vsids.set_index('datetime').resample('1T').sum().reset_index()
-df_aggregated_chb = df_chb.set_index('datetime').resample('1T').sum().reset_index()
+df_aggregated_vsids = df_vsids.set_index('datetime')[['count']].resample('1min').sum().reset_index()
+df_aggregated_chb = df_chb.set_index('datetime')[['count']].resample('1min').sum().reset_index()
 
 print(df_chb.head)
 print(df_chb.columns)
@@ -179,7 +176,7 @@ time_steps_vsids = df_aggregated_vsids['datetime'].to_numpy()
 
 # Plotting conflicts over time
 plt.figure(figsize=(10, 6))
-plt.plot(time_steps_vsids, conflicts_chb, marker='s', linestyle='--', label="CHB", color=chb_color)
+plt.plot(time_steps_chb, conflicts_chb, marker='s', linestyle='--', label="CHB", color=chb_color)
 plt.plot(time_steps_vsids, conflicts_vsids, marker='^', linestyle='-.', label="VSIDS", color=vsids_color)
 
 # Graph details
@@ -0,0 +1,77 @@
+from collections import defaultdict
+from itertools import combinations
+
+from Scripts.cardinality_propagator import CardinalityConstraint, ConstraintKind
+
+
+def detect_cardinality_constraints(clauses, min_group_size=3):
+    """
+    Recover at-most-one / exactly-one groups from a plain CNF where they are encoded pairwise.
+
+    A binary clause (-a -b) says "at most one of a, b". A long clause whose literals are pairwise excluded this way
+    becomes an exactly-one constraint, the remaining binary clauses are greedily grouped into at-most-one cliques.
+
+    :param clauses: CNF clauses (DIMACS integers)
+    :param min_group_size: smallest group worth turning into a native constraint
+    :return: the clauses not covered by any constraint, and the detected constraints
+    """
+    exclusions = {frozenset((-clause[0], -clause[1])) for clause in clauses if _is_exclusion(clause)}
+
+    constraints = []
+    covered = set()
+    remaining_clauses = []
+
+    for clause in clauses:
+        if len(clause) >= min_group_size and _are_pairwise_excluded(clause, exclusions):
+            constraints.append(CardinalityConstraint(tuple(clause), ConstraintKind.EXACTLY_ONE))
+            covered.update(frozenset(pair) for pair in combinations(clause, 2))
+        elif not _is_exclusion(clause):
+            remaining_clauses.append(clause)
+
+    for group in _group_exclusions(exclusions - covered, min_group_size):
+        constraints.append(CardinalityConstraint(tuple(group), ConstraintKind.AT_MOST_ONE))
+        covered.update(frozenset(pair) for pair in combinations(group, 2))
+
+    remaining_clauses.extend([-first, -second] for first, second in map(tuple, exclusions - covered))
+
+    return remaining_clauses, constraints
+
+
+def _is_exclusion(clause):
+    return len(clause) == 2 and abs(clause[0]) != abs(clause[1])
+
+
+def _are_pairwise_excluded(clause, exclusions):
+    return all(frozenset(pair) in exclusions for pair in combinations(clause, 2))
+
+
+def _group_exclusions(exclusions, min_group_size):
+    """Greedy clique cover of the exclusion graph, biggest cliques first."""
+    neighbours = defaultdict(set)
+    for first, second in map(tuple, exclusions):
+        neighbours[first].add(second)
+        neighbours[second].add(first)
+
+    groups = []
+    while neighbours:
+        literal = max(neighbours, key=lambda item: len(neighbours[item]))
+        group = [literal]
+        candidates = set(neighbours[literal])
+
+        while candidates:
+            best = max(candidates, key=lambda item: len(neighbours[item] & candidates))
+            group.append(best)
+            candidates &= neighbours[best]
+
+        if len(group) < min_group_size:
+            break
+
+        groups.append(group)
+        for first, second in combinations(group, 2):
+            neighbours[first].discard(second)
+            neighbours[second].discard(first)
+
+        for item in [item for item in group if not neighbours[item]]:
+            del neighbours[item]
+
+    return groups
@@ -0,0 +1,214 @@
+"""
+Checkpoints of long CDCL solves, so a solve killed by a job scheduler resumes with its learned clauses and scores.
+
+A snapshot (`CDCLSatSolver.snapshot`) holds the literals of level 0, the learned clauses, the decisions of the trail,
+the heuristic state and the statistics. Resuming (`CDCLSatSolver.resume`) prepares a solver for the same clauses as
+usual, adds the snapshot clauses at level 0 and restores the scores. The saved decisions are taken again first, as
+the saved phases: a search that starts over from level 0 without them loses its way to a model.
+
+`Checkpointer` saves snapshots every `interval` seconds and when the process gets SIGUSR1, checked after every
+conflict. SIGTERM saves a snapshot and stops the search with `SATResult.UNKNOWN`. Snapshots are written atomically
+to a binary file:
+
+    b'CDCLSNAP', version and header length (two little-endian uint32), JSON header, arrays
+
+The header has the fingerprint of the solved CNF, the statistics, the heuristic state and the type and length of
+every array that follows. The clauses, the decisions and the literal-keyed mappings of the heuristic state (the
+scores) are stored as arrays. Literals are the ones of the solved CNF, before `VariableRenumbering`.
+"""
+import hashlib
+import json
+import os
+import signal
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+
+MAGIC = b'CDCLSNAP'
+SNAPSHOT_VERSION = 1
+# Seconds between two snapshots of a search
+DEFAULT_INTERVAL = 300.0
+
+# Signals asking for a snapshot, and for a snapshot before stopping
+SNAPSHOT_SIGNALS = tuple(getattr(signal, name) for name in ('SIGUSR1',) if hasattr(signal, name))
+STOP_SIGNALS = (signal.SIGTERM,)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    # (LBD, literals): every literal of level 0 as a unit clause, then the learned clauses
+    lemmas: list
+    # Decision literals of the trail, oldest first
+    decisions: list
+    # `Heuristics.state`
+    heuristics: dict
+    # `Statistics.state`
+    statistics: dict
+
+    def renumbered(self, rename):
+        """Snapshot with every literal mapped by `rename`, e.g. `VariableRenumbering.decode_literal`."""
+        return Snapshot([(lbd, [rename(literal) for literal in literals]) for lbd, literals in self.lemmas],
+                        [rename(literal) for literal in self.decisions], _rename_keys(self.heuristics, rename),
+                        self.statistics)
+
+
+def problem_fingerprint(clauses, total_variables):
+    """Hash of a CNF, to only resume snapshots of the same problem."""
+    digest = hashlib.sha256(str(total_variables).encode())
+    for clause in clauses:
+        digest.update(array('i', clause).tobytes() + b'\0\0\0\0')
+
+    return digest.hexdigest()
+
+
+class Checkpointer:
+    """
+    Decides when a search saves a snapshot, and writes it to `path`.
+
+    :param fingerprint: `problem_fingerprint` of the solved CNF
+    :param interval: seconds between two snapshots, None to only save them on signals
+    :param renumbering: `VariableRenumbering` of the solver, snapshots are saved and loaded in the original literals
+    """
+
+    def __init__(self, path, fingerprint, interval=DEFAULT_INTERVAL, renumbering=None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.interval = interval
+        self.renumbering = renumbering
+        self.is_requested = False
+        self.is_stop_requested = False
+        self.last_save = time.monotonic()
+        self.saves = 0
+        self.previous_handlers = {}
+
+    def __enter__(self):
+        """Handle the snapshot and stop signals until the end of the `with` block."""
+        for signal_number in SNAPSHOT_SIGNALS + STOP_SIGNALS:
+            self.previous_handlers[signal_number] = signal.signal(signal_number, self.on_signal)
+        return self
+
+    def __exit__(self, *_):
+        for signal_number, handler in self.previous_handlers.items():
+            signal.signal(signal_number, handler)
+        self.previous_handlers = {}
+
+    def on_signal(self, signal_number, _):
+        # Only flags are set here, the search saves the snapshot after its current conflict
+        self.is_requested = True
+        self.is_stop_requested = self.is_stop_requested or signal_number in STOP_SIGNALS
+
+    def is_due(self):
+        return self.is_requested or \
+            (self.interval is not None and time.monotonic() - self.last_save >= self.interval)
+
+    def save(self, solver):
+        snapshot = solver.snapshot()
+        if self.renumbering is not None:
+            snapshot = snapshot.renumbered(self.renumbering.decode_literal)
+
+        write_snapshot(self.path, self.fingerprint, snapshot)
+        self.is_requested = False
+        self.last_save = time.monotonic()
+        self.saves += 1
+
+    def load(self):
+        """:return: the saved snapshot in the solver literals, None when there is none for this CNF"""
+        snapshot = read_snapshot(self.path, self.fingerprint)
+        if snapshot is not None and self.renumbering is not None:
+            snapshot = snapshot.renumbered(self.renumbering.encode_literal)
+
+        return snapshot
+
+    def remove(self):
+        """Drop the snapshot once the search has an answer."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def write_snapshot(path, fingerprint, snapshot):
+    arrays = [array('i', (lbd for lbd, _ in snapshot.lemmas)),
+              array('i', (len(literals) for _, literals in snapshot.lemmas)),
+              array('i', (literal for _, literals in snapshot.lemmas for literal in literals)),
+              array('i', snapshot.decisions)]
+    header = json.dumps({
+        'fingerprint': fingerprint,
+        'byteorder': sys.byteorder,
+        'statistics': snapshot.statistics,
+        'heuristics': _encode(snapshot.heuristics, arrays),
+        'arrays': [(values.typecode, len(values)) for values in arrays],
+    }).encode()
+
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as snapshot_file:
+        snapshot_file.write(MAGIC + struct.pack('<II', SNAPSHOT_VERSION, len(header)) + header)
+        for values in arrays:
+            values.tofile(snapshot_file)
+
+    os.replace(temporary_path, path)
+
+
+def read_snapshot(path, fingerprint):
+    """:return: the snapshot saved at `path`, None when there is none, or it is of another version or CNF"""
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as snapshot_file:
+        if snapshot_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a solver snapshot')
+
+        version, header_length = struct.unpack('<II', snapshot_file.read(8))
+        if version != SNAPSHOT_VERSION:
+            return None
+
+        header = json.loads(snapshot_file.read(header_length))
+        if header['fingerprint'] != fingerprint or header['byteorder'] != sys.byteorder:
+            return None
+
+        arrays = []
+        for typecode, length in header['arrays']:
+            values = array(typecode)
+            values.fromfile(snapshot_file, length)
+            arrays.append(values)
+
+    lbds, sizes, literals, decisions = arrays[:4]
+    lemmas, start = [], 0
+    for lbd, size in zip(lbds, sizes):
+        lemmas.append((lbd, literals[start:start + size].tolist()))
+        start += size
+
+    return Snapshot(lemmas, decisions.tolist(), _decode(header['heuristics'], arrays), header['statistics'])
+
+
+def _encode(value, arrays):
+    """JSON form of a heuristic state, with the literal-keyed mappings moved to `arrays`."""
+    if isinstance(value, dict) and value and all(isinstance(key, int) for key in value):
+        is_integral = all(isinstance(item, int) for item in value.values())
+        arrays.extend((array('i', value.keys()), array('q' if is_integral else 'd', value.values())))
+        return {'$keys': len(arrays) - 2, '$values': len(arrays) - 1}
+
+    if isinstance(value, dict):
+        return {key: _encode(item, arrays) for key, item in value.items()}
+
+    return value
+
+
+def _decode(value, arrays):
+    if isinstance(value, dict) and '$keys' in value:
+        return dict(zip(arrays[value['$keys']].tolist(), arrays[value['$values']].tolist()))
+
+    if isinstance(value, dict):
+        return {key: _decode(item, arrays) for key, item in value.items()}
+
+    return value
+
+
+def _rename_keys(value, rename):
+    if isinstance(value, dict) and value and all(isinstance(key, int) for key in value):
+        return {rename(key): item for key, item in value.items()}
+
+    if isinstance(value, dict):
+        return {key: _rename_keys(item, rename) for key, item in value.items()}
+
+    return value
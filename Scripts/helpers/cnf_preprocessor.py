@@ -0,0 +1,394 @@
+"""
+CNF preprocessing run before the SAT solvers: unit propagation, subsumption, self-subsuming strengthening,
+failed-literal probing and bounded variable elimination (BVE), all driven by occurrence lists.
+
+Every technique keeps the formula equisatisfiable. Models of the simplified formula are turned back into models of
+the original one with `PreprocessingResult.extend_model`, which adds the fixed variables and gives the eliminated
+variables a value that satisfies the clauses they were removed with.
+"""
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+# Seconds the preprocessing may take, the stages stop at their next step once it is spent
+DEFAULT_TIME_BUDGET = 1.0
+# Variables occurring more often than this in one polarity are not eliminated
+ELIMINATION_OCCURRENCE_LIMIT = 16
+# Eliminations producing a longer resolvent are given up
+RESOLVENT_LENGTH_LIMIT = 20
+
+
+@dataclass
+class PreprocessingReport:
+    variables_before: int = 0
+    clauses_before: int = 0
+    variables_after: int = 0
+    clauses_after: int = 0
+    fixed_variables: int = 0
+    failed_literals: int = 0
+    subsumed_clauses: int = 0
+    strengthened_clauses: int = 0
+    eliminated_variables: int = 0
+    elapsed_time: float = 0.0
+    is_budget_exhausted: bool = False
+
+    def __str__(self):
+        return f"""
+        Variables: {self.variables_before} -> {self.variables_after} (-{self.variables_before - self.variables_after})
+        Clauses: {self.clauses_before} -> {self.clauses_after} (-{self.clauses_before - self.clauses_after})
+        Fixed variables: {self.fixed_variables} (failed literals: {self.failed_literals})
+        Eliminated variables: {self.eliminated_variables}
+        Subsumed clauses: {self.subsumed_clauses}
+        Strengthened clauses: {self.strengthened_clauses}
+        Elapsed time: {self.elapsed_time:.4f}{' (time budget exhausted)' if self.is_budget_exhausted else ''}
+        """
+
+
+@dataclass
+class PreprocessingResult:
+    clauses: list
+    is_unsatisfiable: bool
+    report: PreprocessingReport
+    # Literals fixed by the preprocessing
+    units: list = field(default_factory=list)
+    # (pivot literal, clause) of every clause removed by variable elimination, in elimination order
+    eliminated_clauses: list = field(default_factory=list)
+    # Variables of the original clauses
+    variables: list = field(default_factory=list)
+
+    def extend_model(self, model) -> list[int]:
+        """
+        Turn a model (DIMACS literals) of the simplified clauses into a model of the original ones, covering every
+        variable of the original clauses. Variables no clause constrains any more are set to false.
+        """
+        values = {abs(literal): literal > 0 for literal in model}
+        values.update((abs(literal), literal > 0) for literal in self.units)
+
+        # Later eliminations only contain variables still present at that time, so they are settled first
+        for pivot, clause in reversed(self.eliminated_clauses):
+            if not any(values.get(abs(literal), False) == (literal > 0) for literal in clause):
+                values[abs(pivot)] = pivot > 0
+
+        return [variable if values.get(variable, False) else -variable for variable in self.variables]
+
+
+def preprocess(clauses, time_budget=DEFAULT_TIME_BUDGET, probing=True, elimination=True) -> PreprocessingResult:
+    """
+    Simplify a CNF. The input clauses are not modified.
+
+    :param time_budget: seconds after which the remaining steps are skipped, the result is simplified as far as it got
+    :param probing: run failed-literal probing
+    :param elimination: run bounded variable elimination
+    """
+    return _Preprocessor(clauses, time_budget).run(probing, elimination)
+
+
+class _Preprocessor:
+    def __init__(self, clauses, time_budget):
+        self.start_time = time.perf_counter()
+        self.deadline = self.start_time + time_budget
+
+        self.clauses = []
+        self.signatures = []
+        # Indexes of the clauses containing a literal
+        self.occurrences = defaultdict(set)
+
+        self.values = {}
+        self.units = []
+        self.pending_units = deque()
+        self.eliminated = set()
+        self.eliminated_clauses = []
+        # Clauses to check for subsumption, either new or strengthened
+        self.touched = set()
+
+        self.is_unsatisfiable = False
+        self.report = PreprocessingReport(clauses_before=len(clauses))
+
+        variables = {abs(literal) for clause in clauses for literal in clause}
+        self.report.variables_before = len(variables)
+        self.variables = sorted(variables)
+
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def run(self, probing, elimination):
+        self.propagate_units()
+
+        stages = [self.subsume]
+        if probing:
+            stages.append(self.probe)
+        if elimination:
+            stages += [self.eliminate, self.subsume]
+
+        for stage in stages:
+            if self.is_unsatisfiable or self.is_out_of_time():
+                break
+            stage()
+            self.propagate_units()
+
+        return self.result()
+
+    def is_out_of_time(self):
+        if time.perf_counter() > self.deadline:
+            self.report.is_budget_exhausted = True
+        return self.report.is_budget_exhausted
+
+    def result(self):
+        clauses = [list(clause) for clause in self.clauses if clause is not None]
+        if self.is_unsatisfiable:
+            clauses = [[]]
+
+        self.report.clauses_after = len(clauses)
+        self.report.variables_after = len({abs(literal) for clause in clauses for literal in clause})
+        self.report.fixed_variables = len(self.units)
+        self.report.eliminated_variables = len(self.eliminated)
+        self.report.elapsed_time = time.perf_counter() - self.start_time
+
+        return PreprocessingResult(clauses, self.is_unsatisfiable, self.report, list(self.units),
+                                   self.eliminated_clauses, self.variables)
+
+    # Clause database
+
+    def add_clause(self, clause):
+        literals = set()
+        for literal in clause:
+            value = self.values.get(abs(literal))
+            if value is None:
+                literals.add(literal)
+            elif value == (literal > 0):
+                return
+
+        if any(-literal in literals for literal in literals):
+            return
+
+        if not literals:
+            self.is_unsatisfiable = True
+        elif len(literals) == 1:
+            self.assign(next(iter(literals)))
+        else:
+            index = len(self.clauses)
+            self.clauses.append(sorted(literals, key=abs))
+            self.signatures.append(_signature(literals))
+            for literal in literals:
+                self.occurrences[literal].add(index)
+            self.touched.add(index)
+
+    def remove_clause(self, index):
+        for literal in self.clauses[index]:
+            self.occurrences[literal].discard(index)
+        self.clauses[index] = None
+        self.touched.discard(index)
+
+    def strengthen(self, index, literal):
+        """Remove a (false or redundant) literal from a clause."""
+        clause = self.clauses[index]
+        clause.remove(literal)
+        self.occurrences[literal].discard(index)
+
+        if len(clause) == 1:
+            self.assign(clause[0])
+            self.remove_clause(index)
+        else:
+            self.signatures[index] = _signature(clause)
+            self.touched.add(index)
+
+    def assign(self, literal):
+        value = self.values.get(abs(literal))
+        if value is None:
+            self.values[abs(literal)] = literal > 0
+            self.units.append(literal)
+            self.pending_units.append(literal)
+        elif value != (literal > 0):
+            self.is_unsatisfiable = True
+
+    def propagate_units(self):
+        while self.pending_units and not self.is_unsatisfiable:
+            literal = self.pending_units.popleft()
+
+            for index in list(self.occurrences[literal]):
+                self.remove_clause(index)
+
+            for index in list(self.occurrences[-literal]):
+                if len(self.clauses[index]) == 1:
+                    self.is_unsatisfiable = True
+                    return
+                self.strengthen(index, -literal)
+
+    # Subsumption and self-subsuming strengthening
+
+    def subsume(self):
+        """
+        Backward subsumption: every new or strengthened clause C removes the clauses it subsumes and strengthens the
+        clauses D containing C with one literal negated (self-subsuming resolution removes that literal from D).
+        """
+        # Short clauses subsume the most, they go first
+        queue = deque(sorted(self.touched, key=lambda index: len(self.clauses[index])))
+        self.touched = set()
+
+        while queue and not self.is_unsatisfiable:
+            if self.is_out_of_time():
+                return
+
+            index = queue.popleft()
+            clause = self.clauses[index]
+            if clause is None:
+                continue
+
+            self.subsume_with(index, clause)
+            self.propagate_units()
+
+            if self.touched:
+                queue.extend(self.touched)
+                self.touched = set()
+
+    def subsume_with(self, index, clause):
+        # Every clause subsumed or strengthened by `clause` contains its least frequent variable, in some polarity
+        pivot = min(clause, key=lambda literal: len(self.occurrences[literal]) + len(self.occurrences[-literal]))
+        signature, literals = self.signatures[index], set(clause)
+
+        for other_index in list(self.occurrences[pivot] | self.occurrences[-pivot]):
+            other = self.clauses[other_index]
+            if other_index == index or other is None or len(other) < len(clause) or \
+                    signature & ~self.signatures[other_index]:
+                continue
+
+            negated = None
+            other_literals = set(other)
+            for literal in literals:
+                if literal in other_literals:
+                    continue
+                if negated is None and -literal in other_literals:
+                    negated = -literal
+                    continue
+                break
+            else:
+                if negated is None:
+                    self.remove_clause(other_index)
+                    self.report.subsumed_clauses += 1
+                else:
+                    self.strengthen(other_index, negated)
+                    self.report.strengthened_clauses += 1
+
+            if self.clauses[index] is None:
+                return
+
+    # Failed-literal probing
+
+    def probe(self):
+        """
+        Assume each literal of the binary clauses and propagate it: a literal leading to a conflict is fixed to
+        false, literals implied by both polarities of a variable are fixed to true.
+        """
+        variables = sorted({abs(literal) for clause in self.clauses if clause is not None and len(clause) == 2
+                            for literal in clause})
+
+        for variable in variables:
+            if self.is_unsatisfiable or self.is_out_of_time():
+                return
+            if variable in self.values:
+                continue
+
+            positive = self.probe_literal(variable)
+            negative = self.probe_literal(-variable)
+
+            if positive is None or negative is None:
+                self.report.failed_literals += 1
+                if positive is None and negative is None:
+                    self.is_unsatisfiable = True
+                    return
+                self.assign(-variable if positive is None else variable)
+            else:
+                for literal in positive & negative:
+                    self.assign(literal)
+
+            self.propagate_units()
+
+    def probe_literal(self, literal):
+        """:return: the literals implied by `literal` (itself included), None on a conflict"""
+        implied = {literal}
+        queue = [literal]
+
+        while queue:
+            false_literal = -queue.pop()
+
+            for index in self.occurrences[false_literal]:
+                unassigned = None
+                for clause_literal in self.clauses[index]:
+                    if clause_literal in implied:
+                        break
+                    if clause_literal != false_literal and -clause_literal not in implied:
+                        if unassigned is not None:
+                            break
+                        unassigned = clause_literal
+                else:
+                    if unassigned is None:
+                        return None
+                    implied.add(unassigned)
+                    queue.append(unassigned)
+
+        return implied
+
+    # Bounded variable elimination
+
+    def eliminate(self):
+        """
+        Replace the clauses of a variable by their resolvents when that does not increase the number of clauses.
+        Cheapest variables are tried first.
+        """
+        variables = sorted((variable for variable in self.variables
+                            if variable not in self.values and
+                            (self.occurrences[variable] or self.occurrences[-variable])),
+                           key=lambda variable: len(self.occurrences[variable]) * len(self.occurrences[-variable]))
+
+        for variable in variables:
+            if self.is_unsatisfiable or self.is_out_of_time():
+                return
+            if variable in self.values:
+                continue
+
+            self.eliminate_variable(variable)
+            self.propagate_units()
+
+    def eliminate_variable(self, variable):
+        positive, negative = list(self.occurrences[variable]), list(self.occurrences[-variable])
+        if len(positive) > ELIMINATION_OCCURRENCE_LIMIT or len(negative) > ELIMINATION_OCCURRENCE_LIMIT:
+            return
+
+        resolvents = []
+        for positive_index in positive:
+            for negative_index in negative:
+                resolvent = _resolve(self.clauses[positive_index], self.clauses[negative_index], variable)
+                if resolvent is None:
+                    continue
+                if len(resolvent) > RESOLVENT_LENGTH_LIMIT or len(resolvents) == len(positive) + len(negative):
+                    return
+                resolvents.append(resolvent)
+
+        for pivot, indexes in ((variable, positive), (-variable, negative)):
+            for index in indexes:
+                self.eliminated_clauses.append((pivot, list(self.clauses[index])))
+                self.remove_clause(index)
+
+        self.eliminated.add(variable)
+        for resolvent in resolvents:
+            self.add_clause(resolvent)
+
+
+def _signature(literals):
+    signature = 0
+    for literal in literals:
+        signature |= 1 << (abs(literal) & 63)
+    return signature
+
+
+def _resolve(positive_clause, negative_clause, variable):
+    """:return: the resolvent on `variable`, None when it is a tautology"""
+    literals = {literal for literal in positive_clause if literal != variable}
+    for literal in negative_clause:
+        if literal == -variable:
+            continue
+        if -literal in literals:
+            return None
+        literals.add(literal)
+
+    return list(literals)
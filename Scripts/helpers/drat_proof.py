@@ -0,0 +1,334 @@
+"""
+DRAT proofs of unsatisfiability: written while a CDCL solver runs, and checked against the CNF they refute.
+
+A proof lists the clauses learned by the solver (each one follows from the formula and the clauses before it by unit
+propagation, RUP) and the clauses it deleted, ending with the empty clause. Proofs are written in the binary DRAT
+format: every step is b'a' (added) or b'd' (deleted), then each literal as 2 * variable + 1 if negated in groups of
+7 bits, least significant first, with the high bit set on every group but the last, then a 0 byte. The text format
+(`1 -2 0` / `d 1 -2 0` lines) is also written and read. External checkers such as drat-trim accept both.
+
+Check a proof with
+
+    python -m Scripts.helpers.drat_proof sudoku.cnf sudoku.cnf.drat
+"""
+import argparse
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from Scripts.helpers.dimacs_reader import read_dimacs_file
+
+ADDITION = ord('a')
+DELETION = ord('d')
+# Bytes kept in memory before they are written to the proof file
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+class DRATWriter:
+    """
+    Buffered writer of a DRAT proof. Lemmas are encoded into an in-memory buffer that is written out once it holds
+    `buffer_size` bytes, and on `close`.
+
+    :param to_original: original variable of every solver variable (e.g. `VariableRenumbering.to_original`), so the
+    proof refers to the CNF before renumbering. None keeps the variables as they are
+    """
+
+    def __init__(self, path, binary=True, to_original=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.path = path
+        self.binary = binary
+        self.to_original = to_original
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.lemmas = 0
+        self.deletions = 0
+        self.file = open(path, 'wb')
+
+    def add(self, literals):
+        """Log a learned clause, the empty clause once the formula is refuted."""
+        self.lemmas += 1
+        self.write(ADDITION, literals)
+
+    def delete(self, literals):
+        """Log a clause removed from the clause database."""
+        self.deletions += 1
+        self.write(DELETION, literals)
+
+    def write(self, kind, literals):
+        buffer, to_original = self.buffer, self.to_original
+
+        if self.binary:
+            buffer.append(kind)
+            for literal in literals:
+                variable = abs(literal) if to_original is None else to_original[abs(literal)]
+                code = 2 * variable + (literal < 0)
+                while code > 0x7f:
+                    buffer.append(code & 0x7f | 0x80)
+                    code >>= 7
+                buffer.append(code)
+            buffer.append(0)
+        else:
+            if to_original is not None:
+                literals = [to_original[literal] if literal > 0 else -to_original[-literal] for literal in literals]
+            buffer += ('d ' if kind == DELETION else '').encode() + ' '.join(map(str, [*literals, 0])).encode() + b'\n'
+
+        if len(buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer.clear()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+@dataclass
+class ProofCheckResult:
+    is_verified: bool
+    lemmas: int = 0
+    deletions: int = 0
+    # Position (1-based, in added lemmas) of the first lemma that is neither RUP nor RAT
+    failed_lemma: int = None
+    # Deleted clauses that were not in the formula, or were the reason of a top level literal (kept, as drat-trim does)
+    ignored_deletions: int = 0
+    elapsed_time: float = 0.0
+
+    def __str__(self):
+        outcome = 'VERIFIED' if self.is_verified else 'NOT VERIFIED'
+        failure = f', lemma {self.failed_lemma} fails' if self.failed_lemma is not None else ''
+        return f'{outcome} ({self.lemmas} lemmas, {self.deletions} deletions, ' \
+               f'{self.ignored_deletions} deletions ignored{failure}) in {self.elapsed_time:.3f}s'
+
+
+def read_proof(path):
+    """:return: generator of (is_deletion, literals) steps of a binary or text DRAT proof"""
+    with open(path, 'rb') as proof_file:
+        data = proof_file.read()
+
+    is_binary = any(byte not in b'0123456789-d \t\r\n' for byte in data[:64])
+    return _read_binary_proof(data) if is_binary else _read_text_proof(data)
+
+
+def _read_binary_proof(data):
+    position = 0
+    while position < len(data):
+        kind = data[position]
+        position += 1
+        if kind not in (ADDITION, DELETION):
+            raise ValueError(f'Invalid binary DRAT step {kind:#x} at byte {position - 1}')
+
+        literals = []
+        while True:
+            code, shift = 0, 0
+            while True:
+                byte = data[position]
+                position += 1
+                code |= (byte & 0x7f) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            if code == 0:
+                break
+            literals.append(-(code >> 1) if code & 1 else code >> 1)
+
+        yield kind == DELETION, literals
+
+
+def _read_text_proof(data):
+    for line in data.decode().splitlines():
+        tokens = line.split()
+        if not tokens:
+            continue
+        is_deletion = tokens[0] == 'd'
+        yield is_deletion, [int(token) for token in tokens[is_deletion:] if token != '0']
+
+
+def check_proof(clauses, proof_path) -> ProofCheckResult:
+    """
+    Check a DRAT proof of unsatisfiability of `clauses` forwards: every lemma has to be RUP (or RAT on its first
+    literal) with respect to the formula and the lemmas before it, until unit propagation refutes the formula.
+    """
+    start_time = time.perf_counter()
+    checker = ProofChecker(clauses)
+    result = ProofCheckResult(is_verified=checker.is_refuted)
+
+    for is_deletion, literals in read_proof(proof_path):
+        if checker.is_refuted:
+            break
+
+        if is_deletion:
+            result.deletions += 1
+            if not checker.delete(literals):
+                result.ignored_deletions += 1
+            continue
+
+        result.lemmas += 1
+        if not checker.is_implied(literals):
+            result.failed_lemma = result.lemmas
+            break
+        checker.add(literals)
+
+    result.is_verified = checker.is_refuted and result.failed_lemma is None
+    result.elapsed_time = time.perf_counter() - start_time
+    return result
+
+
+class ProofChecker:
+    """Clause database with two watched literals and a top level trail, which assumptions are pushed on and undone."""
+
+    def __init__(self, clauses):
+        self.clauses = []
+        self.watches = defaultdict(list)
+        # Indexes of every clause, by its sorted literals, to find deleted clauses
+        self.indexes = defaultdict(list)
+        self.values = {}
+        self.trail = []
+        self.head = 0
+        self.is_refuted = False
+
+        for clause in clauses:
+            self.add(clause)
+
+    def value(self, literal):
+        value = self.values.get(abs(literal))
+        return None if value is None else value == (literal > 0)
+
+    def assign(self, literal):
+        self.values[abs(literal)] = literal > 0
+        self.trail.append(literal)
+
+    def add(self, literals):
+        literals = list(dict.fromkeys(literals))
+        if any(-literal in literals for literal in literals) or self.is_refuted:
+            return
+
+        # Non-false literals are watched first, the clause may be unit or false at the top level
+        literals.sort(key=lambda literal: self.value(literal) is False)
+        index = len(self.clauses)
+        self.clauses.append(literals)
+        self.indexes[tuple(sorted(literals))].append(index)
+
+        if len(literals) >= 2:
+            self.watches[literals[0]].append(index)
+            self.watches[literals[1]].append(index)
+
+        if not literals or self.value(literals[0]) is False:
+            self.is_refuted = True
+        elif (len(literals) == 1 or self.value(literals[1]) is False) and self.value(literals[0]) is None:
+            self.assign(literals[0])
+            self.is_refuted = not self.propagate()
+
+    def delete(self, literals):
+        """:return: False when the deletion is ignored"""
+        indexes = self.indexes.get(tuple(sorted(set(literals))))
+        if not indexes:
+            return False
+
+        clause = self.clauses[indexes[-1]]
+        values = [self.value(literal) for literal in clause]
+        if values.count(True) == 1 and values.count(False) == len(clause) - 1:
+            # Possibly the reason of a top level literal
+            return False
+
+        self.clauses[indexes.pop()] = None
+        return True
+
+    def is_implied(self, lemma):
+        """RUP, or RAT on the first literal of the lemma."""
+        if self.is_rup(lemma):
+            return True
+        if not lemma:
+            return False
+
+        pivot = lemma[0]
+        for clause in self.clauses:
+            if clause is None or -pivot not in clause:
+                continue
+            resolvent = lemma + [literal for literal in clause if literal != -pivot]
+            if not any(-literal in resolvent for literal in resolvent) and not self.is_rup(resolvent):
+                return False
+
+        return True
+
+    def is_rup(self, lemma):
+        """Whether propagating the negation of the lemma at the top level leads to a conflict."""
+        mark = len(self.trail)
+        is_conflict = False
+
+        for literal in lemma:
+            value = self.value(literal)
+            if value is True:
+                is_conflict = True
+                break
+            if value is None:
+                self.assign(-literal)
+
+        if not is_conflict:
+            is_conflict = not self.propagate()
+
+        for literal in self.trail[mark:]:
+            del self.values[abs(literal)]
+        del self.trail[mark:]
+        self.head = mark
+
+        return is_conflict
+
+    def propagate(self):
+        """:return: False on a conflict"""
+        while self.head < len(self.trail):
+            false_literal = -self.trail[self.head]
+            self.head += 1
+
+            watching = self.watches[false_literal]
+            self.watches[false_literal] = still_watching = []
+
+            for position, index in enumerate(watching):
+                clause = self.clauses[index]
+                if clause is None:
+                    continue
+
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+
+                if self.value(clause[0]) is True:
+                    still_watching.append(index)
+                    continue
+
+                for other in range(2, len(clause)):
+                    if self.value(clause[other]) is not False:
+                        clause[1], clause[other] = clause[other], false_literal
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    still_watching.append(index)
+                    if self.value(clause[0]) is False:
+                        still_watching.extend(watching[position + 1:])
+                        return False
+                    self.assign(clause[0])
+
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check a DRAT proof of unsatisfiability of a DIMACS CNF.')
+    parser.add_argument('cnf_file')
+    parser.add_argument('proof_file')
+    arguments = parser.parse_args()
+
+    clauses, _ = read_dimacs_file(arguments.cnf_file)
+    result = check_proof(clauses, arguments.proof_file)
+
+    print(f's {result}')
+    raise SystemExit(0 if result.is_verified else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+On-disk library of learned clauses that follow from the sudoku rules alone, so later solves against the same rules
+start with them instead of deriving them again.
+
+The clauses a solver learns are implied by the rules and the clues of its sudoku. Conflict analysis drops the
+literals of level 0 (the clues and what they imply), so a learned clause is rarely implied by the rules alone. It is
+weakened into one that is: the negations of the clues are added to it, then dropped one at a time while the clause
+stays RUP (see `drat_proof.ProofChecker`) with respect to the rules and the library. A weakened clause reads "these
+clues imply the learned clause", and is kept when it is short enough.
+
+A library is stored per rule set, in a file named after the hash of the rule clauses (`rules_namespace`) and the
+library format version:
+
+    c lemma library version 1 rules <hash>
+    <lbd> <literal> ... 0
+
+Literals are DIMACS literals of the rules file, LBD is the one the clause was learned with.
+"""
+import os
+
+from Scripts.helpers.drat_proof import ProofChecker
+from Scripts.helpers.sudoku_rules import rules_namespace
+
+LIBRARY_VERSION = 1
+DEFAULT_LIBRARY_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'sat_solver', 'lemmas')
+# Learned clauses longer than this, or with a bigger LBD, are not recorded. The size is the one after weakening
+DEFAULT_MAX_SIZE = 12
+DEFAULT_MAX_LBD = 8
+# The library keeps the clauses with the smallest (LBD, size) beyond this many
+DEFAULT_MAX_LEMMAS = 20_000
+
+
+class LemmaLibrary:
+    """
+    Learned clauses implied by a rule set, loaded from and saved to `directory`.
+
+    :param rule_clauses: clauses of the rules file (DIMACS literals). Unit clauses are ignored, like the clues
+    """
+
+    def __init__(self, rule_clauses, directory=DEFAULT_LIBRARY_DIRECTORY, max_size=DEFAULT_MAX_SIZE,
+                 max_lbd=DEFAULT_MAX_LBD, max_lemmas=DEFAULT_MAX_LEMMAS):
+        self.rule_clauses = [list(clause) for clause in rule_clauses if len(clause) > 1]
+        self.namespace = rules_namespace(self.rule_clauses)
+        self.path = os.path.join(directory, f'{self.namespace}.v{LIBRARY_VERSION}.lemmas')
+        self.max_size = max_size
+        self.max_lbd = max_lbd
+        self.max_lemmas = max_lemmas
+        # Sorted literals of every clause, with its LBD
+        self.lemmas = {}
+        self.checker = None
+
+        self.load()
+
+    def __len__(self):
+        return len(self.lemmas)
+
+    def load(self):
+        """Read the library file, when it exists and has the current version."""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path) as library_file:
+            header = library_file.readline().split()
+            if header != ['c', 'lemma', 'library', 'version', str(LIBRARY_VERSION), 'rules', self.namespace]:
+                return
+
+            for line in library_file:
+                lbd, *literals, _ = map(int, line.split())
+                self.lemmas[tuple(literals)] = lbd
+
+    def save(self):
+        """
+        Write the library, with the clauses other solves saved in the meantime. The file is replaced atomically, so
+        concurrent solves never read half of it.
+        """
+        self.load()
+        if len(self.lemmas) > self.max_lemmas:
+            kept = sorted(self.lemmas.items(), key=lambda lemma: (lemma[1], len(lemma[0])))[:self.max_lemmas]
+            self.lemmas = dict(kept)
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w') as library_file:
+            library_file.write(f'c lemma library version {LIBRARY_VERSION} rules {self.namespace}\n')
+            for literals, lbd in self.lemmas.items():
+                library_file.write(f'{lbd} {" ".join(map(str, literals))} 0\n')
+
+        os.replace(temporary_path, self.path)
+
+    def select(self, max_size=DEFAULT_MAX_SIZE, max_lbd=DEFAULT_MAX_LBD):
+        """:return: (LBD, literals) of the clauses to preload, see `CDCLSatSolver.add_lemmas`"""
+        return [(lbd, list(literals)) for literals, lbd in self.lemmas.items()
+                if len(literals) <= max_size and lbd <= max_lbd]
+
+    def record(self, lemma_log, clues):
+        """
+        Weaken the clauses learned by a solve into clauses implied by the rules, and add the short ones.
+
+        :param lemma_log: (LBD, literals) of the learned clauses, in the order they were learned
+        :param clues: unit literals the solved CNF added to the rules
+        :return: the number of clauses added
+        """
+        added = 0
+
+        for lbd, literals in lemma_log:
+            if not literals or lbd > self.max_lbd or len(literals) > self.max_size:
+                continue
+
+            weakened = self.weaken(list(literals), clues)
+            if weakened is None or len(weakened) > self.max_size:
+                continue
+
+            key = tuple(sorted(weakened))
+            if key not in self.lemmas:
+                self.lemmas[key] = lbd
+                self.checker.add(weakened)
+                added += 1
+
+        return added
+
+    def weaken(self, literals, clues):
+        """:return: `literals` and the negations of the clues needed to make them RUP, None when all are not enough"""
+        if self.checker is None:
+            self.checker = ProofChecker(self.rule_clauses + [list(literals) for literals in self.lemmas])
+
+        negated_clues = [-clue for clue in clues if clue not in literals]
+        if not self.checker.is_rup(literals + negated_clues):
+            return None
+
+        position = 0
+        while position < len(negated_clues):
+            candidate = negated_clues[:position] + negated_clues[position + 1:]
+            if self.checker.is_rup(literals + candidate):
+                negated_clues = candidate
+            else:
+                position += 1
+
+        return literals + negated_clues
@@ -0,0 +1,110 @@
+"""
+Peak memory of a solve, and a memory limit stopping a CDCL search before it takes the worker process down.
+
+`MemoryMonitor` is entered around a solve. A sampling thread reads the resident set size (RSS) of the process every
+`interval` seconds, so solvers without hooks (DPLL, lookahead, local search) are measured too. With `trace` on, the
+Python allocations are also traced with `tracemalloc`, whose peak is exact but makes a pure-Python search several
+times slower.
+
+The limit applies to the traced memory when tracing, else to the RSS of the whole process (interpreter and imported
+modules included). The thread only raises `is_over_limit`: a CDCL search checks it after every conflict, reduces its
+clause database, and stops with `SATResult.UNKNOWN` when that did not bring the memory back under the limit (see
+`CDCLSatSolver.free_memory`).
+"""
+import os
+import sys
+import threading
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Seconds between two RSS samples
+DEFAULT_INTERVAL = 0.01
+STATM_PATH = '/proc/self/statm'
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss():
+    """Resident set size of this process in bytes: the current one on Linux, the peak one elsewhere, 0 without."""
+    try:
+        with open(STATM_PATH) as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        pass
+
+    if resource is None:
+        return 0
+
+    # Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryMonitor:
+    """
+    Peak memory of the `with` block it is entered around, in bytes.
+
+    :param limit: bytes the solve may use, None for no limit
+    :param trace: trace the Python allocations with `tracemalloc`, for `peak_traced_memory`
+    :param interval: seconds between two RSS samples
+    """
+
+    def __init__(self, limit=None, trace=False, interval=DEFAULT_INTERVAL):
+        self.limit = limit
+        self.trace = trace
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_traced_memory = 0
+        self.is_over_limit = False
+        self.is_tracing_started = False
+        self.stopped = threading.Event()
+        self.sampler = None
+
+    def __enter__(self):
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.is_tracing_started = True
+        if self.trace:
+            tracemalloc.reset_peak()
+
+        self.peak_rss = 0
+        self.is_over_limit = False
+        self.stopped.clear()
+        self.sample()
+
+        self.sampler = threading.Thread(target=self._sample_until_stopped, daemon=True)
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stopped.set()
+        self.sampler.join()
+        self.sample()
+
+        if self.is_tracing_started:
+            tracemalloc.stop()
+            self.is_tracing_started = False
+
+    def sample(self):
+        """
+        Measure the memory now, and update the peaks and `is_over_limit`.
+
+        :return: True when the memory is over the limit
+        """
+        rss = current_rss()
+        self.peak_rss = max(self.peak_rss, rss)
+        usage = rss
+
+        if self.trace and tracemalloc.is_tracing():
+            usage, peak = tracemalloc.get_traced_memory()
+            self.peak_traced_memory = max(self.peak_traced_memory, peak)
+
+        self.is_over_limit = self.limit is not None and usage > self.limit
+        return self.is_over_limit
+
+    def _sample_until_stopped(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
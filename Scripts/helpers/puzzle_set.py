@@ -0,0 +1,98 @@
+import mmap
+import random
+from array import array
+
+
+class PuzzleSet:
+    """
+    Puzzle file (one sudoku string per line, as in `test_sets/`) read through a memory map.
+
+    The offsets of the non-empty lines are indexed once when the set is opened. Puzzles are only decoded when they
+    are accessed, so big files can be streamed, sliced, sampled and sharded by index without reading them into
+    memory. Indexes follow the order of the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+
+        # mmap refuses empty files
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self._file_size() else b''
+
+        self.starts = array('q')
+        self.ends = array('q')
+        self._index_lines()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._read(position) for position in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f'Puzzle index {index} out of range for {len(self)} puzzles')
+
+        return self._read(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._read(index)
+
+    def sample(self, count, seed=None):
+        """`count` distinct puzzles picked at random, reproducible with `seed`, as (index, puzzle) pairs."""
+        indexes = random.Random(seed).sample(range(len(self)), count)
+        return [(index, self._read(index)) for index in indexes]
+
+    def shard(self, shard_index, shard_count):
+        """
+        Puzzles of shard `shard_index` out of `shard_count` (0-based), i.e. every `shard_count`-th puzzle, as
+        (index, puzzle) pairs. The shards of a set are disjoint and together cover it.
+        """
+        if not 0 <= shard_index < shard_count:
+            raise ValueError(f'Shard {shard_index} does not exist out of {shard_count}')
+
+        for index in range(shard_index, len(self), shard_count):
+            yield index, self._read(index)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read(self, index):
+        return self.data[self.starts[index]:self.ends[index]].decode('ascii')
+
+    def _file_size(self):
+        self.file.seek(0, 2)
+        return self.file.tell()
+
+    def _index_lines(self):
+        data, size = self.data, len(self.data)
+        start = 0
+
+        while start < size:
+            end = data.find(b'\n', start)
+            if end < 0:
+                end = size
+
+            # Skip surrounding whitespace (including Windows line endings) and empty lines
+            line_start, line_end = start, end
+            while line_start < line_end and data[line_start:line_start + 1].isspace():
+                line_start += 1
+            while line_end > line_start and data[line_end - 1:line_end].isspace():
+                line_end -= 1
+
+            if line_end > line_start:
+                self.starts.append(line_start)
+                self.ends.append(line_end)
+
+            start = end + 1
@@ -1,32 +1,27 @@
+import math as m
+
 UNKNOWN_NUMBER = 0
+SUDOKU_LENGTHS = (4, 9, 16, 25)
 
 
 def from_list_to_matrix(data: list, matrix_length=9) -> list:
+    """Sudoku matrix of a model (DIMACS literals). Variables that are not cell variables are ignored."""
     sudoku = _empty_matrix(matrix_length)
 
-    for value in data:
-        if value > 0:
-            row, column, value = list(str(value).strip())
-
-            row_index, column_index = int(row) - 1, int(column) - 1
-
-            if sudoku[row_index][column_index] == UNKNOWN_NUMBER:
-                sudoku[row_index][column_index] = int(value)
+    for literal in data:
+        if int(literal) > 0:
+            _fill_cell(sudoku, int(literal), matrix_length)
 
     return sudoku
 
 
 def from_dict_to_matrix(data: dict, matrix_length=9) -> list:
+    """Sudoku matrix of an assignment (variable -> bool). Variables that are not cell variables are ignored."""
     sudoku = _empty_matrix(matrix_length)
 
-    solution = {key for key, value in data.items() if value}
-
-    for item in solution:
-        row, column, value = list(str(item).strip())
-        row_index, column_index = int(row) - 1, int(column) - 1
-
-        if sudoku[row_index][column_index] == UNKNOWN_NUMBER:
-            sudoku[row_index][column_index] = int(value)
+    for variable, value in data.items():
+        if value:
+            _fill_cell(sudoku, int(variable), matrix_length)
 
     return sudoku
 
@@ -35,6 +30,108 @@ def from_dict_to_cnf(data: dict):
     return [str(key) if value else str(-key) for key, value in data.items()]
 
 
+def variable_base(matrix_length=9):
+    """Grids up to 9x9 use decimal digits (e.g. 123); bigger grids use base n + 1 (e.g. 17 for 16x16)."""
+    return 10 if matrix_length <= 9 else matrix_length + 1
+
+
+def to_variable(row, column, value, matrix_length=9):
+    """Encode a 1-based (row, column, value) triple as a DIMACS variable."""
+    base = variable_base(matrix_length)
+    return base * base * row + base * column + value
+
+
+def from_variable(variable, matrix_length=9):
+    """Decode a DIMACS variable into a 1-based (row, column, value) triple."""
+    base = variable_base(matrix_length)
+    row, remainder = divmod(abs(variable), base * base)
+    column, value = divmod(remainder, base)
+    return row, column, value
+
+
+def matrix_length_from_variables(total_variables):
+    """Guess the grid length from the `p cnf` variable count, or None when it is not a sudoku encoding."""
+    for length in reversed(SUDOKU_LENGTHS):
+        if to_variable(length, length, length, length) <= total_variables:
+            return length
+    return None
+
+
+def from_clauses_to_matrix(clauses, matrix_length=9) -> list:
+    """Collect the clues of a sudoku CNF, i.e. its positive unit clauses."""
+    sudoku = _empty_matrix(matrix_length)
+
+    for clause in clauses:
+        if len(clause) == 1 and clause[0] > 0:
+            row, column, value = from_variable(clause[0], matrix_length)
+            if 1 <= row <= matrix_length and 1 <= column <= matrix_length and 1 <= value <= matrix_length:
+                sudoku[row - 1][column - 1] = value
+
+    return sudoku
+
+
+def from_matrix_to_clauses(matrix) -> list:
+    """Turn every filled cell of a sudoku matrix into a unit clause."""
+    length = len(matrix)
+    return [[to_variable(row + 1, column + 1, value, length)]
+            for row in range(length)
+            for column, value in enumerate(matrix[row])
+            if value != UNKNOWN_NUMBER]
+
+
+def from_matrix_to_cnf(matrix) -> list:
+    """Full assignment of every cell variable for a solved sudoku matrix."""
+    length = len(matrix)
+    literals = []
+
+    for row in range(1, length + 1):
+        for column in range(1, length + 1):
+            for value in range(1, length + 1):
+                variable = to_variable(row, column, value, length)
+                literals.append(str(variable if matrix[row - 1][column - 1] == value else -variable))
+
+    return literals
+
+
+def from_sudoku_string_to_matrix(sudoku_str) -> list:
+    """Parse a sudoku string where `.` (or `0`) is unknown and `A`, `B`, ... stand for 10, 11, ..."""
+    sudoku_str = sudoku_str.strip()
+    length = m.isqrt(len(sudoku_str))
+    values = [_char_to_value(char) for char in sudoku_str]
+
+    return [values[row * length:(row + 1) * length] for row in range(length)]
+
+
+def from_matrix_to_sudoku_string(matrix) -> str:
+    """Inverse of `from_sudoku_string_to_matrix`: `.` for unknown cells, `A`, `B`, ... for 10, 11, ..."""
+    return ''.join(_value_to_char(value) for row in matrix for value in row)
+
+
+def _value_to_char(value):
+    if value == UNKNOWN_NUMBER:
+        return '.'
+    if value < 10:
+        return str(value)
+    return chr(ord('A') + value - 10)
+
+
+def _char_to_value(char):
+    if char in '.0':
+        return UNKNOWN_NUMBER
+    if char.isdigit():
+        return int(char)
+    return ord(char.upper()) - ord('A') + 10
+
+
+def _fill_cell(sudoku, variable, matrix_length):
+    """Write the value of a true cell variable, unless its cell already has one."""
+    row, column, value = from_variable(variable, matrix_length)
+
+    if 1 <= row <= matrix_length and 1 <= column <= matrix_length and 1 <= value <= matrix_length and \
+            sudoku[row - 1][column - 1] == UNKNOWN_NUMBER:
+        sudoku[row - 1][column - 1] = value
+
+
 def _empty_matrix(length=9):
     return [[0 for _ in range(length)] for _ in range(length)]
 
@@ -0,0 +1,260 @@
+import math as m
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from itertools import chain, count, groupby, permutations, product
+
+from Scripts.helpers.sat_outcome_converter import UNKNOWN_NUMBER
+
+# Box lengths up to this one are canonicalized under the full symmetry group. Bigger grids (16x16 has
+# (4!)^5 column orders) only use transposition, band/stack permutations and digit relabeling.
+FULL_SYMMETRY_MAX_BOX_LENGTH = 3
+# Transformations that may tie for the smallest canonical prefix before a sudoku is keyed as it is instead. Sudokus
+# with a handful of clues have a huge symmetry group to search (the empty grid ties on every transformation), real
+# puzzles stay within a few thousand.
+MAX_TIED_STATES = 10_000
+
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'sat_solver', 'solutions.sqlite')
+
+_CHARACTERS = '.123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+@dataclass(frozen=True)
+class Transformation:
+    """
+    Symmetry taking a sudoku to its canonical form: canonical[r][c] = digits[grid[rows[r]][columns[c]]], where
+    grid is the sudoku, transposed first when `transposed` is set.
+    """
+    transposed: bool
+    rows: tuple
+    columns: tuple
+    digits: dict
+
+    def apply(self, matrix):
+        digits = self._all_digits(len(matrix))
+        grid = _transpose(matrix) if self.transposed else matrix
+        return [[digits.get(grid[row][column], UNKNOWN_NUMBER) for column in self.columns] for row in self.rows]
+
+    def revert(self, canonical_matrix):
+        """Map a matrix in canonical coordinates (e.g. the solution of the canonical sudoku) back."""
+        length = len(canonical_matrix)
+        inverse_digits = {label: digit for digit, label in self._all_digits(length).items()}
+
+        grid = [[UNKNOWN_NUMBER] * length for _ in range(length)]
+        for canonical_row, row in enumerate(self.rows):
+            for canonical_column, column in enumerate(self.columns):
+                grid[row][column] = inverse_digits.get(canonical_matrix[canonical_row][canonical_column],
+                                                       UNKNOWN_NUMBER)
+
+        return _transpose(grid) if self.transposed else grid
+
+    def _all_digits(self, length):
+        """
+        Relabeling of every digit. Digits missing from the sudoku are interchangeable, they get the leftover labels
+        in order.
+        """
+        digits = dict(self.digits)
+        unused_digits = sorted(set(range(1, length + 1)) - set(digits))
+        unused_labels = sorted(set(range(1, length + 1)) - set(digits.values()))
+        digits.update(zip(unused_digits, unused_labels))
+
+        return digits
+
+
+def canonical_form(matrix):
+    """
+    Canonical representative of a sudoku under its symmetries: digit relabeling, band and stack permutations,
+    row and column permutations within them, and transposition.
+
+    The canonical form is the lexicographically smallest grid (unknown cells first) reachable with those
+    symmetries, built row by row while only keeping the transformations that tie for the smallest prefix. When more
+    than `MAX_TIED_STATES` of them tie, the sudoku itself is the key: its variants then miss the cache, but each key
+    still stands for the grid it spells, so both kinds of keys share the cache.
+
+    :return: the canonical sudoku string and the `Transformation` mapping `matrix` onto it
+    """
+    length = len(matrix)
+    box_length = m.isqrt(length)
+    full_symmetry = box_length <= FULL_SYMMETRY_MAX_BOX_LENGTH
+
+    # A state is (transposed, grid, rows chosen so far, column order, digit relabeling)
+    best_row, states = None, []
+    for transposed, grid in ((False, matrix), (True, _transpose(matrix))):
+        for row in _next_rows((), 0, box_length, full_symmetry):
+            relabeled_row, column_orders = _smallest_first_row(grid[row], box_length, full_symmetry)
+
+            if best_row is None or relabeled_row < best_row:
+                best_row, states = relabeled_row, []
+            if relabeled_row == best_row:
+                states.extend((transposed, grid, (row,), columns, _relabeling(grid[row], columns))
+                              for columns in column_orders)
+            if len(states) > MAX_TIED_STATES:
+                return _identity_form(matrix)
+    best_rows = [best_row]
+
+    for position in range(1, length):
+        best_row, next_states = None, []
+
+        for transposed, grid, rows, columns, digits in states:
+            for row in _next_rows(rows, position, box_length, full_symmetry):
+                relabeled_digits = dict(digits)
+                relabeled_row = tuple(_relabel(grid[row][column], relabeled_digits) for column in columns)
+
+                if best_row is None or relabeled_row < best_row:
+                    best_row, next_states = relabeled_row, []
+                if relabeled_row == best_row:
+                    next_states.append((transposed, grid, rows + (row,), columns, relabeled_digits))
+
+        if len(next_states) > MAX_TIED_STATES:
+            return _identity_form(matrix)
+
+        best_rows.append(best_row)
+        states = next_states
+
+    transposed, _, rows, columns, digits = states[0]
+    key = ''.join(_CHARACTERS[value] for row in best_rows for value in row)
+
+    return key, Transformation(transposed, rows, columns, digits)
+
+
+class SolutionCache:
+    """
+    On-disk (SQLite) cache of sudoku solutions keyed by canonical form, so symmetric variants of an already solved
+    sudoku are answered without solving. Holds at most `max_entries` solutions, evicting the least recently used.
+
+    :param path: SQLite file, created when missing
+    :param namespace: separates caches of different rule sets (e.g. a hash of the rule clauses)
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, namespace=''):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS solutions ('
+                                'namespace TEXT NOT NULL, '
+                                'puzzle TEXT NOT NULL, '
+                                'solution TEXT NOT NULL, '
+                                'last_used INTEGER NOT NULL, '
+                                'PRIMARY KEY (namespace, puzzle))')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)')
+        self.connection.commit()
+
+    def get(self, matrix):
+        """Solution of `matrix` (or of any symmetric variant of it) or None."""
+        key, transformation = canonical_form(matrix)
+
+        row = self.connection.execute('SELECT solution FROM solutions WHERE namespace = ? AND puzzle = ?',
+                                      (self.namespace, key)).fetchone()
+        if row is None:
+            return None
+
+        self.connection.execute('UPDATE solutions SET last_used = ? WHERE namespace = ? AND puzzle = ?',
+                                (time.time_ns(), self.namespace, key))
+        self.connection.commit()
+
+        return transformation.revert(_from_key(row[0], len(matrix)))
+
+    def put(self, matrix, solution):
+        key, transformation = canonical_form(matrix)
+        canonical_solution = ''.join(_CHARACTERS[value] for row in transformation.apply(solution) for value in row)
+
+        self.connection.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)',
+                                (self.namespace, key, canonical_solution, time.time_ns()))
+        self._evict()
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM solutions').fetchone()[0]
+
+    def _evict(self):
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.connection.execute('DELETE FROM solutions WHERE rowid IN '
+                                    '(SELECT rowid FROM solutions ORDER BY last_used LIMIT ?)', (excess,))
+
+
+def _smallest_first_row(values, box_length, full_symmetry):
+    """
+    Smallest relabeled form of a first row and every column order producing it. Relabeling numbers the digits of
+    the first row in order, so only where its unknown cells end up matters: stacks with fewer clues go first and
+    unknown cells go first within a stack.
+    """
+    stacks = []
+    for stack in range(box_length):
+        columns = range(stack * box_length, (stack + 1) * box_length)
+        unknowns = [column for column in columns if values[column] == UNKNOWN_NUMBER]
+        clues = [column for column in columns if values[column] != UNKNOWN_NUMBER]
+
+        if full_symmetry:
+            inner_orders = [first + second for first in permutations(unknowns) for second in permutations(clues)]
+        else:
+            inner_orders = [tuple(columns)]
+
+        pattern = tuple(values[column] != UNKNOWN_NUMBER for column in inner_orders[0])
+        stacks.append((pattern, inner_orders))
+
+    stacks.sort(key=lambda stack: stack[0])
+
+    labels = count(1)
+    relabeled_row = tuple(next(labels) if is_clue else UNKNOWN_NUMBER for pattern, _ in stacks for is_clue in pattern)
+
+    # Stacks with the same pattern can still be swapped
+    groups = [list(group) for _, group in groupby(stacks, key=lambda stack: stack[0])]
+    column_orders = [tuple(chain.from_iterable(inner))
+                     for stack_order in product(*(permutations(group) for group in groups))
+                     for inner in product(*(orders for _, orders in chain.from_iterable(stack_order)))]
+
+    return relabeled_row, column_orders
+
+
+def _next_rows(rows, position, box_length, full_symmetry):
+    """Rows that can come next while keeping the bands together."""
+    if position % box_length == 0:
+        used_bands = {row // box_length for row in rows}
+        bands = [band for band in range(box_length) if band not in used_bands]
+        if full_symmetry:
+            return [band * box_length + offset for band in bands for offset in range(box_length)]
+        return [band * box_length for band in bands]
+
+    band = rows[-1] // box_length
+    candidates = [row for row in range(band * box_length, (band + 1) * box_length) if row not in rows]
+    return candidates if full_symmetry else candidates[:1]
+
+
+def _identity_form(matrix):
+    length = len(matrix)
+    key = ''.join(_CHARACTERS[value] for row in matrix for value in row)
+    return key, Transformation(False, tuple(range(length)), tuple(range(length)), {})
+
+
+def _relabeling(values, columns):
+    digits = {}
+    for column in columns:
+        _relabel(values[column], digits)
+    return digits
+
+
+def _relabel(value, digits):
+    if value == UNKNOWN_NUMBER:
+        return UNKNOWN_NUMBER
+    if value not in digits:
+        digits[value] = len(digits) + 1
+    return digits[value]
+
+
+def _transpose(matrix):
+    return [list(row) for row in zip(*matrix)]
+
+
+def _from_key(key, length):
+    values = [_CHARACTERS.index(character) for character in key]
+    return [values[row * length:(row + 1) * length] for row in range(length)]
@@ -0,0 +1,193 @@
+import math as m
+from dataclasses import dataclass
+from enum import Enum, auto
+
+from Scripts.helpers.sat_outcome_converter import UNKNOWN_NUMBER
+
+
+class PropagationStage(Enum):
+    SOLVED = auto()
+    CONTRADICTION = auto()
+    REDUCED = auto()
+
+
+@dataclass(frozen=True)
+class PropagationResult:
+    stage: PropagationStage
+    matrix: list
+    naked_singles: int
+    hidden_singles: int
+    locked_candidates: int
+
+    @property
+    def is_resolved(self):
+        """True when no SAT solver is needed anymore (solved or proven invalid)."""
+        return self.stage != PropagationStage.REDUCED
+
+
+class _Contradiction(Exception):
+    pass
+
+
+class _CandidateGrid:
+    """
+    Candidate sets of every cell stored as bitmasks (bit v - 1 set means value v is still possible).
+    """
+
+    def __init__(self, matrix):
+        self.length = len(matrix)
+        self.box_length = m.isqrt(self.length)
+        self.all_values = (1 << self.length) - 1
+        self.candidates = [self.all_values] * (self.length * self.length)
+        self.solved = [False] * (self.length * self.length)
+
+        self.rows = [[row * self.length + column for column in range(self.length)] for row in range(self.length)]
+        self.columns = [[row * self.length + column for row in range(self.length)] for column in range(self.length)]
+        self.boxes = [[(box_row + row) * self.length + box_column + column
+                       for row in range(self.box_length)
+                       for column in range(self.box_length)]
+                      for box_row in range(0, self.length, self.box_length)
+                      for box_column in range(0, self.length, self.box_length)]
+        self.units = self.rows + self.columns + self.boxes
+
+        self.peers = [set() for _ in range(self.length * self.length)]
+        for unit in self.units:
+            for cell in unit:
+                self.peers[cell].update(unit)
+        for cell, peers in enumerate(self.peers):
+            peers.discard(cell)
+
+        self.naked_singles = 0
+        self.hidden_singles = 0
+        self.locked_candidates = 0
+
+        for row, values in enumerate(matrix):
+            for column, value in enumerate(values):
+                if value != UNKNOWN_NUMBER:
+                    self.place(row * self.length + column, 1 << (value - 1))
+
+    def place(self, cell, bit):
+        if not self.candidates[cell] & bit:
+            raise _Contradiction()
+
+        self.candidates[cell] = bit
+        self.solved[cell] = True
+
+        for peer in self.peers[cell]:
+            self.eliminate(peer, bit)
+
+    def eliminate(self, cell, bits):
+        if not self.candidates[cell] & bits:
+            return False
+
+        self.candidates[cell] &= ~bits
+        if not self.candidates[cell]:
+            raise _Contradiction()
+
+        return True
+
+    def propagate(self):
+        changed = True
+        while changed:
+            changed = self.apply_naked_singles() or self.apply_hidden_singles() or self.apply_locked_candidates()
+
+    def apply_naked_singles(self):
+        changed = False
+        for cell, candidates in enumerate(self.candidates):
+            if not self.solved[cell] and candidates & (candidates - 1) == 0:
+                self.place(cell, candidates)
+                self.naked_singles += 1
+                changed = True
+        return changed
+
+    def apply_hidden_singles(self):
+        changed = False
+        for unit in self.units:
+            seen_once, seen_twice = 0, 0
+            for cell in unit:
+                seen_twice |= seen_once & self.candidates[cell]
+                seen_once |= self.candidates[cell]
+
+            if seen_once != self.all_values:
+                raise _Contradiction()
+
+            singles = seen_once & ~seen_twice
+            for cell in unit:
+                bit = self.candidates[cell] & singles
+                if bit and not self.solved[cell]:
+                    if bit & (bit - 1):
+                        raise _Contradiction()
+                    self.place(cell, bit)
+                    self.hidden_singles += 1
+                    changed = True
+        return changed
+
+    def apply_locked_candidates(self):
+        changed = False
+        for box in self.boxes:
+            for lines in (self.rows, self.columns):
+                changed |= self._lock(box, lines)
+
+        for lines in (self.rows, self.columns):
+            for line in lines:
+                changed |= self._lock(line, self.boxes)
+        return changed
+
+    def _lock(self, unit, intersecting_units):
+        """Remove a value from an intersecting unit when `unit` can only hold it inside that intersection."""
+        changed = False
+        for bit in self._bits(self.all_values):
+            places = {cell for cell in unit if self.candidates[cell] & bit and not self.solved[cell]}
+            if len(places) < 2:
+                continue
+
+            for other in intersecting_units:
+                if places.issubset(other):
+                    for cell in other:
+                        if cell not in unit and self.eliminate(cell, bit):
+                            self.locked_candidates += 1
+                            changed = True
+                    break
+        return changed
+
+    def to_matrix(self):
+        return [[self._value(self.candidates[row * self.length + column]) if self.solved[row * self.length + column]
+                 else UNKNOWN_NUMBER
+                 for column in range(self.length)]
+                for row in range(self.length)]
+
+    def is_solved(self):
+        return all(self.solved)
+
+    @staticmethod
+    def _bits(mask):
+        while mask:
+            bit = mask & -mask
+            yield bit
+            mask ^= bit
+
+    @staticmethod
+    def _value(bit):
+        return bit.bit_length()
+
+
+def propagate_sudoku(matrix) -> PropagationResult:
+    """
+    Cheap sudoku-level constraint propagation (naked singles, hidden singles and locked candidates)
+    to run before the puzzle gets encoded as CNF.
+
+    :param matrix: sudoku matrix, using UNKNOWN_NUMBER for empty cells
+    :return: whether the puzzle got solved, was proven invalid or only reduced, plus the resulting matrix
+    """
+    grid = None
+    try:
+        grid = _CandidateGrid(matrix)
+        grid.propagate()
+    except _Contradiction:
+        counters = (grid.naked_singles, grid.hidden_singles, grid.locked_candidates) if grid else (0, 0, 0)
+        return PropagationResult(PropagationStage.CONTRADICTION, matrix, *counters)
+
+    stage = PropagationStage.SOLVED if grid.is_solved() else PropagationStage.REDUCED
+
+    return PropagationResult(stage, grid.to_matrix(), grid.naked_singles, grid.hidden_singles,
+                             grid.locked_candidates)
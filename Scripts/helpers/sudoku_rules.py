@@ -0,0 +1,62 @@
+"""
+Rule sets of `sudoku_rules/`, and the test telling a sudoku CNF (clues plus one of those rule sets) from any other
+CNF. Only such a CNF can be answered from its clues alone, by the propagation pre-pass or the solution cache.
+"""
+import hashlib
+import os
+from functools import lru_cache
+
+from Scripts.helpers.dimacs_reader import read_dimacs_file
+from Scripts.helpers.sat_outcome_converter import matrix_length_from_variables, from_clauses_to_matrix, \
+    from_matrix_to_clauses
+
+RULES_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                               'sudoku_rules')
+
+
+def rules_file_path(matrix_length):
+    return os.path.join(RULES_DIRECTORY, f'sudoku-rules-{matrix_length}x{matrix_length}.cnf')
+
+
+def rules_namespace(clauses):
+    """Hash of a rule set: every clause but the clues (positive unit clauses), independent of their order."""
+    rules = sorted(tuple(sorted(clause)) for clause in clauses if len(clause) != 1 or clause[0] < 0)
+    return hashlib.sha256(repr(rules).encode()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def shipped_rules_namespace(matrix_length):
+    """`rules_namespace` of the rules file of a `matrix_length` x `matrix_length` sudoku, None when it is missing."""
+    path = rules_file_path(matrix_length)
+    if not os.path.exists(path):
+        return None
+
+    rules, _ = read_dimacs_file(path)
+    return rules_namespace(rules)
+
+
+def sudoku_clues(clauses, total_variables):
+    """
+    Clues of a sudoku CNF: positive unit clauses of cell variables, at most one per cell, and exactly the clauses
+    of a rules file besides them.
+
+    :return: the clues as a matrix, None for any other CNF (e.g. one with a negative unit or an extra clause)
+    """
+    matrix_length = matrix_length_from_variables(total_variables)
+    if matrix_length is None:
+        return None
+
+    units = {clause[0] for clause in clauses if len(clause) == 1}
+    if any(literal < 0 for literal in units) or any(not clause for clause in clauses):
+        return None
+
+    matrix = from_clauses_to_matrix(clauses, matrix_length)
+    # Clues out of the grid, or two clues of one cell, do not survive the round trip through the matrix
+    if units != {clue for clue, in from_matrix_to_clauses(matrix)}:
+        return None
+
+    namespace = shipped_rules_namespace(matrix_length)
+    if namespace is None or rules_namespace(clauses) != namespace:
+        return None
+
+    return matrix
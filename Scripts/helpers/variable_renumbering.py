@@ -0,0 +1,47 @@
+from array import array
+
+
+class VariableRenumbering:
+    """
+    Maps the variables a CNF actually uses onto dense DIMACS variables 1..n (array index 0..n-1) and back.
+
+    Sudoku encodings are sparse (the 9x9 rules declare 999 variables but only use 729 of them), so solvers and
+    heuristics working on the renumbered CNF can size their per-variable arrays by the number of used variables.
+    Variables not seen when the renumbering was built get the next free number when first encoded.
+    """
+
+    def __init__(self, clauses=()):
+        self.to_original = array('i', [0])
+        self.to_dense = {}
+
+        for clause in clauses:
+            for literal in clause:
+                self.encode_literal(literal)
+
+    @property
+    def total_variables(self):
+        return len(self.to_original) - 1
+
+    def encode_literal(self, literal):
+        variable = abs(literal)
+        dense_variable = self.to_dense.get(variable)
+
+        if dense_variable is None:
+            dense_variable = self.to_dense[variable] = len(self.to_original)
+            self.to_original.append(variable)
+
+        return dense_variable if literal > 0 else -dense_variable
+
+    def decode_literal(self, literal):
+        variable = self.to_original[abs(literal)]
+        return variable if literal > 0 else -variable
+
+    def encode_clauses(self, clauses):
+        return [[self.encode_literal(literal) for literal in clause] for clause in clauses]
+
+    def decode_literals(self, literals):
+        return [self.decode_literal(literal) for literal in literals]
+
+    def decode_assignment(self, assignment: dict):
+        """Map a {variable: value} assignment (as returned by DPLL) back to the original variables."""
+        return {self.to_original[variable]: value for variable, value in assignment.items()}
@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+# How often a dispatcher checks a running task for cancellation or timeout, in seconds
+POLL_INTERVAL = 0.02
+
+
+class WorkerPool:
+    """
+    Process pool whose running tasks can be stopped.
+
+    Every worker process is driven by a dispatcher thread through its own pipe. A task that times out or gets
+    cancelled while running has its worker process terminated and replaced, so the CPU is actually freed, which
+    `multiprocessing.Pool` and `ProcessPoolExecutor` can not do.
+
+    :param processes: number of worker processes (default: one per CPU)
+    :param initializer: called with `initargs` in every new worker process, e.g. to warm caches up
+    """
+
+    def __init__(self, processes=None, initializer=None, initargs=()):
+        self.processes = processes or os.cpu_count() or 1
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self.tasks = queue.Queue()
+        self.lock = threading.Lock()
+        self.cancelled = set()
+        self.running = 0
+        self.completed = 0
+        self.restarted_workers = 0
+
+        self.dispatchers = [threading.Thread(target=self._dispatch, daemon=True) for _ in range(self.processes)]
+        for dispatcher in self.dispatchers:
+            dispatcher.start()
+
+    def submit(self, function, *args, timeout=None) -> Future:
+        """
+        Run `function(*args)` in a worker process. `function` and its arguments have to be picklable.
+
+        :param timeout: seconds the task may run before its worker is stopped and the future fails with TimeoutError
+        """
+        future = Future()
+        self.tasks.put((future, function, args, timeout))
+        return future
+
+    def cancel(self, future: Future):
+        """Cancel a task, stopping its worker process when it is already running."""
+        if not future.cancel():
+            # A future settles before its dispatcher takes the lock to forget it, so a finished task is never added
+            with self.lock:
+                if not future.done():
+                    self.cancelled.add(future)
+
+    @property
+    def queue_depth(self):
+        """Tasks waiting for a free worker."""
+        return self.tasks.qsize()
+
+    def statistics(self):
+        with self.lock:
+            return {
+                'queue_depth': self.queue_depth,
+                'running': self.running,
+                'completed': self.completed,
+                'restarted_workers': self.restarted_workers,
+                'processes': self.processes,
+            }
+
+    def shutdown(self):
+        for _ in self.dispatchers:
+            self.tasks.put(None)
+
+        for dispatcher in self.dispatchers:
+            dispatcher.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def _dispatch(self):
+        process, connection = self._start_worker()
+
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+
+            future, function, args, timeout = task
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            with self.lock:
+                self.running += 1
+
+            if not self._run(future, connection, process, function, args, timeout):
+                process.terminate()
+                process.join()
+                process, connection = self._start_worker()
+
+                with self.lock:
+                    self.restarted_workers += 1
+
+            with self.lock:
+                self.running -= 1
+                self.completed += 1
+                self.cancelled.discard(future)
+
+        try:
+            connection.send(None)
+        except OSError:
+            # The worker is already gone, e.g. stopped by multiprocessing at interpreter exit
+            pass
+        process.join()
+
+    def _run(self, future, connection, process, function, args, timeout):
+        """Run one task and settle its future. Returns False when the worker process has to be replaced."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        try:
+            connection.send((function, args))
+        except Exception as error:
+            # Unpicklable task: the worker never got it
+            future.set_exception(error)
+            return True
+
+        while not connection.poll(POLL_INTERVAL):
+            if future in self.cancelled:
+                future.set_exception(CancelledError())
+                return False
+
+            if deadline is not None and time.monotonic() > deadline:
+                future.set_exception(TimeoutError(f'Task did not finish within {timeout} seconds'))
+                return False
+
+            if not process.is_alive():
+                future.set_exception(RuntimeError(f'Worker process died with exit code {process.exitcode}'))
+                return False
+
+        is_success, value = connection.recv()
+        if is_success:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+
+        return True
+
+    def _start_worker(self):
+        connection, worker_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_work, args=(worker_connection, self.initializer, self.initargs),
+                                          daemon=True)
+        process.start()
+        worker_connection.close()
+
+        return process, connection
+
+
+def _work(connection, initializer, initargs):
+    # Ctrl+C is handled by the parent, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if initializer is not None:
+        initializer(*initargs)
+
+    while True:
+        task = connection.recv()
+        if task is None:
+            return
+
+        function, args = task
+        try:
+            result = (True, function(*args))
+        except Exception as error:
+            result = (False, error)
+
+        try:
+            connection.send(result)
+        except Exception as error:
+            # Unpicklable result or exception
+            connection.send((False, RuntimeError(repr(error))))
@@ -0,0 +1,96 @@
+from Scripts.heuristics.CHB import CHBHeuristics
+from Scripts.heuristics.VSIDS import VSIDSHeuristics
+from Scripts.heuristics.heuristics import Heuristics
+
+VSIDS = 'VSIDS'
+CHB = 'CHB'
+
+
+class AdaptiveHeuristics(Heuristics):
+    """
+    Branches with either VSIDS or CHB, switching between them during the search. Both keep their scores up to date
+    on every conflict, so a switch takes effect on the next decision.
+
+    The search is split in phases of conflicts, each one longer than the previous. At the end of a phase, the
+    active heuristic is rated by the cost of its progress: the average LBD of the clauses it learned (lower means
+    more useful clauses) times the decisions it needed per conflict. It hands over to the other heuristic when that
+    one did better in its own last phase, or when the other one was never tried.
+
+    :param phase_length: conflicts of the first phase
+    :param phase_growth: length of a phase relative to the previous one
+    :param smoothing: weight of the latest phase in the rating of a heuristic (exponential moving average)
+    """
+
+    def __init__(self, phase_length=64, phase_growth=1.5, smoothing=0.5, initial=VSIDS):
+        super().__init__()
+        self.policies = {VSIDS: VSIDSHeuristics(), CHB: CHBHeuristics()}
+        self.active = initial
+        self.costs = {}
+
+        self.phase_length = phase_length
+        self.phase_growth = phase_growth
+        self.smoothing = smoothing
+
+        self.phase_conflicts = 0
+        self.phase_decisions = 0
+        self.phase_lbd_sum = 0
+
+    @property
+    def scores(self):
+        return self.policies[self.active].scores
+
+    @scores.setter
+    def scores(self, _):
+        # The base class initializes its own scores, the policies own theirs
+        pass
+
+    def initialize_scores(self, clauses):
+        clauses = [list(clause) for clause in clauses]
+        for policy in self.policies.values():
+            policy.initialize_scores(clauses)
+
+    def conflict(self, conflict_clause):
+        for policy in self.policies.values():
+            policy.conflict(conflict_clause)
+
+    def decay_scores(self):
+        for policy in self.policies.values():
+            policy.decay_scores()
+
+    def decide(self, assigned_literals):
+        self.phase_decisions += 1
+        return self.policies[self.active].decide(assigned_literals)
+
+    def learned(self, lbd, statistics):
+        self.phase_conflicts += 1
+        self.phase_lbd_sum += lbd
+
+        if self.phase_conflicts >= self.phase_length:
+            self._end_phase(statistics)
+
+    def state(self):
+        state = super().state()
+        state['policies'] = {name: policy.state() for name, policy in self.policies.items()}
+        return state
+
+    def restore_state(self, state):
+        for name, policy_state in state['policies'].items():
+            self.policies[name].restore_state(policy_state)
+
+        super().restore_state({name: value for name, value in state.items() if name != 'policies'})
+
+    def _end_phase(self, statistics):
+        average_lbd = self.phase_lbd_sum / self.phase_conflicts
+        cost = average_lbd * max(self.phase_decisions, 1) / self.phase_conflicts
+
+        previous_cost = self.costs.get(self.active)
+        self.costs[self.active] = cost if previous_cost is None else \
+            self.smoothing * cost + (1 - self.smoothing) * previous_cost
+
+        other = CHB if self.active == VSIDS else VSIDS
+        if other not in self.costs or self.costs[other] < self.costs[self.active]:
+            self.active = other
+            statistics.record_heuristic_switch(other)
+
+        self.phase_length = int(self.phase_length * self.phase_growth)
+        self.phase_conflicts = self.phase_decisions = self.phase_lbd_sum = 0
@@ -22,3 +22,20 @@ class Heuristics(ABC):
     @abstractmethod
     def decide(self, assigned_literals):
         pass
+
+    def learned(self, lbd, statistics):
+        """Called with the LBD of every learned clause, for heuristics that adapt to the progress of the search."""
+        pass
+
+    def state(self):
+        """Scores and parameters of the heuristic, to snapshot a search (see `checkpoint`)."""
+        return {name: dict(value) if isinstance(value, dict) else value for name, value in vars(self).items()}
+
+    def restore_state(self, state):
+        for name, value in state.items():
+            current = getattr(self, name)
+            if isinstance(current, defaultdict):
+                current.clear()
+                current.update(value)
+            else:
+                setattr(self, name, value)
@@ -0,0 +1,216 @@
+"""
+Stochastic local search for satisfiable CNFs: probSAT, with WalkSAT (SKC) as an alternative rule to pick the flip.
+
+Both start from a random assignment and flip one variable of a random unsatisfied clause at a time, preferring
+variables whose flip breaks (makes unsatisfied) few clauses. Break counts and the list of unsatisfied clauses are
+updated incrementally on every flip: each clause keeps its number of true literals and the XOR of its true
+variables, which is the only true variable when the count is one.
+
+Local search can not prove a CNF unsatisfiable: when the flip budget runs out the result is `SATResult.UNKNOWN`.
+"""
+import random
+from dataclasses import dataclass
+
+from Scripts.cdcl_heuristics_solver import SATResult
+from Scripts.helpers.cnf_preprocessor import preprocess
+
+PROBSAT = 'probsat'
+WALKSAT = 'walksat'
+
+# Flips of one try, and tries (each one from a new random assignment) before giving up
+DEFAULT_MAX_FLIPS = 100_000
+DEFAULT_MAX_TRIES = 10
+
+# probSAT picks a variable with a probability proportional to (EPSILON + break) ** -CB
+PROBSAT_CB = 2.3
+PROBSAT_EPSILON = 1.0
+# Probability of a random WalkSAT flip when every variable of the clause breaks some clause
+WALKSAT_NOISE = 0.567
+
+
+@dataclass
+class LocalSearchStatistics:
+    flips: int = 0
+    tries: int = 0
+    # Fewest unsatisfied clauses reached
+    best_unsatisfied: int = 0
+
+    def __str__(self):
+        return f"""
+        Amount of flips: {self.flips}
+        Amount of tries: {self.tries}
+        Fewest unsatisfied clauses: {self.best_unsatisfied}
+        """
+
+
+@dataclass(frozen=True)
+class LocalSearchResult:
+    solution: list[int]
+    status: SATResult
+    statistics: LocalSearchStatistics
+
+
+def local_search(clauses, total_variables, method=PROBSAT, seed=None, max_flips=DEFAULT_MAX_FLIPS,
+                 max_tries=DEFAULT_MAX_TRIES) -> LocalSearchResult:
+    """
+    Unit propagation, then local search on the clauses left. Unit clauses (e.g. sudoku clues) are hard on local
+    search, whose random start violates most of them, while propagating them usually leaves a small CNF.
+    """
+    simplified = preprocess(clauses, probing=False, elimination=False)
+    if simplified.is_unsatisfiable:
+        return LocalSearchResult([], SATResult.UNSATISFIABLE, LocalSearchStatistics())
+
+    result = LocalSearchSolver(simplified.clauses, total_variables, method, seed, max_flips, max_tries).solve()
+    if result.status != SATResult.SATISFIABLE:
+        return result
+
+    return LocalSearchResult(simplified.extend_model(result.solution), result.status, result.statistics)
+
+
+class LocalSearchSolver:
+    """
+    :param method: `PROBSAT` or `WALKSAT`
+    :param seed: seed of the random assignments and flips, the same seed repeats the same search
+    """
+
+    def __init__(self, clauses, total_variables, method=PROBSAT, seed=None, max_flips=DEFAULT_MAX_FLIPS,
+                 max_tries=DEFAULT_MAX_TRIES):
+        if method not in (PROBSAT, WALKSAT):
+            raise ValueError(f'Unknown local search method {method!r}, expected {PROBSAT} or {WALKSAT}')
+
+        self.method = method
+        self.random = random.Random(seed)
+        self.max_flips = max_flips
+        self.max_tries = max_tries
+        self.statistics = LocalSearchStatistics()
+
+        self.total_variables = max([total_variables] + [abs(literal) for clause in clauses for literal in clause])
+        self.has_empty_clause = False
+        self.clauses = []
+        for clause in clauses:
+            literals = list(dict.fromkeys(clause))
+            if not literals:
+                self.has_empty_clause = True
+            elif not any(-literal in literals for literal in literals):
+                self.clauses.append(literals)
+
+        # Clauses of every literal, indexed by literal + total_variables
+        self.occurrences = [[] for _ in range(2 * self.total_variables + 1)]
+        for index, clause in enumerate(self.clauses):
+            for literal in clause:
+                self.occurrences[literal + self.total_variables].append(index)
+
+        # Variables of every input clause, tautologies included, so they are all part of the model
+        self.variables = sorted({abs(literal) for clause in clauses for literal in clause})
+
+        # Probability weight of every possible break count
+        self.break_weights = [(PROBSAT_EPSILON + count) ** -PROBSAT_CB
+                              for count in range(max(map(len, self.occurrences), default=0) + 1)]
+
+        self.values = bytearray(self.total_variables + 1)
+        self.true_counts = [0] * len(self.clauses)
+        self.critical = [0] * len(self.clauses)
+        self.breaks = [0] * (self.total_variables + 1)
+        self.unsatisfied = []
+        self.unsatisfied_positions = [-1] * len(self.clauses)
+
+    def solve(self):
+        if self.has_empty_clause:
+            return LocalSearchResult([], SATResult.UNSATISFIABLE, self.statistics)
+
+        self.statistics.best_unsatisfied = len(self.clauses)
+
+        for _ in range(self.max_tries):
+            self.statistics.tries += 1
+            self.randomize()
+
+            for _ in range(self.max_flips):
+                if not self.unsatisfied:
+                    return LocalSearchResult(self.model(), SATResult.SATISFIABLE, self.statistics)
+
+                clause = self.clauses[self.unsatisfied[self.random.randrange(len(self.unsatisfied))]]
+                self.flip(self.pick_probsat(clause) if self.method == PROBSAT else self.pick_walksat(clause))
+
+                self.statistics.flips += 1
+                self.statistics.best_unsatisfied = min(self.statistics.best_unsatisfied, len(self.unsatisfied))
+
+            if not self.unsatisfied:
+                return LocalSearchResult(self.model(), SATResult.SATISFIABLE, self.statistics)
+
+        return LocalSearchResult(self.model(), SATResult.UNKNOWN, self.statistics)
+
+    def model(self):
+        return [variable if self.values[variable] else -variable for variable in self.variables]
+
+    def randomize(self):
+        """Start a try: random values for every variable, then the clause counters from scratch."""
+        for variable in self.variables:
+            self.values[variable] = self.random.getrandbits(1)
+
+        self.breaks = [0] * (self.total_variables + 1)
+        self.unsatisfied = []
+        self.unsatisfied_positions = [-1] * len(self.clauses)
+
+        for index, clause in enumerate(self.clauses):
+            true_count, critical = 0, 0
+            for literal in clause:
+                if self.values[abs(literal)] == (literal > 0):
+                    true_count += 1
+                    critical ^= abs(literal)
+
+            self.true_counts[index], self.critical[index] = true_count, critical
+            if true_count == 0:
+                self.add_unsatisfied(index)
+            elif true_count == 1:
+                self.breaks[critical] += 1
+
+    def pick_probsat(self, clause):
+        weights = [self.break_weights[self.breaks[abs(literal)]] for literal in clause]
+        return abs(self.random.choices(clause, weights)[0])
+
+    def pick_walksat(self, clause):
+        breaks = [self.breaks[abs(literal)] for literal in clause]
+        fewest = min(breaks)
+
+        if fewest > 0 and self.random.random() < WALKSAT_NOISE:
+            return abs(self.random.choice(clause))
+
+        return abs(self.random.choice([literal for literal, count in zip(clause, breaks) if count == fewest]))
+
+    def flip(self, variable):
+        self.values[variable] ^= 1
+        true_literal = variable if self.values[variable] else -variable
+        true_counts, critical, breaks = self.true_counts, self.critical, self.breaks
+
+        for index in self.occurrences[true_literal + self.total_variables]:
+            true_count = true_counts[index] + 1
+            true_counts[index] = true_count
+
+            if true_count == 1:
+                self.remove_unsatisfied(index)
+                breaks[variable] += 1
+            elif true_count == 2:
+                breaks[critical[index]] -= 1
+            critical[index] ^= variable
+
+        for index in self.occurrences[-true_literal + self.total_variables]:
+            true_count = true_counts[index] - 1
+            true_counts[index] = true_count
+            critical[index] ^= variable
+
+            if true_count == 0:
+                self.add_unsatisfied(index)
+                breaks[variable] -= 1
+            elif true_count == 1:
+                breaks[critical[index]] += 1
+
+    def add_unsatisfied(self, index):
+        self.unsatisfied_positions[index] = len(self.unsatisfied)
+        self.unsatisfied.append(index)
+
+    def remove_unsatisfied(self, index):
+        position, last = self.unsatisfied_positions[index], self.unsatisfied[-1]
+        self.unsatisfied[position] = last
+        self.unsatisfied_positions[last] = position
+        self.unsatisfied.pop()
+        self.unsatisfied_positions[index] = -1
@@ -0,0 +1,417 @@
+"""
+Lookahead DPLL for small but hard instances (e.g. `test_sets/damnhard.sdk.txt`).
+
+Before every decision, the preselected variables are propagated tentatively, one polarity at a time, and the
+solver branches on the variable whose two branches shrink the formula the most. On the way, lookahead finds:
+
+- failed literals: a literal whose propagation fails is set to false right away;
+- necessary assignments: literals implied by both polarities of a variable are set right away;
+- double lookahead: when a literal shrinks the formula a lot, lookahead is repeated in the reduced formula, and a
+  literal failing there (l and m fail together) is learned as the binary clause (-l or -m);
+- local learning: implications found by lookahead that come from longer clauses (l implies m) are learned as binary
+  clauses, so later lookaheads find them through a single step.
+
+Learned clauses follow the consequences of the decisions above the node that learned them, so they only live in
+that node's subtree and are dropped when the search backtracks out of it.
+
+Binary clauses are kept as implication lists. The longer clauses keep counters (true and false literals per clause)
+updated on every assignment and undone on backtrack, so no clause list is copied during the search. Once every
+longer clause is satisfied, the binary clauses left are a 2-SAT problem, finished without branching.
+"""
+import time
+from dataclasses import dataclass
+
+from Scripts.cdcl_heuristics_solver import SATResult
+
+# Weight of a reduced (not satisfied) clause by its remaining length in the lookahead measure: new binary clauses
+# count the most
+CLAUSE_WEIGHTS = [0.0, 0.0, 1.0, 0.2, 0.05] + [0.01] * 512
+# Lookahead runs on this share of the unassigned variables (the most constrained ones), and on at least
+# PRESELECTION_MINIMUM of them
+PRESELECTION_FRACTION = 0.1
+PRESELECTION_MINIMUM = 10
+# The double lookahead trigger decays by this factor per node, so it is tried again on deeper nodes
+DOUBLE_LOOKAHEAD_DECAY = 0.95
+
+
+@dataclass
+class LookaheadStatistics:
+    nodes: int = 0
+    backtracks: int = 0
+    lookaheads: int = 0
+    failed_literals: int = 0
+    necessary_assignments: int = 0
+    double_lookaheads: int = 0
+    local_learned: int = 0
+    elapsed_time: float = 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed_time if self.elapsed_time else 0.0
+
+    def __str__(self):
+        return f"""
+        Amount of nodes: {self.nodes} ({self.nodes_per_second:.1f} per second)
+        Amount of backtracks: {self.backtracks}
+        Amount of lookaheads: {self.lookaheads}
+        Amount of failed literals: {self.failed_literals}
+        Amount of necessary assignments: {self.necessary_assignments}
+        Amount of double lookaheads: {self.double_lookaheads}
+        Locally learned clauses: {self.local_learned}
+        """
+
+
+@dataclass(frozen=True)
+class LookaheadResult:
+    solution: list[int]
+    status: SATResult
+    statistics: LookaheadStatistics
+
+
+class LookaheadSolver:
+    """
+    :param double_lookahead: repeat lookahead in the formula reduced by the most promising literals
+    :param local_learning: learn the binary clauses found by lookahead
+    """
+
+    def __init__(self, clauses, total_variables, double_lookahead=True, local_learning=True):
+        self.use_double_lookahead = double_lookahead
+        self.use_local_learning = local_learning
+        self.statistics = LookaheadStatistics()
+
+        self.total_variables = max([total_variables] + [abs(literal) for clause in clauses for literal in clause])
+        self.variables = sorted({abs(literal) for clause in clauses for literal in clause})
+        self.has_empty_clause = False
+
+        offset = self.total_variables
+        # Binary implications of every literal, indexed by literal + total_variables
+        self.implications = [[] for _ in range(2 * offset + 1)]
+        self.units = []
+        # Clauses of three literals or more
+        self.clauses = []
+
+        for clause in clauses:
+            literals = list(dict.fromkeys(clause))
+            if not literals:
+                self.has_empty_clause = True
+            elif any(-literal in literals for literal in literals):
+                continue
+            elif len(literals) == 1:
+                self.units.append(literals[0])
+            elif len(literals) == 2:
+                self.implications[-literals[0] + offset].append(literals[1])
+                self.implications[-literals[1] + offset].append(literals[0])
+            else:
+                self.clauses.append(literals)
+
+        # Longer clauses of every literal, indexed by literal + total_variables
+        self.occurrences = [[] for _ in range(2 * offset + 1)]
+        for index, clause in enumerate(self.clauses):
+            for literal in clause:
+                self.occurrences[literal + offset].append(index)
+
+        self.sizes = [len(clause) for clause in self.clauses]
+        self.true_counts = [0] * len(self.clauses)
+        self.false_counts = [0] * len(self.clauses)
+        self.satisfied_clauses = 0
+
+        # 1 true, -1 false, 0 unassigned
+        self.values = [0] * (offset + 1)
+        self.trail = []
+        # Trail length before every decision
+        self.level_marks = []
+        # (depth, literal, implied literal) of every learned implication, in learning order
+        self.learned = []
+        self.double_lookahead_trigger = 0.0
+
+    def solve(self):
+        start_time = time.perf_counter()
+        result = self._solve()
+        self.statistics.elapsed_time = time.perf_counter() - start_time
+
+        return result
+
+    def _solve(self):
+        if self.has_empty_clause or not all(self.propagate(unit)[0] for unit in self.units):
+            return LookaheadResult([], SATResult.UNSATISFIABLE, self.statistics)
+
+        # (decision literal, whether it is the second branch)
+        decisions = []
+
+        while True:
+            self.statistics.nodes += 1
+            decision = self.lookahead()
+
+            if decision is None:
+                return LookaheadResult(self.model(), SATResult.SATISFIABLE, self.statistics)
+
+            is_consistent = decision != 0
+            if is_consistent:
+                decisions.append((decision, False))
+                self.level_marks.append(len(self.trail))
+                is_consistent = self.propagate(decision)[0]
+
+            while not is_consistent:
+                # Flip the deepest decision whose second branch was not tried yet
+                while decisions and decisions[-1][1]:
+                    decisions.pop()
+                    self.backtrack()
+                if not decisions:
+                    return LookaheadResult(self.model(), SATResult.UNSATISFIABLE, self.statistics)
+
+                literal, _ = decisions.pop()
+                self.backtrack()
+                self.statistics.backtracks += 1
+
+                decisions.append((-literal, True))
+                self.level_marks.append(len(self.trail))
+                is_consistent = self.propagate(-literal)[0]
+
+    def model(self):
+        return [variable if self.values[variable] == 1 else -variable for variable in self.variables]
+
+    # Lookahead
+
+    def lookahead(self):
+        """
+        Look ahead on the preselected variables, assigning the failed literals and necessary assignments found.
+
+        :return: the literal to branch on, None when the formula is satisfied, 0 on a conflict
+        """
+        self.double_lookahead_trigger *= DOUBLE_LOOKAHEAD_DECAY
+        is_changed = True
+        best_score, best_literal = -1.0, None
+
+        # Assignments found by a round can change the measures of the variables looked at before, so lookahead is
+        # repeated until a round finds none
+        while is_changed:
+            if self.satisfied_clauses == len(self.clauses):
+                return None if self.complete_binary_clauses() else 0
+
+            is_changed = False
+            best_score, best_literal = -1.0, None
+
+            for variable in self.preselect():
+                if self.values[variable]:
+                    continue
+
+                positive = self.lookahead_literal(variable)
+                negative = self.lookahead_literal(-variable) if positive is not None else None
+
+                if positive is None or negative is None:
+                    # A failed literal: its negation holds at this node
+                    self.statistics.failed_literals += 1
+                    is_changed = True
+                    if not self.propagate(-variable if positive is None else variable)[0]:
+                        return 0
+                    continue
+
+                (positive_reduction, positive_implied), (negative_reduction, negative_implied) = positive, negative
+                necessary = positive_implied & negative_implied
+                if necessary:
+                    self.statistics.necessary_assignments += len(necessary)
+                    is_changed = True
+                    if not all(self.propagate(literal)[0] for literal in necessary):
+                        return 0
+
+                score = 1024 * positive_reduction * negative_reduction + positive_reduction + negative_reduction
+                if score > best_score:
+                    # The branch shrinking the formula less is more likely to be satisfiable, it goes first
+                    best_score = score
+                    best_literal = variable if positive_reduction <= negative_reduction else -variable
+
+        return best_literal
+
+    def lookahead_literal(self, literal):
+        """
+        Propagate `literal` tentatively.
+
+        :return: (reduction of the formula, literals it implies), None when it fails
+        """
+        self.statistics.lookaheads += 1
+        mark = len(self.trail)
+        long_implied = []
+
+        is_consistent, reduction = self.propagate(literal, long_implied)
+
+        if is_consistent and self.use_double_lookahead and reduction > self.double_lookahead_trigger:
+            is_consistent = self.double_lookahead(literal, reduction)
+
+        implied = set(self.trail[mark + 1:])
+        self.undo(mark)
+
+        if not is_consistent:
+            return None
+
+        if self.use_local_learning:
+            for implied_literal in long_implied:
+                self.learn(literal, implied_literal)
+
+        return reduction, implied
+
+    def double_lookahead(self, literal, reduction):
+        """
+        Lookahead in the formula reduced by `literal`. A literal failing there is learned to be implied false by
+        `literal` and set to false. :return: False when `literal` fails
+        """
+        self.statistics.double_lookaheads += 1
+        is_found = False
+
+        for variable in self.preselect():
+            for candidate in (variable, -variable):
+                if self.values[variable]:
+                    break
+
+                mark = len(self.trail)
+                is_consistent, _ = self.propagate(candidate)
+                self.undo(mark)
+
+                if not is_consistent:
+                    is_found = True
+                    self.learn(literal, -candidate)
+                    if not self.propagate(-candidate)[0]:
+                        return False
+
+        if not is_found:
+            # Only try again on a literal doing better than this one
+            self.double_lookahead_trigger = reduction
+        return True
+
+    def preselect(self):
+        """The most constrained unassigned variables: occurring the most in short, not satisfied clauses."""
+        offset = self.total_variables
+        scores = []
+
+        for variable in self.variables:
+            if self.values[variable]:
+                continue
+
+            score = 0.0
+            for literal in (variable, -variable):
+                for index in self.occurrences[literal + offset]:
+                    if not self.true_counts[index]:
+                        score += CLAUSE_WEIGHTS[self.sizes[index] - self.false_counts[index]]
+                score += len(self.implications[literal + offset])
+            scores.append((score, variable))
+
+        count = max(PRESELECTION_MINIMUM, int(len(scores) * PRESELECTION_FRACTION))
+        scores.sort(reverse=True)
+        return [variable for _, variable in scores[:count]]
+
+    def complete_binary_clauses(self):
+        """
+        Satisfy the binary clauses left once the longer ones are. In 2-SAT, a literal whose propagation does not fail
+        can be set without losing a model, so no branching is needed.
+
+        :return: False when the binary clauses are unsatisfiable
+        """
+        for variable in self.variables:
+            if self.values[variable]:
+                continue
+
+            mark = len(self.trail)
+            if self.propagate(-variable)[0]:
+                continue
+
+            self.undo(mark)
+            if not self.propagate(variable)[0]:
+                return False
+
+        return True
+
+    # Local learning
+
+    def learn(self, literal, implied_literal):
+        """Learn `literal` implies `implied_literal`, until the search backtracks out of the current node."""
+        if implied_literal in self.implications[literal + self.total_variables]:
+            return
+
+        self.learned.append((len(self.level_marks), literal, implied_literal))
+        self.implications[literal + self.total_variables].append(implied_literal)
+        self.implications[-implied_literal + self.total_variables].append(-literal)
+        self.statistics.local_learned += 1
+
+    def forget(self, depth):
+        """Drop the clauses learned below `depth` decisions."""
+        while self.learned and self.learned[-1][0] > depth:
+            _, literal, implied_literal = self.learned.pop()
+            self.implications[literal + self.total_variables].pop()
+            self.implications[-implied_literal + self.total_variables].pop()
+
+    # Assignments
+
+    def propagate(self, literal, long_implied=None):
+        """
+        Assign `literal` and propagate it.
+
+        :param long_implied: when given, collects the literals implied through clauses longer than two literals
+        :return: (False on a conflict, weighted count of the clauses reduced)
+        """
+        offset = self.total_variables
+        values, true_counts, false_counts, sizes = self.values, self.true_counts, self.false_counts, self.sizes
+        queue = [literal]
+        reduction = 0.0
+
+        while queue:
+            literal = queue.pop()
+            value = values[abs(literal)]
+            if value:
+                if (value > 0) != (literal > 0):
+                    return False, reduction
+                continue
+
+            values[abs(literal)] = 1 if literal > 0 else -1
+            self.trail.append(literal)
+
+            for index in self.occurrences[literal + offset]:
+                true_counts[index] += 1
+                if true_counts[index] == 1:
+                    self.satisfied_clauses += 1
+
+            is_consistent = True
+            for index in self.occurrences[-literal + offset]:
+                false_count = false_counts[index] + 1
+                false_counts[index] = false_count
+
+                if true_counts[index] or not is_consistent:
+                    continue
+
+                remaining = sizes[index] - false_count
+                if remaining == 0:
+                    is_consistent = False
+                elif remaining == 1:
+                    implied = next(clause_literal for clause_literal in self.clauses[index]
+                                   if not values[abs(clause_literal)])
+                    queue.append(implied)
+                    if long_implied is not None and sizes[index] > 2:
+                        long_implied.append(implied)
+                else:
+                    reduction += CLAUSE_WEIGHTS[remaining]
+
+            if not is_consistent:
+                return False, reduction
+
+            queue.extend(self.implications[literal + offset])
+
+        return True, reduction
+
+    def undo(self, mark):
+        """Unassign the trail down to `mark` literals."""
+        offset = self.total_variables
+        values, true_counts, false_counts = self.values, self.true_counts, self.false_counts
+
+        while len(self.trail) > mark:
+            literal = self.trail.pop()
+            values[abs(literal)] = 0
+
+            for index in self.occurrences[literal + offset]:
+                true_counts[index] -= 1
+                if true_counts[index] == 0:
+                    self.satisfied_clauses -= 1
+            for index in self.occurrences[-literal + offset]:
+                false_counts[index] -= 1
+
+    def backtrack(self):
+        """Undo the deepest decision and everything assigned after it."""
+        self.undo(self.level_marks.pop())
+        self.forget(len(self.level_marks))
@@ -0,0 +1,214 @@
+"""
+Long-running solver service answering JSON lines, one request per line, over a Unix socket or stdin/stdout.
+
+Requests:
+    {"id": 1, "puzzle": "4.....8.5.3...", "strategy": "vsids"}    -> status, solution (sudoku string), stage
+    {"id": 2, "dimacs": "p cnf 3 2\\n1 -2 0\\n2 3 0", "strategy": "chb"}  -> status, model (DIMACS literals)
+    {"id": 3, "puzzles": ["...", "..."], "strategy": "dpll"}       -> results, one per puzzle, solved as one batch
+    {"id": 4, "command": "stats"}                                  -> queue depth and counters
+
+`strategy` (one of `warm_solver.STRATEGIES`: dpll, chb, vsids, adaptive, probsat or lookahead, default vsids) and
+`timeout` (seconds) are optional. Responses carry the request id and are written as soon as they are ready, so they
+can come back in a different order than the requests.
+
+Usage: python -m Scripts.solver_service [--socket PATH] [--workers N] [--timeout SECONDS] [--sizes 4,9,16]
+"""
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+
+from Scripts.helpers.worker_pool import WorkerPool
+from Scripts.warm_solver import solve_puzzle, solve_dimacs, warm_up, VSIDS
+
+DEFAULT_TIMEOUT = 60
+DEFAULT_MATRIX_LENGTHS = (9,)
+
+TIMEOUT_STATUS = 'TIMEOUT'
+ERROR_STATUS = 'ERROR'
+
+
+def handle_request(request: dict) -> dict:
+    """Solve one request, in a worker process."""
+    strategy = request.get('strategy', VSIDS)
+
+    if 'puzzles' in request:
+        return {'results': [solve_puzzle(puzzle, strategy) for puzzle in request['puzzles']]}
+
+    if 'puzzle' in request:
+        return solve_puzzle(request['puzzle'], strategy)
+
+    if 'dimacs' in request:
+        return solve_dimacs(request['dimacs'], strategy)
+
+    raise ValueError('A request needs a "puzzle", "puzzles", "dimacs" or "command" field')
+
+
+class SolverService:
+    """
+    Dispatches requests to a pool of warm worker processes: the rules of `matrix_lengths` are loaded before the
+    workers are forked, so no request pays for parsing them. Requests running longer than their timeout have their
+    worker stopped and replaced.
+    """
+
+    def __init__(self, workers=None, timeout=DEFAULT_TIMEOUT, matrix_lengths=DEFAULT_MATRIX_LENGTHS):
+        warm_up(matrix_lengths)
+
+        self.timeout = timeout
+        self.pool = WorkerPool(workers, initializer=warm_up, initargs=(matrix_lengths,))
+
+        self.lock = threading.Lock()
+        self.received = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def submit(self, line, respond):
+        """Handle one JSON line, calling `respond` with the response dict once it is ready."""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('a request is a JSON object')
+        except ValueError as error:
+            self._count_error()
+            respond({'id': None, 'status': ERROR_STATUS, 'error': f'Invalid request: {error}'})
+            return
+
+        request_id = request.get('id')
+
+        if request.get('command') == 'stats':
+            respond({'id': request_id, **self.statistics()})
+            return
+
+        with self.lock:
+            self.received += 1
+
+        future = self.pool.submit(handle_request, request, timeout=request.get('timeout', self.timeout))
+        future.add_done_callback(lambda done: respond(self._response(request_id, done)))
+
+    def statistics(self):
+        with self.lock:
+            return {
+                **self.pool.statistics(),
+                'received': self.received,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+            }
+
+    def close(self):
+        self.pool.shutdown()
+
+    def _response(self, request_id, future):
+        try:
+            return {'id': request_id, **future.result()}
+        except TimeoutError as error:
+            with self.lock:
+                self.timeouts += 1
+            return {'id': request_id, 'status': TIMEOUT_STATUS, 'error': str(error)}
+        except Exception as error:
+            self._count_error()
+            return {'id': request_id, 'status': ERROR_STATUS, 'error': f'{type(error).__name__}: {error}'}
+
+    def _count_error(self):
+        with self.lock:
+            self.errors += 1
+
+
+class _Responder:
+    """Writes responses of one client as JSON lines and lets the reader wait for the outstanding ones."""
+
+    def __init__(self, output, encode=False):
+        self.output = output
+        self.encode = encode
+        self.pending = 0
+        self.condition = threading.Condition()
+
+    def expect(self):
+        with self.condition:
+            self.pending += 1
+
+    def __call__(self, response):
+        line = json.dumps(response) + '\n'
+
+        with self.condition:
+            try:
+                self.output.write(line.encode() if self.encode else line)
+                self.output.flush()
+            except (OSError, ValueError):
+                # The client went away
+                pass
+
+            self.pending -= 1
+            self.condition.notify_all()
+
+    def wait(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.pending == 0)
+
+
+def serve_lines(service, lines, output, encode=False):
+    """Answer every request of `lines`, returning once all of them got their response."""
+    responder = _Responder(output, encode)
+
+    for line in lines:
+        if line.strip():
+            responder.expect()
+            service.submit(line, responder)
+
+    responder.wait()
+
+
+class _ConnectionHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        serve_lines(self.server.service, self.rfile, self.wfile, encode=True)
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, service):
+        super().__init__(path, _ConnectionHandler)
+        self.service = service
+
+
+def serve_unix_socket(service, path):
+    if os.path.exists(path):
+        os.remove(path)
+
+    with _UnixServer(path, service) as server:
+        print(f'Solver service listening on {path}', file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(path)
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Long-running SAT/sudoku solver service (JSON lines).')
+    parser.add_argument('--socket', help='Unix socket path to listen on (default: read stdin, write stdout)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='default per-request timeout')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_MATRIX_LENGTHS)),
+                        help='grid sizes whose rules are loaded up front, e.g. 4,9,16')
+    options = parser.parse_args(arguments)
+
+    # Stop cleanly (removing the socket) when the daemon is terminated
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    service = SolverService(options.workers, options.timeout, tuple(int(size) for size in options.sizes.split(',')))
+
+    try:
+        if options.socket:
+            serve_unix_socket(service, options.socket)
+        else:
+            serve_lines(service, sys.stdin, sys.stdout)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from Scripts.cdcl_heuristics_solver import SATResult
+from Scripts.cdcl_kernels import make_cdcl_solver
+from Scripts.helpers.cardinality_detector import detect_cardinality_constraints
+from Scripts.helpers.cnf_preprocessor import preprocess
+from Scripts.helpers.dimacs_reader import read_dimacs_file, parse_dimacs
+from Scripts.helpers.drat_proof import DRATWriter
+from Scripts.helpers.lemma_library import LemmaLibrary
+from Scripts.helpers.memory_monitor import MemoryMonitor
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix, from_matrix_to_clauses, \
+    from_clauses_to_matrix, from_matrix_to_sudoku_string, SUDOKU_LENGTHS
+from Scripts.helpers.sudoku_propagation import propagate_sudoku, PropagationStage
+from Scripts.helpers.sudoku_rules import rules_file_path
+from Scripts.helpers.variable_renumbering import VariableRenumbering
+from Scripts.heuristics.CHB import CHBHeuristics
+from Scripts.heuristics.VSIDS import VSIDSHeuristics
+from Scripts.heuristics.adaptive import AdaptiveHeuristics
+from Scripts.local_search import local_search
+from Scripts.lookahead_dpll import LookaheadSolver
+from Scripts.simple_dpll import dpll
+
+DPLL = 'dpll'
+CHB = 'chb'
+VSIDS = 'vsids'
+ADAPTIVE = 'adaptive'
+PROBSAT = 'probsat'
+LOOKAHEAD = 'lookahead'
+STRATEGIES = (DPLL, CHB, VSIDS, ADAPTIVE, PROBSAT, LOOKAHEAD)
+CDCL_STRATEGIES = (CHB, VSIDS, ADAPTIVE)
+
+
+@dataclass(frozen=True)
+class SudokuRules:
+    """Rules of one grid size, parsed, renumbered and with their cardinality constraints detected once."""
+    matrix_length: int
+    renumbering: VariableRenumbering
+    clauses: list
+    cdcl_clauses: list
+    cardinality_constraints: list
+
+
+@lru_cache(maxsize=None)
+def load_rules(matrix_length) -> SudokuRules:
+    """Rules of a `matrix_length` x `matrix_length` sudoku, loaded once per process."""
+    rules, _ = read_dimacs_file(rules_file_path(matrix_length))
+
+    renumbering = VariableRenumbering(rules)
+    clauses = renumbering.encode_clauses(rules)
+    cdcl_clauses, cardinality_constraints = detect_cardinality_constraints(clauses)
+
+    return SudokuRules(matrix_length, renumbering, clauses, cdcl_clauses, cardinality_constraints)
+
+
+@lru_cache(maxsize=None)
+def load_lemma_library(matrix_length, directory) -> LemmaLibrary:
+    """Learned-clause library of the rules of a `matrix_length` x `matrix_length` sudoku, loaded once per process."""
+    rules = load_rules(matrix_length)
+    return LemmaLibrary([rules.renumbering.decode_literals(clause) for clause in rules.clauses], directory)
+
+
+def warm_up(matrix_lengths=(9,)):
+    """Load the rules of the given grid sizes, e.g. before worker processes are forked."""
+    for matrix_length in matrix_lengths:
+        load_rules(matrix_length)
+
+
+def solve_puzzle(puzzle, strategy=VSIDS, seed=0, lemma_directory=None, memory_limit=None):
+    """
+    Solve a sudoku string with warm rules: propagation first, then `strategy` when propagation does not settle it.
+
+    :param seed: seed of the `PROBSAT` local search
+    :param lemma_directory: directory of the `LemmaLibrary` the CDCL strategies start with the clauses of, and
+    record theirs into. None solves without a library
+    :param memory_limit: bytes of resident memory a CDCL strategy may use, None for no limit
+    :return: dict with the status (UNKNOWN when local search gave up or CDCL ran out of memory), the solved sudoku
+    string (None when not satisfiable), the stage that resolved the sudoku (a propagation stage or the strategy) and
+    the elapsed time
+    """
+    _check_strategy(strategy)
+    start_time = time.perf_counter()
+    matrix = from_sudoku_string_to_matrix(puzzle)
+    if len(matrix) not in SUDOKU_LENGTHS or len(matrix) ** 2 != len(puzzle.strip()):
+        raise ValueError(f'Not a sudoku string: {puzzle!r}')
+
+    rules = load_rules(len(matrix))
+
+    propagation = propagate_sudoku(matrix)
+
+    if propagation.is_resolved:
+        status = SATResult.SATISFIABLE if propagation.stage == PropagationStage.SOLVED else SATResult.UNSATISFIABLE
+        return _puzzle_result(status, propagation.matrix if status == SATResult.SATISFIABLE else None,
+                              propagation.stage.name, start_time)
+
+    clues = rules.renumbering.encode_clauses(from_matrix_to_clauses(propagation.matrix))
+
+    if strategy == DPLL:
+        clauses = clues + [list(clause) for clause in rules.clauses]
+        status, model = _solve_with_dpll(clauses)
+    elif strategy == PROBSAT:
+        clauses = clues + [list(clause) for clause in rules.clauses]
+        status, model = _solve_with_local_search(clauses, rules.renumbering.total_variables, seed)
+    elif strategy == LOOKAHEAD:
+        clauses = clues + [list(clause) for clause in rules.clauses]
+        status, model = _solve_with_lookahead(clauses, rules.renumbering.total_variables)
+    else:
+        clauses = clues + [list(clause) for clause in rules.cdcl_clauses]
+        library = load_lemma_library(rules.matrix_length, lemma_directory) if lemma_directory is not None else None
+        lemmas = [(lbd, rules.renumbering.encode_clauses([literals])[0]) for lbd, literals in library.select()] \
+            if library is not None else ()
+        lemma_log = [] if library is not None else None
+
+        status, model = _solve_with_cdcl(clauses, rules.renumbering.total_variables, strategy,
+                                         rules.cardinality_constraints, lemmas=lemmas, lemma_log=lemma_log,
+                                         memory_limit=memory_limit)
+
+        if library is not None and library.record(
+                [(lbd, rules.renumbering.decode_literals(literals)) for lbd, literals in lemma_log],
+                rules.renumbering.decode_literals([clue for clue, in clues])):
+            library.save()
+
+    solution = None
+    if status == SATResult.SATISFIABLE:
+        solution = from_clauses_to_matrix([[literal] for literal in rules.renumbering.decode_literals(model)],
+                                          rules.matrix_length)
+
+    return _puzzle_result(status, solution, strategy, start_time)
+
+
+def solve_cnf(clauses, strategy=VSIDS, preprocessing=True, seed=0, proof_path=None, memory_limit=None):
+    """
+    Solve a plain CNF (DIMACS integers).
+
+    :param preprocessing: simplify the CNF with `cnf_preprocessor` before solving it
+    :param seed: seed of the `PROBSAT` local search
+    :param proof_path: file to write a binary DRAT proof of unsatisfiability to, CDCL strategies only. The CNF is not
+    preprocessed then, the proof has to refute the clauses as given
+    :param memory_limit: bytes of resident memory a CDCL strategy may use, None for no limit
+    :return: dict with the status (UNKNOWN when local search gave up or CDCL ran out of memory), the model as DIMACS
+    literals (None when not satisfiable) and the elapsed time
+    """
+    _check_strategy(strategy)
+    if proof_path is not None and strategy not in CDCL_STRATEGIES:
+        raise ValueError(f'DRAT proofs need a CDCL strategy, one of {", ".join(CDCL_STRATEGIES)}')
+    start_time = time.perf_counter()
+    renumbering = VariableRenumbering(clauses)
+    clauses = renumbering.encode_clauses(clauses)
+
+    # The long resolvents of variable elimination leave DPLL, which has no learning, with a much bigger search
+    is_preprocessed = preprocessing and proof_path is None
+    preprocessed = preprocess(clauses, elimination=strategy != DPLL) if is_preprocessed else None
+    if preprocessed is not None:
+        clauses = preprocessed.clauses
+
+    if preprocessed is not None and preprocessed.is_unsatisfiable:
+        status, model = SATResult.UNSATISFIABLE, None
+    elif strategy == DPLL:
+        status, model = _solve_with_dpll(clauses)
+    elif strategy == PROBSAT:
+        status, model = _solve_with_local_search(clauses, renumbering.total_variables, seed)
+    elif strategy == LOOKAHEAD:
+        status, model = _solve_with_lookahead(clauses, renumbering.total_variables)
+    else:
+        clauses, cardinality_constraints = detect_cardinality_constraints(clauses)
+        proof = DRATWriter(proof_path, to_original=renumbering.to_original) if proof_path is not None else None
+        status, model = _solve_with_cdcl(clauses, renumbering.total_variables, strategy, cardinality_constraints,
+                                         proof, memory_limit=memory_limit)
+        if proof is not None:
+            proof.close()
+
+    is_satisfiable = status == SATResult.SATISFIABLE
+    if is_satisfiable and preprocessed is not None:
+        model = preprocessed.extend_model(model)
+
+    return {
+        'status': status.name,
+        'model': renumbering.decode_literals(model) if is_satisfiable else None,
+        'elapsed_time': time.perf_counter() - start_time,
+    }
+
+
+def solve_dimacs(dimacs, strategy=VSIDS):
+    """`solve_cnf` for a DIMACS string."""
+    clauses, _ = parse_dimacs(line for line in dimacs.splitlines() if line.strip() and not line.startswith('c'))
+    return solve_cnf(clauses, strategy)
+
+
+def _check_strategy(strategy):
+    if strategy not in STRATEGIES:
+        raise ValueError(f'Unknown strategy {strategy!r}, expected one of {", ".join(STRATEGIES)}')
+
+
+def make_heuristics(strategy):
+    """Branching heuristics of a CDCL strategy."""
+    if strategy == CHB:
+        return CHBHeuristics()
+    if strategy == ADAPTIVE:
+        return AdaptiveHeuristics()
+    return VSIDSHeuristics()
+
+
+def _solve_with_cdcl(clauses, total_variables, strategy, cardinality_constraints, proof=None, lemmas=(),
+                     lemma_log=None, memory_limit=None):
+    memory_monitor = MemoryMonitor(memory_limit) if memory_limit is not None else None
+    result = make_cdcl_solver(clauses, total_variables, make_heuristics(strategy), cardinality_constraints,
+                              proof=proof, lemma_log=lemma_log, memory_monitor=memory_monitor).solve(lemmas)
+
+    return result.status, result.solution
+
+
+def _solve_with_local_search(clauses, total_variables, seed):
+    result = local_search(clauses, total_variables, seed=seed)
+
+    return result.status, result.solution
+
+
+def _solve_with_lookahead(clauses, total_variables):
+    result = LookaheadSolver(clauses, total_variables).solve()
+
+    return result.status, result.solution
+
+
+def _solve_with_dpll(clauses):
+    statistics = {
+        'implications': 0,
+        'decisions': 0,
+        'backtracks': 0,
+        'recursions': 0,
+        'conflicts': 0,
+        'clause_simplifications': 0,
+        'pure_literals': 0,
+    }
+    is_satisfiable, assignment, _ = dpll(clauses, statistics, {})
+
+    return SATResult.SATISFIABLE if is_satisfiable else SATResult.UNSATISFIABLE, \
+        [variable if value else -variable for variable, value in assignment.items()]
+
+
+def _puzzle_result(status, solution, stage, start_time):
+    return {
+        'status': status.name,
+        'solution': from_matrix_to_sudoku_string(solution) if solution is not None else None,
+        'stage': stage,
+        'elapsed_time': time.perf_counter() - start_time,
+    }
@@ -0,0 +1,26 @@
+"""Random CNFs and a brute-force oracle to check the solvers against."""
+from itertools import product
+
+
+def satisfies(model, clauses):
+    true_literals = set(model)
+    return all(any(literal in true_literals for literal in clause) for clause in clauses)
+
+
+def brute_force_models(clauses, total_variables, projection=None):
+    """Set of the models of `clauses`, restricted to the `projection` variables."""
+    variables = range(1, total_variables + 1) if projection is None else sorted(projection)
+    models = set()
+
+    for values in product((False, True), repeat=total_variables):
+        if all(any(values[abs(literal) - 1] == (literal > 0) for literal in clause) for clause in clauses):
+            models.add(frozenset(variable if values[variable - 1] else -variable for variable in variables))
+
+    return models
+
+
+def random_cnf(randomizer, total_variables, total_clauses):
+    variables = range(1, total_variables + 1)
+    return [[variable if randomizer.getrandbits(1) else -variable
+             for variable in randomizer.sample(variables, randomizer.randint(1, min(3, total_variables)))]
+            for _ in range(total_clauses)]
@@ -0,0 +1,25 @@
+"""Sudokus, their CNFs and a reference CDCL solve shared by the tests."""
+from Scripts.cdcl_heuristics_solver import CDCLSatSolver
+from Scripts.helpers.dimacs_reader import read_dimacs_file
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix, from_matrix_to_clauses
+from Scripts.helpers.sudoku_rules import rules_file_path
+from Scripts.helpers.variable_renumbering import VariableRenumbering
+from Scripts.heuristics.VSIDS import VSIDSHeuristics
+
+# First sudoku of top95.sdk.txt, which takes a few hundred conflicts
+TOP95_SUDOKU = '4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......'
+SUDOKU_4X4 = '...3..4114..3...'
+SOLUTION_4X4 = '4123234114323214'
+
+
+def sudoku_cnf(sudoku):
+    """Clues of a sudoku string followed by the rules of `sudoku_rules/` for its size, and their variable count."""
+    matrix = from_sudoku_string_to_matrix(sudoku)
+    rules, total_variables = read_dimacs_file(rules_file_path(len(matrix)))
+    return from_matrix_to_clauses(matrix) + rules, total_variables
+
+
+def cdcl_status(clauses):
+    renumbering = VariableRenumbering(clauses)
+    solver = CDCLSatSolver(renumbering.encode_clauses(clauses), renumbering.total_variables, VSIDSHeuristics())
+    return solver.solve().status
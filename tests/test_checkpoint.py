@@ -0,0 +1,50 @@
+from Scripts.cdcl_heuristics_solver import CDCLSatSolver, SATResult
+from Scripts.helpers.checkpoint import Checkpointer, Snapshot, problem_fingerprint, read_snapshot, write_snapshot
+from Scripts.helpers.variable_renumbering import VariableRenumbering
+from Scripts.heuristics.VSIDS import VSIDSHeuristics
+from sudoku_cnfs import TOP95_SUDOKU, sudoku_cnf
+
+def new_solver(clauses, renumbering, checkpointer):
+    return CDCLSatSolver(renumbering.encode_clauses(clauses), renumbering.total_variables, VSIDSHeuristics(),
+                         checkpointer=checkpointer)
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'solve.snapshot')
+    snapshot = Snapshot([(1, [3]), (2, [-1, 2, 5])], [4, -6], {'scores': {1: 0.5, -2: 1.25}, 'decay': 0.95},
+                        {'conflicts_counter': 7})
+
+    write_snapshot(path, 'fingerprint', snapshot)
+
+    assert read_snapshot(path, 'fingerprint') == snapshot
+    assert read_snapshot(path, 'another fingerprint') is None
+
+
+def test_fingerprint_tells_problems_apart():
+    assert problem_fingerprint([[1, 2], [-1]], 2) == problem_fingerprint([[1, 2], [-1]], 2)
+    assert problem_fingerprint([[1, 2], [-1]], 2) != problem_fingerprint([[1], [2, -1]], 2)
+    assert problem_fingerprint([[1, 2], [-1]], 2) != problem_fingerprint([[1, 2], [-1]], 3)
+
+
+def test_stopped_solve_resumes_to_a_model(tmp_path):
+    clauses, total_variables = sudoku_cnf(TOP95_SUDOKU)
+    renumbering = VariableRenumbering(clauses)
+    path = str(tmp_path / 'solve.snapshot')
+
+    # Due at the first conflict, then stops like after a SIGTERM
+    checkpointer = Checkpointer(path, problem_fingerprint(clauses, total_variables), interval=0,
+                                renumbering=renumbering)
+    checkpointer.is_stop_requested = True
+    assert new_solver(clauses, renumbering, checkpointer).solve().status == SATResult.UNKNOWN
+    assert checkpointer.saves == 1
+
+    checkpointer = Checkpointer(path, problem_fingerprint(clauses, total_variables), interval=None,
+                                renumbering=renumbering)
+    snapshot = checkpointer.load()
+    assert snapshot is not None and snapshot.statistics['conflicts_counter'] > 0
+
+    result = new_solver(clauses, renumbering, checkpointer).resume(snapshot)
+
+    assert result.status == SATResult.SATISFIABLE
+    model = set(renumbering.decode_literals(result.solution))
+    assert all(any(literal in model for literal in clause) for clause in clauses)
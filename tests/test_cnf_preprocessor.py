@@ -0,0 +1,61 @@
+import random
+
+from Scripts.cdcl_heuristics_solver import CDCLSatSolver, SATResult
+from Scripts.experiments.sudoku_validator import is_valid_sudoku
+from Scripts.helpers.cnf_preprocessor import preprocess
+from Scripts.helpers.sat_outcome_converter import from_list_to_matrix
+from Scripts.helpers.variable_renumbering import VariableRenumbering
+from Scripts.heuristics.VSIDS import VSIDSHeuristics
+from cnf_oracles import brute_force_models, random_cnf, satisfies
+from sudoku_cnfs import sudoku_cnf
+
+
+def test_extended_models_satisfy_the_original_clauses():
+    randomizer = random.Random(0)
+    eliminations = 0
+
+    for _ in range(300):
+        total_variables = randomizer.randint(3, 8)
+        clauses = random_cnf(randomizer, total_variables, randomizer.randint(1, 4 * total_variables))
+
+        result = preprocess(clauses)
+        eliminations += result.report.eliminated_variables
+        is_satisfiable = bool(brute_force_models(clauses, total_variables))
+
+        if result.is_unsatisfiable:
+            assert not is_satisfiable
+            continue
+
+        simplified_models = brute_force_models(result.clauses, total_variables)
+        assert bool(simplified_models) == is_satisfiable
+        for model in simplified_models:
+            assert satisfies(result.extend_model(model), clauses)
+
+    # The random CNFs have to exercise variable elimination, not only unit propagation
+    assert eliminations > 0
+
+
+def test_input_clauses_are_not_modified():
+    clauses = [[1, 2], [-1, 2], [-2, 3], [3]]
+    copy = [list(clause) for clause in clauses]
+
+    preprocess(clauses)
+
+    assert clauses == copy
+
+
+def test_preprocessed_sudoku_model_is_a_solution():
+    clauses, _ = sudoku_cnf('....' '..41' '14..' '3...')
+    renumbering = VariableRenumbering(clauses)
+
+    result = preprocess(renumbering.encode_clauses(clauses))
+    assert not result.is_unsatisfiable
+
+    solver = CDCLSatSolver([list(clause) for clause in result.clauses], renumbering.total_variables,
+                           VSIDSHeuristics())
+    solved = solver.solve()
+    assert solved.status == SATResult.SATISFIABLE
+
+    model = renumbering.decode_literals(result.extend_model(solved.solution))
+    assert satisfies(model, clauses)
+    assert is_valid_sudoku(from_list_to_matrix(model, 4))
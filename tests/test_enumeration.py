@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from Scripts.cdcl_heuristics_solver import CDCLSatSolver
+from Scripts.heuristics.CHB import CHBHeuristics
+from Scripts.heuristics.VSIDS import VSIDSHeuristics
+from cnf_oracles import brute_force_models, random_cnf
+
+
+def enumerated_models(clauses, total_variables, projection=None, heuristics=VSIDSHeuristics):
+    solver = CDCLSatSolver([list(clause) for clause in clauses], total_variables, heuristics())
+    return [frozenset(model) for model in solver.enumerate_solutions(projection=projection)]
+
+
+def test_unconstrained_variables_are_counted():
+    solver = CDCLSatSolver([], 3, VSIDSHeuristics())
+    assert solver.count_solutions() == 8
+
+
+def test_free_projection_variable_is_counted():
+    # Variable 3 is in no clause
+    solver = CDCLSatSolver([[1, 2], [-1, -2]], 3, VSIDSHeuristics())
+    assert solver.count_solutions(projection=[1, 3]) == 4
+
+    solver = CDCLSatSolver([[1], [1, 2]], 2, VSIDSHeuristics())
+    assert solver.count_solutions(projection=[2]) == 2
+
+
+def test_has_unique_solution():
+    assert CDCLSatSolver([[1], [-1, 2], [-2, -3]], 3, VSIDSHeuristics()).has_unique_solution()
+    assert not CDCLSatSolver([[1], [-1, 2]], 3, VSIDSHeuristics()).has_unique_solution()
+
+
+@pytest.mark.parametrize('heuristics', [VSIDSHeuristics, CHBHeuristics])
+def test_models_match_brute_force(heuristics):
+    randomizer = random.Random(0)
+
+    for _ in range(200):
+        total_variables = randomizer.randint(1, 7)
+        clauses = random_cnf(randomizer, total_variables, randomizer.randint(0, 12))
+
+        models = enumerated_models(clauses, total_variables, heuristics=heuristics)
+
+        assert len(models) == len(set(models))
+        assert set(models) == brute_force_models(clauses, total_variables)
+
+
+def test_projected_models_match_brute_force():
+    randomizer = random.Random(1)
+
+    for _ in range(200):
+        total_variables = randomizer.randint(2, 7)
+        clauses = random_cnf(randomizer, total_variables, randomizer.randint(0, 12))
+        projection = randomizer.sample(range(1, total_variables + 1), randomizer.randint(1, total_variables))
+
+        models = enumerated_models(clauses, total_variables, projection)
+
+        assert len(models) == len(set(models))
+        assert set(models) == brute_force_models(clauses, total_variables, projection)
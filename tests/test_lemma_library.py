@@ -0,0 +1,67 @@
+from Scripts.cdcl_heuristics_solver import CDCLSatSolver, SATResult
+from Scripts.helpers.dimacs_reader import read_dimacs_file
+from Scripts.helpers.lemma_library import LemmaLibrary
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix, from_matrix_to_clauses
+from Scripts.helpers.sudoku_rules import rules_file_path
+from Scripts.helpers.variable_renumbering import VariableRenumbering
+from Scripts.heuristics.VSIDS import VSIDSHeuristics
+from sudoku_cnfs import TOP95_SUDOKU, cdcl_status
+
+# Sudokus of top95.sdk.txt, hard enough for the solver to learn clauses
+SUDOKUS = (
+    TOP95_SUDOKU,
+    '52...6.........7.13...........4..8..6......5...........418.........3..2...87.....',
+)
+
+
+def solve_and_record(library, rules, sudoku):
+    """Solve a sudoku with a lemma log and record its learned clauses into `library`."""
+    clues = [clue for clue, in from_matrix_to_clauses(from_sudoku_string_to_matrix(sudoku))]
+    clauses = [[clue] for clue in clues] + rules
+    renumbering = VariableRenumbering(clauses)
+    lemma_log = []
+
+    solver = CDCLSatSolver(renumbering.encode_clauses(clauses), renumbering.total_variables, VSIDSHeuristics(),
+                           lemma_log=lemma_log)
+    assert solver.solve().status == SATResult.SATISFIABLE
+
+    return library.record([(lbd, renumbering.decode_literals(literals)) for lbd, literals in lemma_log], clues)
+
+
+def test_recorded_lemmas_follow_from_the_rules(tmp_path):
+    rules, _ = read_dimacs_file(rules_file_path(9))
+    library = LemmaLibrary(rules, str(tmp_path))
+
+    recorded = sum(solve_and_record(library, rules, sudoku) for sudoku in SUDOKUS)
+    assert recorded > 0
+
+    # A lemma follows from the rules when the rules and its negation are unsatisfiable
+    for _, literals in library.select():
+        assert cdcl_status(rules + [[-literal] for literal in literals]) == SATResult.UNSATISFIABLE
+
+
+def test_library_is_saved_per_rule_set(tmp_path):
+    rules, _ = read_dimacs_file(rules_file_path(9))
+    library = LemmaLibrary(rules, str(tmp_path))
+    solve_and_record(library, rules, SUDOKUS[0])
+    library.save()
+
+    assert LemmaLibrary(rules, str(tmp_path)).lemmas == library.lemmas
+    assert len(LemmaLibrary(rules[1:], str(tmp_path))) == 0
+
+
+def test_preloaded_lemmas_keep_the_answers(tmp_path):
+    rules, _ = read_dimacs_file(rules_file_path(9))
+    library = LemmaLibrary(rules, str(tmp_path))
+    solve_and_record(library, rules, SUDOKUS[0])
+
+    clauses = from_matrix_to_clauses(from_sudoku_string_to_matrix(SUDOKUS[1])) + rules
+    renumbering = VariableRenumbering(clauses)
+    lemmas = [(lbd, renumbering.encode_clauses([literals])[0]) for lbd, literals in library.select()]
+    solver = CDCLSatSolver(renumbering.encode_clauses(clauses), renumbering.total_variables, VSIDSHeuristics())
+
+    result = solver.solve(lemmas)
+
+    assert result.status == SATResult.SATISFIABLE
+    model = set(renumbering.decode_literals(result.solution))
+    assert all(any(literal in model for literal in clause) for clause in clauses)
@@ -0,0 +1,48 @@
+from Scripts.cdcl_heuristics_solver import CDCLSatSolver, SATResult
+from Scripts.helpers.memory_monitor import MemoryMonitor
+from Scripts.helpers.variable_renumbering import VariableRenumbering
+from Scripts.heuristics.VSIDS import VSIDSHeuristics
+from sudoku_cnfs import TOP95_SUDOKU, sudoku_cnf
+
+class ReducingMonitor(MemoryMonitor):
+    """Over the limit at every conflict, and back under it after every clause database reduction."""
+
+    is_over_limit = property(lambda self: True, lambda self, value: None)
+
+    def sample(self):
+        return False
+
+
+def solve(memory_monitor):
+    clauses, _ = sudoku_cnf(TOP95_SUDOKU)
+    renumbering = VariableRenumbering(clauses)
+    solver = CDCLSatSolver(renumbering.encode_clauses(clauses), renumbering.total_variables, VSIDSHeuristics(),
+                           memory_monitor=memory_monitor)
+
+    result = solver.solve()
+    model = set(renumbering.decode_literals(result.solution))
+    return result, all(any(literal in model for literal in clause) for clause in clauses)
+
+
+def test_peaks_are_recorded():
+    result, is_model = solve(MemoryMonitor(trace=True))
+
+    assert result.status == SATResult.SATISFIABLE and is_model
+    assert result.statistics.peak_rss > 0
+    assert result.statistics.peak_traced_memory > 0
+    assert result.statistics.memory_reductions_counter == 0
+
+
+def test_limit_stops_the_search_with_unknown():
+    result, _ = solve(MemoryMonitor(limit=1))
+
+    assert result.status == SATResult.UNKNOWN
+    assert result.statistics.memory_reductions_counter == 1
+
+
+def test_clause_database_reductions_keep_the_answer():
+    result, is_model = solve(ReducingMonitor(interval=3600))
+
+    assert result.status == SATResult.SATISFIABLE and is_model
+    assert result.statistics.memory_reductions_counter == result.statistics.conflicts_counter
+    assert result.statistics.deleted_clauses_counter > 0
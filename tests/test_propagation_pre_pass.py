@@ -0,0 +1,55 @@
+import os
+
+from SAT import propagation_pre_pass
+from Scripts.cdcl_heuristics_solver import SATResult
+from Scripts.experiments.sudoku_validator import is_valid_sudoku
+from Scripts.helpers.dimacs_reader import read_dimacs_file
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix
+from Scripts.helpers.sudoku_propagation import PropagationStage
+from Scripts.helpers.sudoku_rules import sudoku_clues
+from sudoku_cnfs import SUDOKU_4X4, sudoku_cnf, cdcl_status
+
+EXAMPLES_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+
+def test_pre_pass_solves_sudoku_of_shipped_rules():
+    clauses, total_variables = sudoku_cnf(SUDOKU_4X4)
+
+    result, _ = propagation_pre_pass(clauses, sudoku_clues(clauses, total_variables))
+
+    assert result.stage == PropagationStage.SOLVED
+    assert is_valid_sudoku(result.matrix)
+    assert all(value in (0, solved) for clue_row, row in zip(from_sudoku_string_to_matrix(SUDOKU_4X4), result.matrix)
+               for value, solved in zip(clue_row, row))
+
+
+def test_pre_pass_skips_generic_cnf():
+    # Variables 111 and 121 read as two 1s in the first row, which the rules would forbid
+    clauses = [[111], [121], [5, 6]]
+
+    result, remaining_clauses = propagation_pre_pass(clauses, sudoku_clues(clauses, 999))
+
+    assert result is None
+    assert remaining_clauses == clauses
+    assert cdcl_status([list(clause) for clause in clauses]) == SATResult.SATISFIABLE
+
+
+def test_pre_pass_skips_negative_unit_clause():
+    clauses, total_variables = read_dimacs_file(os.path.join(EXAMPLES_DIRECTORY, 'sudoku1.cnf'))
+    clauses.append([-114])
+
+    result, _ = propagation_pre_pass(clauses, sudoku_clues(clauses, total_variables))
+
+    assert result is None
+    assert cdcl_status(clauses) == SATResult.UNSATISFIABLE
+
+
+def test_sudoku_clues_rejects_extra_constraints():
+    clauses, total_variables = sudoku_cnf(SUDOKU_4X4)
+
+    assert sudoku_clues(clauses, total_variables) == from_sudoku_string_to_matrix(SUDOKU_4X4)
+    assert sudoku_clues(clauses + [[-124]], total_variables) is None
+    assert sudoku_clues(clauses + [[112, 113]], total_variables) is None
+    # Two clues of the same cell
+    assert sudoku_clues(clauses + [[142]], total_variables) is None
+    assert sudoku_clues(clauses[:-1], total_variables) is None
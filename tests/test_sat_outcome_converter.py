@@ -0,0 +1,53 @@
+import os
+
+import SAT
+from Scripts.experiments.sudoku_validator import is_valid_sudoku
+from Scripts.helpers.dimacs_reader import read_dimacs_file
+from Scripts.helpers.puzzle_set import PuzzleSet
+from Scripts.helpers.sat_outcome_converter import from_list_to_matrix, from_dict_to_matrix, from_matrix_to_cnf, \
+    from_matrix_to_clauses, from_sudoku_string_to_matrix, from_variable, to_variable
+from Scripts.helpers.sudoku_rules import rules_file_path
+
+TEST_SETS_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_sets')
+SOLUTION_16X16 = ''.join('123456789ABCDEFG'[(4 * (row % 4) + row // 4 + column) % 16]
+                         for row in range(16) for column in range(16))
+
+
+def test_16x16_variables_round_trip():
+    for row, column, value in ((1, 1, 1), (10, 16, 12), (16, 16, 16)):
+        assert from_variable(to_variable(row, column, value, 16), 16) == (row, column, value)
+
+
+def test_16x16_model_round_trip():
+    solution = from_sudoku_string_to_matrix(SOLUTION_16X16)
+    assert is_valid_sudoku(solution)
+
+    model = [int(literal) for literal in from_matrix_to_cnf(solution)]
+
+    assert from_list_to_matrix(model, 16) == solution
+    assert from_dict_to_matrix({abs(literal): literal > 0 for literal in model}, 16) == solution
+
+
+def test_variables_outside_the_grid_are_ignored():
+    assert from_list_to_matrix([5, -6, 111, 121], 9)[0][:3] == [1, 1, 0]
+
+
+def test_16x16_cnf_is_solved_end_to_end(tmp_path):
+    with PuzzleSet(os.path.join(TEST_SETS_DIRECTORY, '16x16.txt')) as puzzle_set:
+        sudoku = from_sudoku_string_to_matrix(puzzle_set[0])
+    rules, total_variables = read_dimacs_file(rules_file_path(16))
+    clauses = from_matrix_to_clauses(sudoku) + rules
+
+    cnf_path = str(tmp_path / 'sudoku16.cnf')
+    with open(cnf_path, 'w') as cnf_file:
+        cnf_file.write(f'p cnf {total_variables} {len(clauses)}\n')
+        cnf_file.writelines(f'{" ".join(map(str, clause))} 0\n' for clause in clauses)
+
+    assert SAT.main(['-S3', cnf_path]) == 0
+
+    with open(cnf_path + '.out') as output:
+        model = [int(line.split()[0]) for line in output if line.strip()]
+    solution = from_list_to_matrix(model, 16)
+
+    assert is_valid_sudoku(solution)
+    assert all(clue in (0, value) for clue_row, row in zip(sudoku, solution) for clue, value in zip(clue_row, row))
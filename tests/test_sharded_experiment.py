@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+from Scripts.experiments.sharded_experiment import ShardQueue, plan_sweep
+
+LEASE = 60
+
+
+def abandoned_queue(tmp_path):
+    """Queue of a single shard whose lock was left behind by a dead worker."""
+    queue_directory = str(tmp_path / 'queue')
+    shard, = plan_sweep(queue_directory, ['puzzles.sdk.txt'], solvers=['vsids'])
+
+    lock_path = ShardQueue(queue_directory).lock_path(shard)
+    with open(lock_path, 'w') as file:
+        file.write('dead-node:1:00000000\n')
+    expired = time.time() - 2 * LEASE
+    os.utime(lock_path, (expired, expired))
+
+    return queue_directory, shard
+
+
+def lock_owner(queue, shard):
+    with open(queue.lock_path(shard)) as file:
+        return file.read().strip()
+
+
+def test_abandoned_lock_is_reclaimed(tmp_path):
+    queue_directory, shard = abandoned_queue(tmp_path)
+    queue = ShardQueue(queue_directory, LEASE)
+
+    assert queue.claim(shard)
+    assert lock_owner(queue, shard) == queue.owner
+    assert not queue.is_stale(shard)
+
+
+def test_late_claimer_does_not_take_a_reclaimed_lock(tmp_path, monkeypatch):
+    queue_directory, shard = abandoned_queue(tmp_path)
+    first, second = ShardQueue(queue_directory, LEASE), ShardQueue(queue_directory, LEASE)
+
+    # The first worker reclaims the shard right after the second one found its lock stale
+    is_stale = second.is_stale
+
+    def is_stale_then_overtaken(stale_shard):
+        stale = is_stale(stale_shard)
+        assert first.claim(stale_shard)
+        return stale
+
+    monkeypatch.setattr(second, 'is_stale', is_stale_then_overtaken)
+
+    assert not second.claim(shard)
+    assert lock_owner(first, shard) == first.owner
+    assert os.listdir(first.claims_directory) == [os.path.basename(first.lock_path(shard))]
+
+
+def test_racing_claimers_reclaim_once(tmp_path):
+    queue_directory, shard = abandoned_queue(tmp_path)
+    queues = [ShardQueue(queue_directory, LEASE) for _ in range(8)]
+    barrier = threading.Barrier(len(queues))
+    claimed = []
+
+    def claim(queue):
+        barrier.wait()
+        if queue.claim(shard):
+            claimed.append(queue)
+
+    threads = [threading.Thread(target=claim, args=(queue,)) for queue in queues]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claimed) == 1
+    assert lock_owner(claimed[0], shard) == claimed[0].owner
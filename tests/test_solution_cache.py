@@ -0,0 +1,107 @@
+import time
+
+import SAT
+from Scripts.experiments.sudoku_validator import is_valid_sudoku
+from Scripts.helpers.dimacs_reader import read_dimacs_file
+from Scripts.helpers.sat_outcome_converter import from_sudoku_string_to_matrix
+from Scripts.helpers.solution_cache import SolutionCache, canonical_form
+from Scripts.helpers.sudoku_rules import rules_namespace, rules_file_path, sudoku_clues
+from sudoku_cnfs import SUDOKU_4X4, SOLUTION_4X4, sudoku_cnf
+
+SOLUTION_9X9 = '417369825632158947958724316825437169791586432346912758289643571573291684164875293'
+
+
+def transposed(matrix):
+    return [list(row) for row in zip(*matrix)]
+
+
+def relabeled(matrix, digits):
+    return [[digits.get(value, value) for value in row] for row in matrix]
+
+
+def write_sudoku_cnf(path, sudoku, extra_clauses=()):
+    clauses, total_variables = sudoku_cnf(sudoku)
+    clauses += extra_clauses
+
+    with open(path, 'w') as cnf_file:
+        cnf_file.write(f'p cnf {total_variables} {len(clauses)}\n')
+        cnf_file.writelines(f'{" ".join(map(str, clause))} 0\n' for clause in clauses)
+    return clauses
+
+
+def test_symmetric_variant_gets_mapped_solution(tmp_path):
+    sudoku, solution = from_sudoku_string_to_matrix(SUDOKU_4X4), from_sudoku_string_to_matrix(SOLUTION_4X4)
+    cache = SolutionCache(str(tmp_path / 'solutions.sqlite'))
+    cache.put(sudoku, solution)
+
+    digits = {1: 3, 2: 4, 3: 1, 4: 2}
+    variant = relabeled(transposed(sudoku), digits)
+    assert canonical_form(variant)[0] == canonical_form(sudoku)[0]
+
+    assert cache.get(variant) == relabeled(transposed(solution), digits)
+    cache.close()
+
+
+def test_empty_grid_is_keyed_as_it_is(tmp_path):
+    empty = [[0] * 9 for _ in range(9)]
+
+    start = time.perf_counter()
+    key, _ = canonical_form(empty)
+    assert time.perf_counter() - start < 5
+    assert key == '.' * 81
+
+    # A key spelling the grid itself shares the cache with the canonical keys
+    solution = from_sudoku_string_to_matrix(SOLUTION_9X9)
+    cache = SolutionCache(str(tmp_path / 'solutions.sqlite'))
+    cache.put(empty, solution)
+    assert cache.get(empty) == solution
+    cache.close()
+
+
+def test_namespace_keeps_every_clause_but_the_clues():
+    rules = [[111, 112], [-111, -112]]
+
+    assert rules_namespace(rules + [[111]]) == rules_namespace(rules)
+    assert rules_namespace(rules + [[-112]]) != rules_namespace(rules)
+    assert rules_namespace(rules + [[113, 114]]) != rules_namespace(rules)
+
+
+def test_cache_is_opt_in(monkeypatch):
+    monkeypatch.setattr(SAT, 'SOLUTION_CACHE_PATH', None)
+    clauses, total_variables = read_dimacs_file(rules_file_path(4))
+
+    assert SAT.open_solution_cache(clauses, sudoku_clues(clauses, total_variables)) is None
+
+
+def test_cached_solution_is_checked_against_the_clauses(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(SAT, 'SOLUTION_CACHE_PATH', str(tmp_path / 'solutions.sqlite'))
+    cnf_path = str(tmp_path / 'sudoku.cnf')
+    clauses = write_sudoku_cnf(cnf_path, SUDOKU_4X4)
+
+    assert SAT.main(['-S3', cnf_path]) == 0
+    assert SAT.main(['-S3', cnf_path]) == 0
+    assert 'Solution cache hit' in capsys.readouterr().out
+
+    sudoku = sudoku_clues(clauses, 444)
+    cache = SAT.open_solution_cache(clauses, sudoku)
+    assert is_valid_sudoku(SAT.cached_solution(cache, sudoku, clauses))
+    # A cached solution violating a clause of the CNF is not used
+    assert SAT.cached_solution(cache, sudoku, clauses + [[-212]]) is None
+    cache.close()
+
+
+def test_sudoku_with_extra_constraint_does_not_use_the_cache(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(SAT, 'SOLUTION_CACHE_PATH', str(tmp_path / 'solutions.sqlite'))
+    cnf_path = str(tmp_path / 'sudoku.cnf')
+    write_sudoku_cnf(cnf_path, SUDOKU_4X4)
+    assert SAT.main(['-S3', cnf_path]) == 0
+
+    # The only solution has 4 in the first cell
+    constrained_path = str(tmp_path / 'constrained.cnf')
+    write_sudoku_cnf(constrained_path, SUDOKU_4X4, [[-114]])
+    capsys.readouterr()
+    assert SAT.main(['-S3', constrained_path]) == 0
+
+    output = capsys.readouterr().out
+    assert 'Solution cache hit' not in output
+    assert 'UNSATISFIED' in output or 'UNSATISFIABLE' in output
@@ -0,0 +1,36 @@
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from Scripts.helpers.worker_pool import WorkerPool
+
+
+def square(value):
+    return value * value
+
+
+def test_cancelling_a_finished_task_keeps_nothing():
+    with WorkerPool(processes=1) as pool:
+        future = pool.submit(square, 3)
+        assert future.result(timeout=30) == 9
+
+        pool.cancel(future)
+
+        assert future.result() == 9
+        assert not pool.cancelled
+
+
+def test_cancelling_a_running_task_stops_its_worker():
+    with WorkerPool(processes=1) as pool:
+        future = pool.submit(time.sleep, 60)
+        while not future.running():
+            time.sleep(0.01)
+
+        pool.cancel(future)
+
+        with pytest.raises(CancelledError):
+            future.result(timeout=30)
+        assert pool.submit(square, 4).result(timeout=30) == 16
+        assert not pool.cancelled
+        assert pool.statistics()['restarted_workers'] == 1